@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Generator, Iterable, Iterator, Optional, Set
+
+from app.logger import logger
+
+
+class CheckpointJournal:
+    """
+    Durable append-only journal of completed projects of a generation job.
+
+    Every completed project is appended as a single JSON line and flushed to
+    disk, so a job interrupted by a crash or a container restart can resume
+    from the last completed project instead of starting over.
+
+    Only the URLs of completed projects are kept in memory, their rows are
+    streamed from the journal when the output is rebuilt.
+
+    Attributes:
+        file_path (str): The path to the journal file.
+        job_id (str): Identifier of the job the journal belongs to.
+        completed (Set[str]): URLs of the completed projects.
+    """
+
+    def __init__(self, file_path: str, job_id: str) -> None:
+        """
+        :param file_path: Path to the journal file.
+        :param job_id: Identifier of the job, used to detect stale journals.
+        """
+        self.file_path = file_path
+        self.job_id = job_id
+        self.completed: Set[str] = set()
+        # whether the journal is known to end with a complete line
+        self._terminated = False
+
+    @staticmethod
+    def fingerprint(urls: Iterable[str]) -> str:
+        """
+        Computes a job identifier from a list of URLs.
+
+        :param urls: The URLs processed by the job.
+        :return: Hex digest identifying the list of URLs.
+        """
+        digest = hashlib.sha256()
+        for url in urls:
+            digest.update(url.encode())
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def _entries(self) -> Generator[Dict[str, Any], None, None]:
+        """
+        Reads the journal line by line, skipping corrupted lines such as a
+        truncated last line, left by a crash in the middle of a write.
+
+        :return: Iterator over the journal header and entries.
+        """
+        with open(self.file_path, "r") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    entry = None
+                if isinstance(entry, dict):
+                    yield entry
+                else:
+                    logger.warning(f"Skipping corrupted journal line: {line}")
+
+    def _records(self) -> Iterator[Dict[str, Any]]:
+        """
+        :return: Iterator over the completed projects after the header,
+            skipping entries without a URL or a row.
+        """
+        entries = self._entries()
+        next(entries, None)  # the header
+        for entry in entries:
+            if "url" in entry and "row" in entry:
+                yield entry
+            else:
+                logger.warning(f"Skipping incomplete journal entry: {entry}")
+
+    def load(self) -> bool:
+        """
+        Loads the completed URLs from an existing journal.
+
+        A journal written for a different job is discarded.
+
+        :return: True if there is progress to resume from, False otherwise.
+        """
+        self.completed = set()
+        if not os.path.isfile(self.file_path):
+            return False
+
+        entries = self._entries()
+        header = next(entries, None)
+        entries.close()
+        if header is None or header.get("job") != self.job_id:
+            logger.info(f"Discarding stale checkpoint {self.file_path}")
+            self.remove()
+            return False
+
+        self.completed.update(entry["url"] for entry in self._records())
+        logger.info(
+            f"Resuming from checkpoint with {len(self.completed)} completed projects"
+        )
+        return bool(self.completed)
+
+    def is_completed(self, url: str) -> bool:
+        """
+        Checks whether the project at the given URL is already completed.
+
+        :param url: The project URL.
+        :return: True if the project is recorded in the journal.
+        """
+        return url in self.completed
+
+    def record(
+        self, url: str, key: Optional[str], row: Dict[str, Any]
+    ) -> None:
+        """
+        Appends a completed project to the journal and flushes it to disk.
+
+        :param url: The project URL.
+        :param key: The project key extracted from the project page.
+        :param row: The CSV row written for the project.
+        """
+        entry = {"url": url, "key": key, "row": row}
+        try:
+            is_new = not os.path.isfile(self.file_path)
+            # A line torn by a crash would swallow the first new entry
+            torn = not is_new and not self._terminated and self._is_torn()
+            with open(self.file_path, "a") as journal:
+                if is_new:
+                    journal.write(json.dumps({"job": self.job_id}) + "\n")
+                elif torn:
+                    journal.write("\n")
+                journal.write(json.dumps(entry) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+        except IOError as e:
+            logger.error(f"IOError: {e}")
+            return
+        self._terminated = True
+        self.completed.add(url)
+
+    def _is_torn(self) -> bool:
+        """
+        :return: True if the journal does not end with a line break.
+        """
+        with open(self.file_path, "rb") as journal:
+            if journal.seek(0, os.SEEK_END) == 0:
+                return False
+            journal.seek(-1, os.SEEK_END)
+            return journal.read(1) != b"\n"
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the CSV rows of all completed projects in journal order.
+
+        :return: Iterator over the CSV rows.
+        """
+        if not os.path.isfile(self.file_path):
+            return
+        for entry in self._records():
+            yield entry["row"]
+
+    def remove(self) -> None:
+        """
+        Removes the journal file, e.g. after the job has completed.
+        """
+        if os.path.isfile(self.file_path):
+            os.remove(self.file_path)
+        self._terminated = False
@@ -1,8 +1,122 @@
+import json
 import os
-from typing import Final, List
+from typing import Any, Dict, Final, List, Tuple, TypeVar
+
+T = TypeVar("T", bool, int, float, str)
+
+# Settings below marked with setting() can be overridden without code changes:
+# by environment variables named P5D_<NAME>, or by a JSON file of
+# {"<NAME>": value} pointed to by P5D_CONFIG_FILE. The environment wins.
+CONFIG_ENV_PREFIX: Final[str] = "P5D_"
+CONFIG_FILE_ENV: Final[str] = f"{CONFIG_ENV_PREFIX}CONFIG_FILE"
+TRUE_VALUES: Final[Tuple[str, ...]] = ("1", "true", "yes", "on")
+FALSE_VALUES: Final[Tuple[str, ...]] = ("0", "false", "no", "off")
+
+
+def load_config_file(path: str) -> Dict[str, Any]:
+    """
+    Reads the overrides of the config file.
+
+    :param path: Path to the JSON config file, empty for none.
+    :return: The overrides by setting name.
+    :raises ValueError: If the file is not a JSON object.
+    """
+    if not path:
+        return {}
+    with open(path, "r") as config_file:
+        overrides = json.load(config_file)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"Config file {path} must contain a JSON object")
+    return overrides
+
+
+def convert(name: str, value: Any, default: T) -> T:
+    """
+    Converts an override to the type of the default value.
+
+    :param name: Name of the setting, for error messages.
+    :param value: The override, a string from the environment or a JSON value.
+    :param default: The default value of the setting.
+    :return: The converted value.
+    :raises ValueError: If the value cannot be converted.
+    """
+    if isinstance(default, bool):
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() in TRUE_VALUES:
+            return True
+        if str(value).lower() in FALSE_VALUES:
+            return False
+        raise ValueError(f"Invalid boolean for {name}: {value!r}")
+    try:
+        return type(default)(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value for {name}: {value!r}")
+
+
+config_file_overrides = load_config_file(os.environ.get(CONFIG_FILE_ENV, ""))
+
+
+def setting(name: str, default: T) -> T:
+    """
+    Returns the value of a setting, overridden by the environment or the config file.
+
+    :param name: Name of the setting, as in this module.
+    :param default: Value used if not overridden, which also sets the type.
+    :return: The value of the setting.
+    """
+    env_value = os.environ.get(f"{CONFIG_ENV_PREFIX}{name}")
+    if env_value is not None:
+        return convert(name, env_value, default)
+    if name in config_file_overrides:
+        return convert(name, config_file_overrides[name], default)
+    return default
+
+
+def list_setting(name: str, default: List[str]) -> List[str]:
+    """
+    Returns a list setting, overridden like setting() by a comma-separated
+    string, or by a JSON list in the config file.
+
+    :param name: Name of the setting, as in this module.
+    :param default: Items used if not overridden.
+    :return: The items of the setting, without surrounding whitespace.
+    """
+    if isinstance(config_file_overrides.get(name), list):
+        default = [str(item) for item in config_file_overrides[name]]
+        if f"{CONFIG_ENV_PREFIX}{name}" not in os.environ:
+            return default
+    value = setting(name, ",".join(default))
+    return [item.strip() for item in value.split(",") if item.strip()]
+
 
 # Maximum number of concurrent tasks
-MAX_CONCURRENT_TASKS: Final[int] = 3
+MAX_CONCURRENT_TASKS: Final[int] = setting("MAX_CONCURRENT_TASKS", 3)
+
+# Process-wide budget of outbound requests shared fairly by all running jobs,
+# requests per second limit of 0 disables rate limiting
+GLOBAL_MAX_CONCURRENT_REQUESTS: Final[int] = setting(
+    "GLOBAL_MAX_CONCURRENT_REQUESTS", 6
+)
+GLOBAL_MAX_REQUESTS_PER_SECOND: Final[float] = setting(
+    "GLOBAL_MAX_REQUESTS_PER_SECOND", 10.0
+)
+
+# Hedged requests: when a request is slower than the given latency percentile
+# of recent requests, a duplicate request is sent and the first response wins.
+# The number of hedges is capped to a fraction of all requests.
+HEDGING_ENABLED: Final[bool] = setting("HEDGING_ENABLED", False)
+HEDGE_LATENCY_PERCENTILE: Final[float] = setting(
+    "HEDGE_LATENCY_PERCENTILE", 0.95
+)
+HEDGE_MAX_RATIO: Final[float] = setting("HEDGE_MAX_RATIO", 0.1)
+HEDGE_MIN_SAMPLES: Final[int] = setting("HEDGE_MIN_SAMPLES", 20)
+
+# HTTP client backend used by the fetchers: "aiohttp" or "httpx"
+HTTP_BACKEND: Final[str] = setting("HTTP_BACKEND", "aiohttp")
+
+# Negotiate HTTP/2 when the httpx backend is used
+HTTP2_ENABLED: Final[bool] = setting("HTTP2_ENABLED", True)
 
 # List of 25 URLs from https://planner5d.com/gallery/floorplans/
 LIST_OF_PROJECTS: Final[List[str]] = [
@@ -40,6 +154,150 @@ CSV_FILE_PATH = os.path.join(
     os.path.dirname(__file__), CSV_FILE_FOLDER, CSV_FILE_NAME
 )
 
+# Generation runs write to the partial file, which is atomically published
+# as a versioned snapshot into the snapshots folder once the run completes
+CSV_PARTIAL_FILE_PATH: Final[str] = f"{CSV_FILE_PATH}.partial"
+CSV_SNAPSHOTS_FOLDER_PATH: Final[str] = os.path.join(
+    os.path.dirname(__file__), CSV_FILE_FOLDER, "snapshots"
+)
+CSV_SNAPSHOTS_TO_KEEP: Final[int] = setting("CSV_SNAPSHOTS_TO_KEEP", 3)
+
+# Folder with isolated outputs of generation jobs created through the API
+JOBS_FOLDER_PATH: Final[str] = os.path.join(
+    os.path.dirname(__file__), CSV_FILE_FOLDER, "jobs"
+)
+
+# Multi-worker mode for running several uvicorn/gunicorn workers: jobs are
+# registered in a shared SQLite database and generation runs are serialized
+# across processes with a file lock, so any worker can serve status and
+# downloads while exactly one worker runs each generation.
+MULTI_WORKER_MODE: Final[bool] = setting("MULTI_WORKER_MODE", False)
+JOBS_DATABASE_PATH: Final[str] = os.path.join(
+    os.path.dirname(__file__), CSV_FILE_FOLDER, "jobs.sqlite3"
+)
+GENERATION_LOCK_PATH: Final[str] = os.path.join(
+    os.path.dirname(__file__), CSV_FILE_FOLDER, "generation.lock"
+)
+
+# Interval of background CSV refresh in seconds, 0 disables the refresh
+CSV_REFRESH_INTERVAL_SECONDS: Final[int] = setting(
+    "CSV_REFRESH_INTERVAL_SECONDS", 0
+)
+
+# Checkpoint journal used to resume interrupted generation runs
+CHECKPOINT_FILE_NAME: Final[str] = "download-csv.journal"
+CHECKPOINT_FILE_PATH = os.path.join(
+    os.path.dirname(__file__), CSV_FILE_FOLDER, CHECKPOINT_FILE_NAME
+)
+
+# Deadline of a generation run in seconds, 0 disables it. When it passes,
+# the run publishes the rows gathered so far and reports the skipped URLs.
+JOB_DEADLINE_SECONDS: Final[float] = setting("JOB_DEADLINE_SECONDS", 0.0)
+# Timeout budgets of the fetching stages, capped by the remaining deadline
+HTML_FETCH_TIMEOUT_SECONDS: Final[float] = setting(
+    "HTML_FETCH_TIMEOUT_SECONDS", 30.0
+)
+API_FETCH_TIMEOUT_SECONDS: Final[float] = setting(
+    "API_FETCH_TIMEOUT_SECONDS", 30.0
+)
+SKIP_REPORT_FILE_PATH: Final[str] = os.path.join(
+    os.path.dirname(__file__), CSV_FILE_FOLDER, "download-csv.skipped.json"
+)
+
+# Maximum response body sizes of the fetching stages in bytes, 0 for none.
+# Larger responses are aborted, before reading the body when their
+# Content-Length announces it, so memory per request stays bounded.
+HTML_MAX_BODY_BYTES: Final[int] = setting(
+    "HTML_MAX_BODY_BYTES", 5 * 1024 * 1024
+)
+API_MAX_BODY_BYTES: Final[int] = setting(
+    "API_MAX_BODY_BYTES", 50 * 1024 * 1024
+)
+# Response bodies are read in chunks of this size, bodies larger than the
+# spool size are buffered in a temporary file instead of memory while downloading
+RESPONSE_CHUNK_BYTES: Final[int] = setting("RESPONSE_CHUNK_BYTES", 64 * 1024)
+RESPONSE_SPOOL_BYTES: Final[int] = setting("RESPONSE_SPOOL_BYTES", 1024 * 1024)
+
+# Negative cache of failing project URLs, skipped until their TTL expires.
+# The TTL doubles with every repeated failure up to the maximum.
+NEGATIVE_CACHE_FILE_PATH: Final[str] = os.path.join(
+    os.path.dirname(__file__), CSV_FILE_FOLDER, "negative-cache.json"
+)
+NEGATIVE_CACHE_BASE_TTL_SECONDS: Final[int] = setting(
+    "NEGATIVE_CACHE_BASE_TTL_SECONDS", 60 * 60
+)
+NEGATIVE_CACHE_MAX_TTL_SECONDS: Final[int] = setting(
+    "NEGATIVE_CACHE_MAX_TTL_SECONDS", 7 * 24 * 60 * 60
+)
+
+# Memo of parsed projects keyed by the hash of the API response body.
+# Results are invalidated automatically when the parser code changes.
+PARSE_MEMO_FILE_PATH: Final[str] = os.path.join(
+    os.path.dirname(__file__), CSV_FILE_FOLDER, "parse-memo.json"
+)
+PARSE_MEMO_MAX_ENTRIES: Final[int] = setting("PARSE_MEMO_MAX_ENTRIES", 10000)
+
+# HTTP archive of upstream responses: "off", "record" to capture responses
+# with their headers and timing, or "replay" to serve them back offline.
+# Replayed responses are delayed by their recorded latency times the scale,
+# 0 serves them immediately.
+HTTP_ARCHIVE_MODE: Final[str] = setting("HTTP_ARCHIVE_MODE", "off")
+HTTP_ARCHIVE_PATH: Final[str] = os.path.join(
+    os.path.dirname(__file__), CSV_FILE_FOLDER, "http-archive.jsonl.gz"
+)
+HTTP_ARCHIVE_LATENCY_SCALE: Final[float] = setting(
+    "HTTP_ARCHIVE_LATENCY_SCALE", 0.0
+)
+
+# Event loop lag monitor: a heartbeat every interval, lags above the
+# threshold are recorded as blocking events with the stack of the loop
+LOOP_MONITOR_ENABLED: Final[bool] = setting("LOOP_MONITOR_ENABLED", True)
+LOOP_MONITOR_INTERVAL_SECONDS: Final[float] = setting(
+    "LOOP_MONITOR_INTERVAL_SECONDS", 0.05
+)
+LOOP_LAG_THRESHOLD_SECONDS: Final[float] = setting(
+    "LOOP_LAG_THRESHOLD_SECONDS", 0.1
+)
+
+# Keep-alive interval of the Server-Sent Events progress stream
+PROGRESS_HEARTBEAT_SECONDS: Final[float] = setting(
+    "PROGRESS_HEARTBEAT_SECONDS", 15.0
+)
+
+# On-demand profiling through the admin endpoints, disabled by default.
+# Stack samples are kept only if they pass through the focus function.
+PROFILING_ENABLED: Final[bool] = setting("PROFILING_ENABLED", False)
+PROFILING_MAX_SECONDS: Final[float] = setting("PROFILING_MAX_SECONDS", 60.0)
+PROFILING_SAMPLE_INTERVAL_SECONDS: Final[float] = setting(
+    "PROFILING_SAMPLE_INTERVAL_SECONDS", 0.005
+)
+PROFILING_FOCUS: Final[str] = setting(
+    "PROFILING_FOCUS", "fetch_and_parse_project_data_to_csv"
+)
+PROFILING_TOP_ALLOCATIONS: Final[int] = setting(
+    "PROFILING_TOP_ALLOCATIONS", 25
+)
+# Frames stored per allocation, deep enough to reach from json and lxml
+# internals back to the app code calling them
+PROFILING_TRACEBACK_FRAMES: Final[int] = setting(
+    "PROFILING_TRACEBACK_FRAMES", 25
+)
+
+# Admin endpoint adjusting the runtime-tunable limits of the live process,
+# see app/settings.py. Disabled by default.
+RUNTIME_SETTINGS_ENABLED: Final[bool] = setting(
+    "RUNTIME_SETTINGS_ENABLED", False
+)
+
+# Admin endpoint purging entries of the negative cache. Disabled by default.
+NEGATIVE_CACHE_ADMIN_ENABLED: Final[bool] = setting(
+    "NEGATIVE_CACHE_ADMIN_ENABLED", False
+)
+
+# Summary statistics of the latest snapshot served by /stats
+STATS_PERCENTILES: Final[Tuple[float, ...]] = (25, 50, 75, 90, 99)
+STATS_HISTOGRAM_BINS: Final[int] = setting("STATS_HISTOGRAM_BINS", 20)
+
 # url to API with planner 5d projects
 PLANNER5D_API_PROJECT_URL: Final[str] = "https://planner5d.com/api/project/"
 
@@ -49,6 +307,19 @@ PROJECT_ID_XPATH: Final[
 ] = "/html/body/main/div/div/aside/div[2]/div[1]/a/@href"
 MAIN_PAGE_HTML_PATH: Final[str] = "app/static/index.html"
 
+# Gallery listing pages fetched before a run to resolve the keys of many
+# projects at once, e.g. "https://planner5d.com/gallery/floorplans/".
+# Keys are read from the "key" query parameter of links and from the key
+# attribute, and belong to the project of the listing card they are in.
+# Projects not resolved from a listing fall back to their own page.
+GALLERY_LISTING_URLS: Final[List[str]] = list_setting(
+    "GALLERY_LISTING_URLS", []
+)
+GALLERY_PROJECT_PATH_PREFIX: Final[str] = "/gallery/floorplans/"
+GALLERY_KEY_ATTRIBUTE: Final[str] = setting(
+    "GALLERY_KEY_ATTRIBUTE", "data-key"
+)
+
 # logger format
 LOGGER_FORMAT: Final[
     str
@@ -1,37 +1,28 @@
 import csv
 import os
-from typing import Dict, Optional
+from typing import Any, Dict, Iterable, Sequence
 
 from app.logger import logger
 
 
 class CSVHandler:
     """
-    Singleton class to handle CSV file operations.
+    Class to handle CSV file operations.
+
+    Every generation job creates its own instance, so concurrent jobs
+    writing to different files do not interfere with each other.
 
     Attributes:
-        _instance (CSVHandler): The single instance of the class.
         file_path (str): The path to the CSV file.
         is_closed (bool): Indicates whether the file is closed.
     """
 
-    _instance: Optional["CSVHandler"] = None
-    is_closed: bool = False
-    file_path: str = ""
-
-    def __new__(cls, file_path: str) -> "CSVHandler":
+    def __init__(self, file_path: str) -> None:
         """
-        Create a new instance of CSVHandler if one doesn't exist.
-        Follows the Singleton design pattern.
-
         :param file_path: Path to the CSV file.
-        :return: Instance of CSVHandler.
         """
-        if cls._instance is None:
-            cls._instance = super(CSVHandler, cls).__new__(cls)
-            cls._instance.file_path = file_path
-            cls._instance.is_closed = False
-        return cls._instance
+        self.file_path = file_path
+        self.is_closed = False
 
     def write_dict_to_csv(self, data: Dict[str, str]) -> None:
         """
@@ -44,22 +35,54 @@ class CSVHandler:
         if not data:
             return  # No data to write
 
+        self.write_rows(list(data.keys()), [list(data.values())])
+
+    def write_row(self, fieldnames: Sequence[str], row: Sequence[Any]) -> None:
+        """
+        Writes a single row to a CSV file.
+
+        :param fieldnames: The column headers, written if the file is new or closed.
+        :param row: The values in the order of the column headers.
+        :return: None
+        """
+        self.write_rows(fieldnames, (row,))
+
+    def write_rows(
+        self, fieldnames: Sequence[str], rows: Iterable[Sequence[Any]]
+    ) -> None:
+        """
+        Writes rows of values to a CSV file, without building a dictionary per row.
+
+        :param fieldnames: The column headers, written if the file is new or closed.
+        :param rows: The rows, with values in the order of the column headers.
+        :return: None
+        """
         mode = "w" if self.is_closed else "a"
         file_exists = os.path.isfile(self.file_path) and not self.is_closed
 
         try:
             with open(self.file_path, mode, newline="") as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=data.keys())
+                writer = csv.writer(csvfile)
 
                 if not file_exists or self.is_closed:
-                    writer.writeheader()  # Write header for new or closed file
+                    writer.writerow(
+                        fieldnames
+                    )  # Write header for new or closed file
 
-                writer.writerow(data)
+                writer.writerows(rows)
                 self.is_closed = False  # Reset the flag as file is now open
 
         except IOError as e:
             logger.error(f"IOError: {e}")
 
+    def reset(self) -> None:
+        """
+        Removes the file left by a previous run and marks the file as closed.
+        """
+        if os.path.isfile(self.file_path):
+            os.remove(self.file_path)
+        self.is_closed = True
+
     def close(self) -> None:
         """
         Marks the file as closed.
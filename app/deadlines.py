@@ -0,0 +1,60 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    Time budget of a generation job, shared by all of its stages.
+
+    Every stage runs with a timeout of its own budget capped by the time left
+    until the deadline, so no work of the job outlives the deadline.
+
+    Attributes:
+        seconds (Optional[float]): Total budget of the job, None if unlimited.
+    """
+
+    def __init__(self, seconds: Optional[float] = None) -> None:
+        """
+        :param seconds: Total budget of the job in seconds, None or 0 for no deadline.
+        """
+        self.seconds = seconds or None
+        self._expires_at = (
+            time.monotonic() + self.seconds if self.seconds else None
+        )
+
+    def remaining(self) -> Optional[float]:
+        """
+        :return: Seconds left until the deadline, or None without a deadline.
+        """
+        if self._expires_at is None:
+            return None
+        return max(self._expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        """
+        :return: True if the deadline has passed.
+        """
+        return self.remaining() == 0.0
+
+    def budget(self, stage_budget: Optional[float] = None) -> Optional[float]:
+        """
+        :param stage_budget: Timeout of the stage in seconds, or None.
+        :return: The stage budget capped by the remaining time, or None if unlimited.
+        """
+        limits = [
+            limit
+            for limit in (stage_budget, self.remaining())
+            if limit is not None
+        ]
+        return min(limits) if limits else None
+
+    def timeout(self, stage_budget: Optional[float] = None) -> asyncio.Timeout:
+        """
+        Limits a stage to its budget and the remaining time of the job.
+
+        :param stage_budget: Timeout of the stage in seconds, or None.
+        :return: Async context manager raising TimeoutError when the budget is exceeded.
+        """
+        return asyncio.timeout(self.budget(stage_budget))
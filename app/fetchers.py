@@ -1,27 +1,75 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Union
-
-import aiohttp
+from typing import Any, Dict, Optional, Union
 
+from app.config import API_MAX_BODY_BYTES, HTML_MAX_BODY_BYTES
+from app.hedging import HedgePolicy
 from app.logger import logger
+from app.request_scheduler import ScheduledSession
+from app.transports import (
+    FETCH_ERRORS,
+    ClientSession,
+    check_status,
+    read_text,
+)
 
 
 class AsyncDataFetcher(ABC):
     """
     Abstract base class for data fetching operations.
 
-    Defines a template method to fetch data from a URL.
+    Defines a template method to fetch data from a URL, optionally hedging slow requests.
+    Response bodies larger than the size limit of the fetcher are rejected.
+    Responses with an error status are rejected too. The error of the last
+    failed request is kept in `error`, so callers can tell a missing project
+    from a failure worth retrying.
     """
 
-    @abstractmethod
+    # Maximum body size in bytes used unless given, 0 for none
+    default_max_body_bytes = 0
+
+    def __init__(
+        self,
+        hedge_policy: Optional[HedgePolicy] = None,
+        max_body_bytes: Optional[int] = None,
+    ) -> None:
+        """
+        :param hedge_policy: HedgePolicy sending duplicate requests for slow responses.
+        :param max_body_bytes: Maximum body size in bytes, 0 for none, None for the default of the fetcher.
+        """
+        self.hedge_policy = hedge_policy
+        self.max_body_bytes = (
+            self.default_max_body_bytes
+            if max_body_bytes is None
+            else max_body_bytes
+        )
+        self.error: Optional[Exception] = None
+
     async def fetch_data(
-        self, url: str, session: aiohttp.ClientSession
+        self, url: str, session: ClientSession
     ) -> Union[Dict[str, Any], str, None]:
         """
         Fetch data from a given URL.
 
         :param url: The URL to fetch data from.
-        :param session: The aiohttp ClientSession to use for fetching data.
+        :param session: The HTTP session (aiohttp or httpx backend) to use for fetching data.
+        :return: The fetched data in a structured format, or None if fetching fails.
+        """
+        if self.hedge_policy is None:
+            return await self.request(url, session)
+        return await self.hedge_policy.run(
+            lambda: self.request(url, session),
+            scheduled=isinstance(session, ScheduledSession),
+        )
+
+    @abstractmethod
+    async def request(
+        self, url: str, session: ClientSession
+    ) -> Union[Dict[str, Any], str, None]:
+        """
+        Send a single request for the given URL.
+
+        :param url: The URL to fetch data from.
+        :param session: The HTTP session (aiohttp or httpx backend) to use for fetching data.
         :return: The fetched data in a structured format, or None if fetching fails.
         """
         pass
@@ -34,22 +82,26 @@ class AsyncHTMLDataFetcher(AsyncDataFetcher):
     Extends the DataFetcher abstract base class.
     """
 
-    async def fetch_data(
-        self, url: str, session: aiohttp.ClientSession
+    default_max_body_bytes = HTML_MAX_BODY_BYTES
+
+    async def request(
+        self, url: str, session: ClientSession
     ) -> Union[Dict[str, Any], str, None]:
         """
-        Fetch HTML data from a URL using an existing aiohttp.ClientSession.
+        Fetch HTML data from a URL using an existing HTTP session.
 
         :param url: The URL to fetch HTML content from.
-        :param session: The aiohttp ClientSession to use for fetching data.
+        :param session: The HTTP session (aiohttp or httpx backend) to use for fetching data.
         :return: The HTML content as a string, or None if fetching fails.
         """
         logger.info(f"Fetching html data from {url}")
         try:
             async with session.get(url) as response:
-                return await response.text()
-        except (aiohttp.ClientResponseError, aiohttp.InvalidURL) as e:
+                check_status(response)
+                return await read_text(response, self.max_body_bytes)
+        except FETCH_ERRORS as e:
             logger.error(f"Error fetching HTML data: {e}")
+            self.error = e
             return None
 
 
@@ -60,20 +112,27 @@ class AsyncJSONDataFetcher(AsyncDataFetcher):
     Extends the DataFetcher abstract base class.
     """
 
-    async def fetch_data(
-        self, url: str, session: aiohttp.ClientSession
+    default_max_body_bytes = API_MAX_BODY_BYTES
+
+    async def request(
+        self, url: str, session: ClientSession
     ) -> Union[Dict[str, Any], str, None]:
         """
         Fetch JSON data from a URL.
 
+        The body is returned undecoded, so it can be decoded by the parser or
+        identified by its content hash without decoding.
+
         :param url: The URL to fetch JSON content from.
-        :param session: The aiohttp ClientSession to use for fetching data.
-        :return: A dictionary representing the JSON data, or None if fetching fails.
+        :param session: The HTTP session (aiohttp or httpx backend) to use for fetching data.
+        :return: The raw JSON document as a string, or None if fetching fails.
         """
         logger.info(f"Fetching json data from {url}")
         try:
             async with session.get(url) as response:
-                return await response.json()
-        except (aiohttp.ClientResponseError, aiohttp.InvalidURL) as e:
+                check_status(response)
+                return await read_text(response, self.max_body_bytes)
+        except FETCH_ERRORS as e:
             logger.error(f"Error fetching JSON data: {e}")
+            self.error = e
             return None
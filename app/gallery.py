@@ -0,0 +1,145 @@
+import asyncio
+from collections import defaultdict
+from itertools import chain
+from typing import DefaultDict, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlparse
+
+from lxml import etree, html
+
+from app.config import (
+    GALLERY_KEY_ATTRIBUTE,
+    GALLERY_PROJECT_PATH_PREFIX,
+    HTML_FETCH_TIMEOUT_SECONDS,
+)
+from app.deadlines import Deadline
+from app.fetchers import AsyncHTMLDataFetcher
+from app.hedging import html_hedge_policy
+from app.logger import logger
+from app.loop_monitor import loop_monitor
+from app.parsers import HTMLParsingStrategy
+from app.transports import ClientSession
+
+
+def project_slug(
+    url: str, path_prefix: str = GALLERY_PROJECT_PATH_PREFIX
+) -> Optional[str]:
+    """
+    Extracts the slug of a gallery project page URL, e.g. "LTXdJG" of
+    https://planner5d.com/gallery/floorplans/LTXdJG/floorplans-house-3d.
+
+    :param url: Absolute or relative URL.
+    :param path_prefix: Path of the gallery the project pages are under.
+    :return: The slug, or None if the URL is not a project page.
+    """
+    path = urlparse(url).path
+    if not path.startswith(path_prefix):
+        return None
+    return path.removeprefix(path_prefix).split("/", 1)[0] or None
+
+
+class GalleryListingParser:
+    """
+    Parser extracting the keys of many projects from a gallery listing page.
+
+    The page is walked once. Links to project pages give the slugs, the "key"
+    query parameter of links and the key attribute of elements give the keys.
+    A key belongs to the project of the innermost element around it that
+    contains project links, if they all lead to the same project. Keys whose
+    card links to several projects or to none are ambiguous and left out,
+    so a key is never attributed to the wrong project.
+
+    Attributes:
+        path_prefix (str): Path of the gallery the project pages are under.
+        key_attribute (str): Name of the attribute carrying a project key.
+    """
+
+    def __init__(
+        self,
+        path_prefix: str = GALLERY_PROJECT_PATH_PREFIX,
+        key_attribute: str = GALLERY_KEY_ATTRIBUTE,
+    ) -> None:
+        """
+        :param path_prefix: Path of the gallery the project pages are under.
+        :param key_attribute: Name of the attribute carrying a project key.
+        """
+        self.path_prefix = path_prefix
+        self.key_attribute = key_attribute
+
+    def parse(self, data: Optional[str]) -> Dict[str, str]:
+        """
+        :param data: The HTML of the listing page.
+        :return: Project keys by project slug.
+        """
+        if not data:
+            return {}
+        tree = html.fromstring(data)
+        slugs_within: DefaultDict[etree._Element, Set[str]] = defaultdict(set)
+        keyed: List[Tuple[etree._Element, str]] = []
+        for element in tree.iter(etree.Element):
+            href = element.get("href")
+            if href:
+                slug = project_slug(href, self.path_prefix)
+                if slug:
+                    for ancestor in chain([element], element.iterancestors()):
+                        slugs_within[ancestor].add(slug)
+            key = element.get(self.key_attribute) or (
+                href
+                and HTMLParsingStrategy.parse_url_query_parameter(href, "key")
+            )
+            if key:
+                keyed.append((element, key))
+
+        keys: Dict[str, str] = {}
+        for element, key in keyed:
+            for ancestor in chain([element], element.iterancestors()):
+                slugs = slugs_within.get(ancestor)
+                if slugs:
+                    if len(slugs) == 1:
+                        keys.setdefault(next(iter(slugs)), key)
+                    break
+        return keys
+
+
+async def resolve_project_keys(
+    listing_urls: Sequence[str],
+    session: ClientSession,
+    deadline: Optional[Deadline] = None,
+    parser: Optional[GalleryListingParser] = None,
+) -> Dict[str, str]:
+    """
+    Fetches the listing pages concurrently and extracts the project keys on them.
+
+    A listing page that cannot be fetched resolves no keys, its projects
+    fall back to their own pages.
+
+    :param listing_urls: URLs of the gallery listing pages.
+    :param session: The HTTP session to use for fetching data.
+    :param deadline: Deadline of the job, or None to apply only the stage timeout.
+    :param parser: GalleryListingParser, or None for the configured one.
+    :return: Project keys by project slug.
+    """
+    deadline = deadline or Deadline()
+    parser = parser or GalleryListingParser()
+
+    async def resolve(url: str) -> Dict[str, str]:
+        try:
+            async with deadline.timeout(HTML_FETCH_TIMEOUT_SECONDS):
+                html_data = await AsyncHTMLDataFetcher(
+                    html_hedge_policy
+                ).fetch_data(url, session)
+        except TimeoutError:
+            logger.error(f"Timed out fetching listing page: {url}")
+            return {}
+        if html_data is None:
+            return {}
+        with loop_monitor.stage("parse_listing"):
+            return parser.parse(str(html_data))
+
+    keys: Dict[str, str] = {}
+    for listing_keys in await asyncio.gather(*map(resolve, listing_urls)):
+        keys.update(listing_keys)
+    logger.info(
+        f"Resolved {len(keys)} project keys "
+        f"from {len(listing_urls)} listing pages"
+    )
+    return keys
@@ -0,0 +1,183 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from app.config import (
+    HEDGE_LATENCY_PERCENTILE,
+    HEDGE_MAX_RATIO,
+    HEDGE_MIN_SAMPLES,
+    HEDGING_ENABLED,
+)
+from app.logger import logger
+from app.metrics import LatencyTracker
+from app.request_scheduler import on_slot_granted
+
+T = TypeVar("T")
+
+
+class HedgePolicy:
+    """
+    Sends a duplicate (hedge) request when a request is slower than a
+    tracked latency percentile, and uses whichever response arrives first.
+
+    The number of hedges is capped to a fraction of all requests, so the
+    extra load on the upstream stays bounded.
+
+    Attributes:
+        name (str): Name of the stage the policy is used for.
+        enabled (bool): Whether hedge requests are sent.
+        percentile (float): Latency percentile after which a hedge is sent.
+        max_ratio (float): Maximum ratio of hedges to requests.
+        min_samples (int): Number of latencies needed before hedging starts.
+        tracker (LatencyTracker): Latencies of recent successful requests.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        enabled: bool = HEDGING_ENABLED,
+        percentile: float = HEDGE_LATENCY_PERCENTILE,
+        max_ratio: float = HEDGE_MAX_RATIO,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+    ) -> None:
+        """
+        :param name: Name of the stage the policy is used for.
+        :param enabled: Whether hedge requests are sent.
+        :param percentile: Latency percentile after which a hedge is sent.
+        :param max_ratio: Maximum ratio of hedges to requests.
+        :param min_samples: Number of latencies needed before hedging starts.
+        """
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.tracker = LatencyTracker()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        :return: Seconds to wait before hedging, or None if hedging is off.
+        """
+        if not self.enabled or len(self.tracker) < self.min_samples:
+            return None
+        return self.tracker.percentile(self.percentile)
+
+    def _budget_allows(self) -> bool:
+        """
+        :return: True if another hedge stays within the hedge budget.
+        """
+        return self.hedges + 1 <= self.max_ratio * self.requests
+
+    async def _timed(
+        self,
+        request: Callable[[], Awaitable[Optional[T]]],
+        granted: asyncio.Event,
+    ) -> Optional[T]:
+        """
+        Runs a request and records its latency if it succeeded.
+
+        The latency is measured from the moment the scheduler granted the
+        request a slot, so time spent queued behind the local request budget
+        is not taken for upstream latency.
+
+        :param request: Coroutine function sending the request.
+        :param granted: Event set once the request was granted a slot.
+        :return: The result of the request.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        def slot_granted() -> None:
+            nonlocal started
+            started = loop.time()
+            granted.set()
+
+        # runs in its own task, so the callback only applies to this request
+        on_slot_granted.set(slot_granted)
+        result = await request()
+        if result is not None:
+            self.tracker.record(loop.time() - started)
+        return result
+
+    async def run(
+        self,
+        request: Callable[[], Awaitable[Optional[T]]],
+        scheduled: bool = False,
+    ) -> Optional[T]:
+        """
+        Runs a request, hedging it if it is slow.
+
+        A result of None is treated as a failure, in which case the other
+        request, if any, is awaited. The losing request is cancelled.
+
+        The hedge delay of a scheduled request only starts once the scheduler
+        granted it a slot, so requests waiting for their turn are not hedged,
+        which would only make the queue longer.
+
+        :param request: Coroutine function sending the request.
+        :param scheduled: Whether the request waits for a scheduler slot first.
+        :return: The first successful result, or None if all requests failed.
+        """
+        self.requests += 1
+        delay = self.hedge_delay()
+        granted = asyncio.Event()
+        if not scheduled:
+            granted.set()
+        primary = asyncio.create_task(self._timed(request, granted))
+        tasks: List["asyncio.Task[Any]"] = [primary]
+        try:
+            if delay is None:
+                return await primary
+
+            waiting = asyncio.create_task(granted.wait())
+            tasks.append(waiting)
+            await asyncio.wait(
+                {primary, waiting}, return_when=asyncio.FIRST_COMPLETED
+            )
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._budget_allows():
+                return await primary
+
+            self.hedges += 1
+            logger.info(f"Hedging {self.name} request after {delay:.3f}s")
+            hedge = asyncio.create_task(self._timed(request, asyncio.Event()))
+            tasks.append(hedge)
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None and task.result() is not None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+            # both requests failed, report the primary failure
+            return await primary
+        finally:
+            # cancels the losing request, or both if the caller was cancelled
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Hedging counters and the current hedge delay.
+        """
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": (
+                self.hedge_wins / self.hedges if self.hedges else 0.0
+            ),
+            "hedge_delay": self.hedge_delay(),
+        }
+
+
+# Hedge policies of the project page and project API stages
+html_hedge_policy = HedgePolicy("html")
+api_hedge_policy = HedgePolicy("api")
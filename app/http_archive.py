@@ -0,0 +1,522 @@
+import asyncio
+import gzip
+import json
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from types import TracebackType
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+import httpx
+
+from app.config import (
+    API_MAX_BODY_BYTES,
+    HTML_MAX_BODY_BYTES,
+    HTTP_ARCHIVE_LATENCY_SCALE,
+    HTTP_ARCHIVE_MODE,
+    HTTP_ARCHIVE_PATH,
+)
+from app.locks import flocked
+from app.logger import logger
+from app.transports import ArchiveMissError, ClientSession, iter_chunks
+
+HTTP_ARCHIVE_MODES: Tuple[str, ...] = ("off", "record", "replay")
+
+
+@dataclass
+class ArchivedResponse:
+    """
+    Data class describing a recorded response.
+
+    The body is kept as text, bytes that are not valid UTF-8 are preserved
+    as surrogate escapes.
+    """
+
+    url: str
+    status: int
+    headers: List[Tuple[str, str]]
+    body: str
+    # Seconds until the response headers and until the whole body was received
+    ttfb: float
+    elapsed: float
+
+
+class RecordingResponse:
+    """
+    Response of the recorded session, recording the body once it is read.
+
+    Bodies larger than the limit of the archive are not recorded, and are
+    not buffered past the limit either.
+    """
+
+    def __init__(
+        self, archive: "HTTPArchive", url: str, response: Any, started: float
+    ) -> None:
+        """
+        :param archive: The archive to record the response to.
+        :param url: The requested URL.
+        :param response: The response of the wrapped session.
+        :param started: Monotonic time the request was sent at.
+        """
+        self._archive = archive
+        self._url = url
+        self._response = response
+        self._started = started
+        self._ttfb = time.monotonic() - started
+
+    @property
+    def status(self) -> int:
+        """
+        :return: The HTTP status code of the response.
+        """
+        return self._response.status
+
+    @property
+    def headers(self) -> Any:
+        """
+        :return: The headers of the response.
+        """
+        return self._response.headers
+
+    def record(self, body: str) -> None:
+        """
+        Appends the response with the given body to the archive.
+
+        :param body: The response body.
+        """
+        self._archive.append(
+            ArchivedResponse(
+                url=self._url,
+                status=self.status,
+                headers=list(self.headers.items()),
+                body=body,
+                ttfb=self._ttfb,
+                elapsed=time.monotonic() - self._started,
+            )
+        )
+
+    async def read(self) -> bytes:
+        """
+        :return: The response body as bytes.
+        """
+        body = await self._response.read()
+        if self._archive.accepts(len(body)):
+            self.record(body.decode("utf-8", "surrogateescape"))
+        return body
+
+    async def iter_chunked(self, chunk_size: int) -> AsyncIterator[bytes]:
+        """
+        Streams the response body, recording it once it was read completely.
+
+        :param chunk_size: Maximum number of bytes per chunk.
+        :return: Async iterator over the body bytes.
+        """
+        body: Optional[bytearray] = bytearray()
+        async for chunk in iter_chunks(self._response, chunk_size):
+            if body is not None:
+                body += chunk
+                if not self._archive.accepts(len(body)):
+                    logger.warning(f"Body too large to record: {self._url}")
+                    body = None
+            yield chunk
+        if body is not None:
+            self.record(body.decode("utf-8", "surrogateescape"))
+
+    async def text(self) -> str:
+        """
+        :return: The response body as a string.
+        """
+        body = await self._response.text()
+        if self._archive.accepts(len(body)):
+            self.record(body)
+        return body
+
+    async def json(self) -> Any:
+        """
+        :return: The decoded JSON data.
+        """
+        return json.loads(await self.text())
+
+
+class RecordingRequestContext:
+    """
+    Async context manager sending a request through the wrapped session
+    and wrapping its response for recording.
+    """
+
+    def __init__(self, session: "RecordingSession", url: str) -> None:
+        """
+        :param session: The recording session.
+        :param url: The URL to fetch.
+        """
+        self._session = session
+        self._url = url
+        self._request: Any = None
+
+    async def __aenter__(self) -> RecordingResponse:
+        started = time.monotonic()
+        self._request = self._session.session.get(self._url)
+        response = await self._request.__aenter__()
+        recording = RecordingResponse(
+            self._session.archive, self._url, response, started
+        )
+        if recording.status >= 400:
+            # The body of an error response is not read, only its status is replayed
+            recording.record("")
+        return recording
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        await self._request.__aexit__(exc_type, exc_val, exc_tb)
+
+
+class RecordingSession:
+    """
+    Session wrapper recording the responses of the wrapped session.
+
+    Attributes:
+        session (ClientSession): The wrapped HTTP session.
+        archive (HTTPArchive): The archive responses are recorded to.
+    """
+
+    def __init__(self, session: ClientSession, archive: "HTTPArchive") -> None:
+        """
+        :param session: The wrapped HTTP session.
+        :param archive: The archive responses are recorded to.
+        """
+        self.session = session
+        self.archive = archive
+
+    def get(self, url: str) -> RecordingRequestContext:
+        """
+        :param url: The URL to fetch.
+        :return: Async context manager yielding the response.
+        """
+        return RecordingRequestContext(self, url)
+
+
+class ReplayedResponse:
+    """
+    Response served from the archive, through the subset of the aiohttp
+    response interface used by the fetchers.
+    """
+
+    def __init__(self, entry: ArchivedResponse, latency_scale: float) -> None:
+        """
+        :param entry: The recorded response.
+        :param latency_scale: Factor applied to the recorded latency.
+        """
+        self._entry = entry
+        self._latency_scale = latency_scale
+        self.headers = httpx.Headers(entry.headers)
+
+    @property
+    def status(self) -> int:
+        """
+        :return: The recorded HTTP status code.
+        """
+        return self._entry.status
+
+    async def read(self) -> bytes:
+        """
+        Waits for the recorded transfer time of the body.
+
+        :return: The recorded body as bytes.
+        """
+        if self._latency_scale:
+            transfer = self._entry.elapsed - self._entry.ttfb
+            await asyncio.sleep(max(transfer, 0) * self._latency_scale)
+        return self._entry.body.encode("utf-8", "surrogateescape")
+
+    async def iter_chunked(self, chunk_size: int) -> AsyncIterator[bytes]:
+        """
+        Streams the recorded body after its recorded transfer time.
+
+        :param chunk_size: Maximum number of bytes per chunk.
+        :return: Async iterator over the body bytes.
+        """
+        body = await self.read()
+        for start in range(0, len(body), chunk_size):
+            end = start + chunk_size
+            yield body[start:end]
+
+    async def text(self) -> str:
+        """
+        :return: The recorded body as a string.
+        """
+        await self.read()
+        return self._entry.body
+
+    async def json(self) -> Any:
+        """
+        :return: The decoded JSON data.
+        """
+        return json.loads(await self.text())
+
+
+class ReplayRequestContext:
+    """
+    Async context manager serving a recorded response after its recorded
+    time to first byte.
+    """
+
+    def __init__(self, session: "ReplaySession", url: str) -> None:
+        """
+        :param session: The replay session.
+        :param url: The URL to fetch.
+        """
+        self._session = session
+        self._url = url
+
+    async def __aenter__(self) -> ReplayedResponse:
+        archive = self._session.archive
+        entry = archive.lookup(self._url)
+        if entry is None:
+            raise ArchiveMissError(f"{self._url} is not in the HTTP archive")
+        if archive.latency_scale:
+            await asyncio.sleep(entry.ttfb * archive.latency_scale)
+        return ReplayedResponse(entry, archive.latency_scale)
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        pass
+
+
+class ReplaySession:
+    """
+    Session serving responses from the archive without network access.
+
+    Attributes:
+        archive (HTTPArchive): The archive responses are served from.
+    """
+
+    def __init__(self, archive: "HTTPArchive") -> None:
+        """
+        :param archive: The archive responses are served from.
+        """
+        self.archive = archive
+
+    def get(self, url: str) -> ReplayRequestContext:
+        """
+        :param url: The URL to fetch.
+        :return: Async context manager yielding the recorded response.
+        """
+        return ReplayRequestContext(self, url)
+
+
+class HTTPArchive:
+    """
+    Archive of upstream responses for deterministic offline runs.
+
+    In record mode the sessions of generation runs are wrapped so every
+    response read by a fetcher is captured with its status, headers and
+    timing. In replay mode the sessions are replaced by one serving the
+    captured responses, optionally at their recorded latency, so runs are
+    comparable and need no network. The archive is a gzip compressed file
+    with one JSON line per response, the latest response of a URL wins.
+
+    Recorded responses are not kept in memory. Each one is compressed and
+    appended to the file as a gzip member of its own by a writer thread,
+    under a file lock shared by all worker processes. Superseded responses
+    stay in the file until it is compacted explicitly.
+
+    Attributes:
+        file_path (str): Path to the archive file.
+        mode (str): One of HTTP_ARCHIVE_MODES.
+        latency_scale (float): Factor applied to recorded latencies on replay, 0 for none.
+        max_body_bytes (int): Maximum size of a recorded body in bytes, 0 for none.
+    """
+
+    def __init__(
+        self,
+        file_path: str = HTTP_ARCHIVE_PATH,
+        mode: str = HTTP_ARCHIVE_MODE,
+        latency_scale: float = HTTP_ARCHIVE_LATENCY_SCALE,
+        max_body_bytes: int = max(HTML_MAX_BODY_BYTES, API_MAX_BODY_BYTES),
+    ) -> None:
+        """
+        :param file_path: Path to the archive file.
+        :param mode: One of HTTP_ARCHIVE_MODES.
+        :param latency_scale: Factor applied to recorded latencies on replay, 0 for none.
+        :param max_body_bytes: Maximum size of a recorded body in bytes, 0 for
+            none. Defaults to the largest body a fetching stage accepts.
+        """
+        if mode not in HTTP_ARCHIVE_MODES:
+            raise ValueError(
+                f"Unknown HTTP archive mode: {mode}. "
+                f"Expected one of {list(HTTP_ARCHIVE_MODES)}"
+            )
+        self.file_path = file_path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.max_body_bytes = max_body_bytes
+        self._entries: Dict[str, ArchivedResponse] = {}
+        self._loaded = False
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._pending: List["Future[None]"] = []
+        self._recorded = 0
+        self._replayed = 0
+        self._misses = 0
+
+    def wrap(self, session: ClientSession) -> Any:
+        """
+        Wraps the session of a run according to the mode.
+
+        :param session: The HTTP session of the run.
+        :return: The session itself, a RecordingSession or a ReplaySession.
+        """
+        match self.mode:
+            case "record":
+                return RecordingSession(session, self)
+            case "replay":
+                self.load()
+                return ReplaySession(self)
+            case _:
+                return session
+
+    def urls(self) -> List[str]:
+        """
+        :return: The archived URLs in recording order.
+        """
+        self.load()
+        return list(self._entries)
+
+    def accepts(self, size: int) -> bool:
+        """
+        :param size: Size of a response body in bytes.
+        :return: Whether a body of the size is recorded.
+        """
+        return not self.max_body_bytes or size <= self.max_body_bytes
+
+    def add(self, entry: ArchivedResponse) -> None:
+        """
+        Adds a response to the archive in memory, replacing an earlier one of
+        the same URL, e.g. to replay responses that were not recorded.
+
+        :param entry: The response.
+        """
+        self._entries.pop(entry.url, None)
+        self._entries[entry.url] = entry
+
+    def append(self, entry: ArchivedResponse) -> None:
+        """
+        Records a response by appending it to the archive file in the writer
+        thread, without keeping it in memory.
+
+        :param entry: The recorded response.
+        """
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="http-archive"
+            )
+        self._pending = [f for f in self._pending if not f.done()]
+        self._pending.append(self._writer.submit(self._write, entry))
+        self._recorded += 1
+
+    def _write(self, entry: ArchivedResponse) -> None:
+        """
+        Appends a response to the archive file as a gzip member of its own.
+
+        :param entry: The recorded response.
+        """
+        member = gzip.compress((json.dumps(asdict(entry)) + "\n").encode())
+        try:
+            with flocked(f"{self.file_path}.lock"):
+                with open(self.file_path, "ab") as archive_file:
+                    archive_file.write(member)
+        except IOError as e:
+            logger.error(f"IOError: {e}")
+
+    async def flush(self) -> None:
+        """
+        Waits until the recorded responses are written to the archive file.
+        """
+        pending, self._pending = self._pending, []
+        if pending:
+            await asyncio.gather(*map(asyncio.wrap_future, pending))
+
+    def lookup(self, url: str) -> Optional[ArchivedResponse]:
+        """
+        :param url: The requested URL.
+        :return: The recorded response, or None if the URL was not recorded.
+        """
+        entry = self._entries.get(url)
+        if entry is None:
+            self._misses += 1
+        else:
+            self._replayed += 1
+        return entry
+
+    def _read(self) -> Dict[str, ArchivedResponse]:
+        """
+        :return: The latest response of every URL in the archive file.
+        """
+        entries: Dict[str, ArchivedResponse] = {}
+        if not os.path.isfile(self.file_path):
+            return entries
+        try:
+            with gzip.open(self.file_path, "rt") as archive_file:
+                for line in archive_file:
+                    entry = json.loads(line)
+                    entry["headers"] = [tuple(h) for h in entry["headers"]]
+                    entries.pop(entry["url"], None)
+                    entries[entry["url"]] = ArchivedResponse(**entry)
+        except (OSError, EOFError, ValueError, TypeError, KeyError) as e:
+            logger.error(f"Invalid HTTP archive {self.file_path}: {e}")
+        return entries
+
+    def load(self) -> None:
+        """
+        Loads the archive file once, if it exists.
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+        entries = self._read()
+        entries.update(self._entries)
+        self._entries = entries
+        logger.info(
+            f"Loaded {len(self._entries)} responses from {self.file_path}"
+        )
+
+    def compact(self) -> int:
+        """
+        Atomically rewrites the archive file with only the latest response of
+        every URL. Reads the whole archive, so it is meant to be run offline.
+
+        :return: Number of responses kept.
+        """
+        tmp_path = f"{self.file_path}.tmp"
+        with flocked(f"{self.file_path}.lock"):
+            entries = self._read()
+            with gzip.open(tmp_path, "wt") as archive_file:
+                for entry in entries.values():
+                    archive_file.write(json.dumps(asdict(entry)) + "\n")
+            os.replace(tmp_path, self.file_path)
+        logger.info(f"Compacted {self.file_path} to {len(entries)} responses")
+        return len(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Mode, number of archived responses, recorded and replayed responses and misses.
+        """
+        return {
+            "mode": self.mode,
+            "entries": len(self._entries),
+            "recorded": self._recorded,
+            "replayed": self._replayed,
+            "misses": self._misses,
+        }
+
+
+# Archive used by the generation runs of the process
+http_archive = HTTPArchive()
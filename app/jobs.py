@@ -0,0 +1,459 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Optional, Set, Union
+
+from app.config import (
+    CSV_FILE_NAME,
+    CSV_SNAPSHOTS_TO_KEEP,
+    GALLERY_LISTING_URLS,
+    JOB_DEADLINE_SECONDS,
+)
+from app.locks import FileLock
+from app.logger import logger
+from app.negative_cache import NegativeCache
+from app.parse_memo import ParseMemo
+from app.progress import ProgressBroker, RunProgress
+from app.settings import RuntimeSettings
+from app.skip_report import SkipReport
+from app.snapshots import SnapshotStore
+from app.utils import RunOptions, fetch_data_and_save_in_parallel
+
+
+class JobStatus(str, Enum):
+    """
+    Lifecycle states of a generation job.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """
+    Data class describing a generation job and its isolated output.
+    """
+
+    id: str
+    urls: List[str]
+    folder: str
+    weight: float = 1.0
+    deadline_seconds: Optional[float] = JOB_DEADLINE_SECONDS
+    status: JobStatus = JobStatus.PENDING
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def partial_path(self) -> str:
+        """
+        :return: Path to the partial CSV file of the job.
+        """
+        return os.path.join(self.folder, f"{CSV_FILE_NAME}.partial")
+
+    @property
+    def checkpoint_path(self) -> str:
+        """
+        :return: Path to the checkpoint journal of the job.
+        """
+        return os.path.join(self.folder, f"{CSV_FILE_NAME}.journal")
+
+    @property
+    def lock_path(self) -> str:
+        """
+        :return: Path to the lock file held by the worker running the job.
+        """
+        return os.path.join(self.folder, "job.lock")
+
+    @property
+    def report_path(self) -> str:
+        """
+        :return: Path to the skip report of the job.
+        """
+        return os.path.join(self.folder, f"{CSV_FILE_NAME}.skipped.json")
+
+    @property
+    def snapshot_store(self) -> SnapshotStore:
+        """
+        :return: SnapshotStore holding the published outputs of the job.
+        """
+        return SnapshotStore(
+            os.path.join(self.folder, "snapshots"),
+            CSV_FILE_NAME,
+            keep=CSV_SNAPSHOTS_TO_KEEP,
+        )
+
+    @property
+    def resumable(self) -> bool:
+        """
+        :return: Whether the job has failed or was cut by its deadline, so a run
+                 can continue it from its checkpoint journal.
+        """
+        return self.status == JobStatus.FAILED or (
+            self.status == JobStatus.COMPLETED
+            and os.path.exists(self.checkpoint_path)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serializes the job for API responses.
+
+        :return: Dictionary with the job state.
+        """
+        snapshot = self.snapshot_store.latest()
+        report = SkipReport.read(self.report_path)
+        return {
+            "id": self.id,
+            "status": self.status.value,
+            "url_count": len(self.urls),
+            "weight": self.weight,
+            "deadline_seconds": self.deadline_seconds,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "resumable": self.resumable,
+            "snapshot_version": snapshot.version if snapshot else None,
+            "skipped_count": report["skipped_count"] if report else None,
+            "deadline_exceeded": (
+                report["deadline_exceeded"] if report else None
+            ),
+        }
+
+
+class MemoryJobStore:
+    """
+    Registry of jobs kept in the memory of a single worker process.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, Job] = {}
+
+    def save(self, job: Job) -> None:
+        """
+        :param job: The job to store.
+        """
+        self._jobs[job.id] = job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        :param job_id: ID of the job.
+        :return: The Job, or None if it does not exist.
+        """
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        """
+        :return: All jobs in order of creation.
+        """
+        return list(self._jobs.values())
+
+
+class SQLiteJobStore:
+    """
+    Registry of jobs in an SQLite database, shared by all worker processes
+    on the host.
+
+    Calls block while another process holds a write lock on the database,
+    so they are meant to be run in a thread.
+
+    Attributes:
+        path (str): Path to the database file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: Path to the database file, created if missing.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, created_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Opens a connection committing on success and closed afterwards.
+        """
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _load(data: str) -> Job:
+        """
+        :param data: The job serialized as JSON.
+        :return: The deserialized Job.
+        """
+        fields = json.loads(data)
+        fields["status"] = JobStatus(fields["status"])
+        return Job(**fields)
+
+    def save(self, job: Job) -> None:
+        """
+        :param job: The job to store.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO jobs (id, created_at, data) VALUES (?, ?, ?)",
+                (job.id, job.created_at, json.dumps(asdict(job))),
+            )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        :param job_id: ID of the job.
+        :return: The Job, or None if it does not exist.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT data FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._load(row[0]) if row else None
+
+    def list(self) -> List[Job]:
+        """
+        :return: All jobs in order of creation.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT data FROM jobs ORDER BY created_at"
+            ).fetchall()
+        return [self._load(row[0]) for row in rows]
+
+
+JobStore = Union[MemoryJobStore, SQLiteJobStore]
+
+
+class JobManager:
+    """
+    Creates and runs generation jobs concurrently in the background.
+
+    Every job gets its own folder with a separate CSV writer, checkpoint
+    journal and snapshot store, while all jobs share the same fetching and
+    parsing pipeline.
+
+    Jobs are registered in a job store, which can be shared by several worker
+    processes. A job runs in the worker that started it, which holds the lock
+    file of the job until it has finished. A job left running by a worker that
+    exited is reported as failed. A failed job, or a job cut by its deadline,
+    can be resumed: the new run restores the completed projects from the
+    checkpoint journal of the job and fetches only the remaining ones.
+    Store calls run in a thread, so a database locked by another worker does
+    not block the event loop.
+
+    Attributes:
+        folder (str): Folder containing the job folders.
+        max_concurrent_tasks (int): Concurrency limit of a single job.
+        negative_cache (Optional[NegativeCache]): Cache of failing URLs shared by all jobs.
+        parse_memo (Optional[ParseMemo]): Memo of parse results shared by all jobs.
+        store (JobStore): Registry of the jobs.
+        settings (Optional[RuntimeSettings]): Runtime settings overriding max_concurrent_tasks,
+            followed by running jobs.
+        progress_broker (Optional[ProgressBroker]): Broker the progress of the runs is
+            published to, tagged with the job ID.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        max_concurrent_tasks: int,
+        negative_cache: Optional[NegativeCache] = None,
+        parse_memo: Optional[ParseMemo] = None,
+        store: Optional[JobStore] = None,
+        settings: Optional[RuntimeSettings] = None,
+        progress_broker: Optional[ProgressBroker] = None,
+    ) -> None:
+        """
+        :param folder: Folder containing the job folders.
+        :param max_concurrent_tasks: Concurrency limit of a single job.
+        :param negative_cache: Cache of failing URLs shared by all jobs.
+        :param parse_memo: Memo of parse results shared by all jobs.
+        :param store: Registry of the jobs, in memory of this process by default.
+        :param settings: Runtime settings overriding max_concurrent_tasks, followed by running jobs.
+        :param progress_broker: Broker to publish the progress of the runs to, or None.
+        """
+        self.folder = folder
+        self.max_concurrent_tasks = max_concurrent_tasks
+        self.negative_cache = negative_cache
+        self.parse_memo = parse_memo
+        self.store: JobStore = store or MemoryJobStore()
+        self.settings = settings
+        self.progress_broker = progress_broker
+        self._tasks: Set[asyncio.Task] = set()
+        self._running: Set[str] = set()
+
+    async def create(
+        self,
+        urls: List[str],
+        weight: float = 1.0,
+        deadline_seconds: Optional[float] = JOB_DEADLINE_SECONDS,
+    ) -> Job:
+        """
+        Registers a new job for the given URLs.
+
+        :param urls: The URLs to fetch data from.
+        :param weight: Share of the outbound request budget of the job.
+        :param deadline_seconds: Time budget of the job, None or 0 for no deadline.
+        :return: The created Job.
+        """
+        job_id = uuid.uuid4().hex
+        job = Job(
+            id=job_id,
+            urls=urls,
+            folder=os.path.join(self.folder, job_id),
+            weight=weight,
+            deadline_seconds=deadline_seconds,
+        )
+        os.makedirs(job.folder, exist_ok=True)
+        await asyncio.to_thread(self.store.save, job)
+        logger.info(f"Created job {job_id} with {len(urls)} URLs")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """
+        :param job_id: ID of the job.
+        :return: The Job, or None if it does not exist.
+        """
+        job = await asyncio.to_thread(self.store.get, job_id)
+        return await self._detect_orphan(job) if job else None
+
+    async def list(self) -> List[Job]:
+        """
+        :return: All jobs in order of creation.
+        """
+        jobs = await asyncio.to_thread(self.store.list)
+        return [await self._detect_orphan(job) for job in jobs]
+
+    async def _detect_orphan(self, job: Job) -> Job:
+        """
+        Marks a job as failed if the worker running it has exited.
+
+        :param job: The job as read from the store.
+        :return: The current state of the job.
+        """
+        if job.status != JobStatus.RUNNING or job.id in self._running:
+            return job
+        lock = FileLock(job.lock_path)
+        if not lock.try_acquire():
+            return job  # still running in another worker
+        try:
+            # re-read, the job may have finished before the lock was taken
+            current = await asyncio.to_thread(self.store.get, job.id) or job
+            if current.status == JobStatus.RUNNING:
+                current.status = JobStatus.FAILED
+                current.error = "Worker running the job exited"
+                current.finished_at = time.time()
+                await asyncio.to_thread(self.store.save, current)
+            return current
+        finally:
+            lock.release()
+
+    def start(self, job: Job) -> asyncio.Task:
+        """
+        Runs the job in a background task.
+
+        :param job: The job to run.
+        :return: The task running the job.
+        """
+        task = asyncio.create_task(self.run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def resume(self, job: Job) -> asyncio.Task:
+        """
+        Runs a failed job, or a job cut by its deadline, again in a background
+        task, continuing from its checkpoint journal.
+
+        :param job: The job to resume.
+        :return: The task running the job.
+        :raises ValueError: If the job is pending, running or fully completed.
+        """
+        if not job.resumable:
+            raise ValueError(
+                f"Job {job.id} cannot be resumed: {job.status.value}"
+            )
+        job.status = JobStatus.PENDING
+        job.error = None
+        job.finished_at = None
+        await asyncio.to_thread(self.store.save, job)
+        logger.info(f"Resuming job {job.id}")
+        return self.start(job)
+
+    async def run(self, job: Job) -> None:
+        """
+        Runs the job and records its final state, unless another worker
+        is already running it.
+
+        :param job: The job to run.
+        """
+        lock = FileLock(job.lock_path)
+        if not lock.try_acquire():
+            logger.warning(f"Job {job.id} is already running elsewhere")
+            return
+        self._running.add(job.id)
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        await asyncio.to_thread(self.store.save, job)
+        progress = (
+            RunProgress(self.progress_broker, job.id, len(job.urls))
+            if self.progress_broker
+            else None
+        )
+        if progress:
+            progress.start()
+        try:
+            snapshot = await fetch_data_and_save_in_parallel(
+                job.urls,
+                (
+                    self.settings.max_concurrent_tasks
+                    if self.settings
+                    else self.max_concurrent_tasks
+                ),
+                checkpoint_path=job.checkpoint_path,
+                job_id=job.id,
+                snapshot_store=job.snapshot_store,
+                output_path=job.partial_path,
+                options=RunOptions(
+                    weight=job.weight,
+                    negative_cache=self.negative_cache,
+                    parse_memo=self.parse_memo,
+                    deadline_seconds=job.deadline_seconds,
+                    report_path=job.report_path,
+                    progress=progress,
+                    settings=self.settings,
+                    listing_urls=GALLERY_LISTING_URLS,
+                ),
+            )
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            if progress:
+                progress.finish(None, job.error)
+        else:
+            job.status = JobStatus.COMPLETED
+            if progress:
+                progress.finish(snapshot)
+        finally:
+            job.finished_at = time.time()
+            await asyncio.to_thread(self.store.save, job)
+            self._running.discard(job.id)
+            lock.release()
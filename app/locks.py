@@ -0,0 +1,101 @@
+import asyncio
+import fcntl
+import os
+from contextlib import contextmanager
+from types import TracebackType
+from typing import Iterator, Optional, Type
+
+
+class FileLock:
+    """
+    Exclusive lock on a file shared by all processes on the host.
+
+    Uses flock, so the lock is released by the operating system if the
+    holding process exits. Waiting is done by polling, which keeps the event
+    loop free while another process holds the lock.
+
+    Attributes:
+        path (str): Path to the lock file.
+        poll_interval (float): Seconds between attempts to take a held lock.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.1) -> None:
+        """
+        :param path: Path to the lock file, created if missing.
+        :param poll_interval: Seconds between attempts to take a held lock.
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    def locked(self) -> bool:
+        """
+        :return: True if this instance holds the lock.
+        """
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """
+        Takes the lock if it is free.
+
+        :return: True if the lock was taken.
+        """
+        if self._fd is not None:
+            return False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    async def acquire(self) -> None:
+        """
+        Waits until the lock is taken.
+        """
+        while not self.try_acquire():
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self) -> None:
+        """
+        Releases the lock.
+        """
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    async def __aenter__(self) -> "FileLock":
+        await self.acquire()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.release()
+
+
+@contextmanager
+def flocked(path: str, shared: bool = False) -> Iterator[None]:
+    """
+    Holds a flock on a lock file for a short critical section, such as
+    merging a file written by several worker processes. Waiting blocks,
+    so it is not meant for sections held across awaits.
+
+    :param path: Path to the lock file, created if missing.
+    :param shared: Whether to take a shared lock for reading instead of an exclusive one.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from types import FrameType
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from app.config import (
+    LOOP_LAG_THRESHOLD_SECONDS,
+    LOOP_MONITOR_INTERVAL_SECONDS,
+)
+from app.logger import logger
+from app.metrics import LatencyTracker
+
+LOGGING_FOLDER = os.path.dirname(logging.__file__)
+
+
+@dataclass
+class BlockingEvent:
+    """
+    Data class describing a period in which the event loop was blocked.
+    """
+
+    started_at: float
+    duration: float
+    stage: str
+    stack: List[str]
+
+
+class LoopLagMonitor:
+    """
+    Measures the scheduling delay of the event loop and captures what
+    blocks it.
+
+    A heartbeat task sleeps for a fixed interval and records how late it is
+    woken up. A watchdog thread notices a missed heartbeat while the loop is
+    still blocked, and records the stack of the loop thread together with the
+    pipeline stage marked as running, so the blocking time can be attributed
+    to parsing, CSV writing, logging or other synchronous work.
+
+    Attributes:
+        interval (float): Seconds between heartbeats.
+        threshold (float): Lag in seconds after which the loop counts as blocked.
+        tracker (LatencyTracker): Recent lag samples.
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL_SECONDS,
+        threshold: float = LOOP_LAG_THRESHOLD_SECONDS,
+        max_events: int = 50,
+    ) -> None:
+        """
+        :param interval: Seconds between heartbeats.
+        :param threshold: Lag in seconds after which the loop counts as blocked.
+        :param max_events: Number of most recent blocking events kept.
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.tracker = LatencyTracker()
+        self.max_lag = 0.0
+        self.blocked_seconds: Dict[str, float] = defaultdict(float)
+        self.blocking_events: Deque[BlockingEvent] = deque(maxlen=max_events)
+        self._stage: Optional[str] = None
+        self._beat_at = 0.0
+        self._pending: Optional[BlockingEvent] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        """
+        :return: True if the heartbeat task is running.
+        """
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """
+        Starts the heartbeat task on the running loop and the watchdog thread.
+        """
+        if self.is_running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat_at = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """
+        Stops the heartbeat task and the watchdog thread.
+        """
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join()
+            self._watchdog = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Marks synchronous work of a pipeline stage, for attributing blocking time.
+
+        Must not span an await, as other tasks would run under the same mark.
+
+        :param name: Name of the stage.
+        """
+        previous, self._stage = self._stage, name
+        try:
+            yield
+        finally:
+            self._stage = previous
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Lag percentiles and blocking time per stage.
+        """
+        return {
+            "running": self.is_running,
+            "samples": len(self.tracker),
+            "lag_p50": self.tracker.percentile(0.5),
+            "lag_p99": self.tracker.percentile(0.99),
+            "lag_max": self.max_lag,
+            "blocking_events": len(self.blocking_events),
+            "blocked_seconds_by_stage": dict(self.blocked_seconds),
+        }
+
+    def events(self) -> List[Dict[str, Any]]:
+        """
+        :return: The most recent blocking events with stacks, newest first.
+        """
+        return [asdict(event) for event in reversed(self.blocking_events)]
+
+    async def _heartbeat(self) -> None:
+        """
+        Sleeps for the interval and records how late the loop woke up.
+        """
+        while True:
+            self._beat_at = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - self._beat_at - self.interval, 0.0)
+            self._record(lag)
+
+    def _record(self, lag: float) -> None:
+        """
+        Records a lag sample and completes the pending blocking event.
+
+        :param lag: Scheduling delay of the heartbeat in seconds.
+        """
+        self.tracker.record(lag)
+        self.max_lag = max(self.max_lag, lag)
+        event, self._pending = self._pending, None
+        if lag < self.threshold:
+            return
+        if event is None:
+            # blocked too briefly for the watchdog to capture the stack
+            event = BlockingEvent(time.time() - lag, 0.0, "unknown", [])
+        event.duration = lag
+        self.blocked_seconds[event.stage] += lag
+        self.blocking_events.append(event)
+        logger.warning(
+            f"Event loop blocked for {lag:.3f}s in stage {event.stage}"
+        )
+
+    def _watch(self) -> None:
+        """
+        Captures the loop thread stack when a heartbeat is late.
+        """
+        while not self._stopped.wait(self.threshold / 2):
+            if self._pending is not None:
+                continue
+            late = time.monotonic() - self._beat_at - self.interval
+            if late < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id or 0)
+            if frame is None:
+                continue
+            self._pending = BlockingEvent(
+                started_at=time.time() - late,
+                duration=late,
+                stage=self._attribute(frame, self._stage),
+                stack=traceback.format_stack(frame),
+            )
+
+    @staticmethod
+    def _attribute(frame: FrameType, stage: Optional[str]) -> str:
+        """
+        Attributes a blocked loop to a stage.
+
+        :param frame: The innermost frame of the loop thread.
+        :param stage: Stage marked as running, if any.
+        :return: "logging" if the loop blocks in a logging handler, otherwise the
+            marked stage, or "other".
+        """
+        current: Optional[FrameType] = frame
+        while current is not None:
+            if current.f_code.co_filename.startswith(LOGGING_FOLDER):
+                return "logging"
+            current = current.f_back
+        return stage or "other"
+
+
+# Monitor of the event loop serving the app
+loop_monitor = LoopLagMonitor()
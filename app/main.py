@@ -1,16 +1,250 @@
-from fastapi import FastAPI, Response
-from fastapi.responses import FileResponse
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from functools import partial
+from typing import Any, AsyncIterator, Coroutine, Dict, Optional, Set, Union
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import (
+    FileResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 
 from app.config import (
+    CSV_FILE_NAME,
     CSV_FILE_PATH,
+    CSV_REFRESH_INTERVAL_SECONDS,
+    CSV_SNAPSHOTS_FOLDER_PATH,
+    CSV_SNAPSHOTS_TO_KEEP,
+    GALLERY_LISTING_URLS,
+    GENERATION_LOCK_PATH,
+    JOB_DEADLINE_SECONDS,
+    JOBS_DATABASE_PATH,
+    JOBS_FOLDER_PATH,
     LIST_OF_PROJECTS,
+    LOOP_MONITOR_ENABLED,
     MAIN_PAGE_HTML_PATH,
     MAX_CONCURRENT_TASKS,
+    MULTI_WORKER_MODE,
+    NEGATIVE_CACHE_ADMIN_ENABLED,
+    NEGATIVE_CACHE_BASE_TTL_SECONDS,
+    NEGATIVE_CACHE_FILE_PATH,
+    NEGATIVE_CACHE_MAX_TTL_SECONDS,
+    PARSE_MEMO_FILE_PATH,
+    PARSE_MEMO_MAX_ENTRIES,
+    PROFILING_ENABLED,
+    PROFILING_MAX_SECONDS,
+    PROGRESS_HEARTBEAT_SECONDS,
+    RUNTIME_SETTINGS_ENABLED,
+    SKIP_REPORT_FILE_PATH,
 )
+from app.hedging import api_hedge_policy, html_hedge_policy
+from app.http_archive import http_archive
+from app.jobs import Job, JobManager, SQLiteJobStore
+from app.locks import FileLock
 from app.logger import logger
-from app.utils import fetch_data_and_save_in_parallel
+from app.loop_monitor import loop_monitor
+from app.metrics import metrics
+from app.negative_cache import NegativeCache
+from app.parse_memo import JSON_PARSER_VERSION, ParseMemo
+from app.profiler import ProfileReport, profiler
+from app.progress import ProgressBroker, RunProgress, format_sse
+from app.refresher import PeriodicRefresher
+from app.request_scheduler import request_scheduler
+from app.responses import conditional_file_response
+from app.schemas import GenerationJobRequest, RuntimeSettingsUpdate
+from app.settings import runtime_settings
+from app.skip_report import SkipReport
+from app.snapshots import SnapshotStore
+from app.stats import SnapshotStats
+from app.utils import RunOptions, fetch_data_and_save_in_parallel
+
+snapshot_store = SnapshotStore(
+    CSV_SNAPSHOTS_FOLDER_PATH,
+    CSV_FILE_NAME,
+    current_path=CSV_FILE_PATH,
+    keep=CSV_SNAPSHOTS_TO_KEEP,
+)
+
+negative_cache = NegativeCache(
+    NEGATIVE_CACHE_FILE_PATH,
+    NEGATIVE_CACHE_BASE_TTL_SECONDS,
+    NEGATIVE_CACHE_MAX_TTL_SECONDS,
+)
+
+parse_memo = ParseMemo(
+    PARSE_MEMO_FILE_PATH, PARSE_MEMO_MAX_ENTRIES, JSON_PARSER_VERSION
+)
+
+# Progress of generation runs and jobs streamed to the page. Subscribers
+# only receive the runs of their own worker process.
+progress_broker = ProgressBroker()
+metrics.register("progress", progress_broker.stats)
+
+job_manager = JobManager(
+    JOBS_FOLDER_PATH,
+    MAX_CONCURRENT_TASKS,
+    negative_cache,
+    parse_memo,
+    SQLiteJobStore(JOBS_DATABASE_PATH) if MULTI_WORKER_MODE else None,
+    runtime_settings,
+    progress_broker,
+)
+
+# Runtime settings applied to the live components, running jobs follow
+# max_concurrent_tasks themselves
+runtime_settings.watch(
+    "global_max_concurrent_requests",
+    lambda value: request_scheduler.configure(max_concurrency=value),
+)
+runtime_settings.watch(
+    "global_max_requests_per_second",
+    lambda value: request_scheduler.configure(max_requests_per_second=value),
+)
+for hedge_policy in (html_hedge_policy, api_hedge_policy):
+    runtime_settings.watch(
+        "hedging_enabled", partial(setattr, hedge_policy, "enabled")
+    )
+    runtime_settings.watch(
+        "hedge_max_ratio", partial(setattr, hedge_policy, "max_ratio")
+    )
+runtime_settings.watch(
+    "parse_memo_max_entries", partial(setattr, parse_memo, "max_entries")
+)
+
+metrics.register("request_scheduler", request_scheduler.stats)
+metrics.register("hedging.html", html_hedge_policy.stats)
+metrics.register("hedging.api", api_hedge_policy.stats)
+metrics.register("parse_memo", parse_memo.stats)
+metrics.register("event_loop", loop_monitor.stats)
+metrics.register("http_archive", http_archive.stats)
+
+# Summary statistics of the latest snapshot, cached per snapshot version
+snapshot_stats = SnapshotStats(snapshot_store)
+
+# Generation runs started in the background, referenced until they finish
+background_tasks: Set[asyncio.Task] = set()
+
+# Serializes manual and periodic generation runs, across all workers in
+# multi-worker mode
+generation_lock: Union[asyncio.Lock, FileLock] = (
+    FileLock(GENERATION_LOCK_PATH) if MULTI_WORKER_MODE else asyncio.Lock()
+)
+
+
+def run_in_background(coroutine: Coroutine[Any, Any, None]) -> asyncio.Task:
+    """
+    Runs a coroutine as a task referenced until it finishes, logging its failure.
+
+    :param coroutine: The coroutine to run.
+    :return: The task running the coroutine.
+    """
+
+    def done(task: asyncio.Task) -> None:
+        background_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Background task failed: {task.exception()!r}")
+
+    task = asyncio.create_task(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(done)
+    return task
+
+
+async def precompute_stats() -> None:
+    """
+    Computes the statistics of the latest snapshot, so /stats answers right away.
+    """
+    try:
+        await snapshot_stats.get()
+    except ValueError as e:
+        logger.error(f"Could not compute snapshot statistics: {e}")
+
+
+async def refresh_csv(max_age: Optional[float] = None) -> None:
+    """
+    Fetches data from a list of URLs and publishes a new CSV snapshot.
+
+    :param max_age: Skip the run if the latest snapshot is younger than this many
+        seconds, e.g. because another worker has just refreshed it.
+    """
+    async with generation_lock:
+        latest = snapshot_store.latest()
+        if max_age and latest and time.time() - latest.created_at < max_age:
+            logger.info("CSV snapshot is up to date, skipping refresh")
+            return
+        progress = RunProgress(
+            progress_broker, "default", len(LIST_OF_PROJECTS)
+        )
+        progress.start()
+        try:
+            snapshot = await fetch_data_and_save_in_parallel(
+                LIST_OF_PROJECTS,
+                runtime_settings.max_concurrent_tasks,
+                snapshot_store=snapshot_store,
+                options=RunOptions(
+                    negative_cache=negative_cache,
+                    parse_memo=parse_memo,
+                    report_path=SKIP_REPORT_FILE_PATH,
+                    progress=progress,
+                    settings=runtime_settings,
+                    listing_urls=GALLERY_LISTING_URLS,
+                ),
+            )
+        except Exception as e:
+            progress.finish(None, str(e))
+            raise
+        progress.finish(snapshot)
+    if snapshot:
+        run_in_background(precompute_stats())
+
+
+refresher = PeriodicRefresher(
+    partial(refresh_csv, max_age=CSV_REFRESH_INTERVAL_SECONDS),
+    CSV_REFRESH_INTERVAL_SECONDS,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Starts the event loop monitor and the periodic CSV refresh, if enabled,
+    for the app lifetime.
+    """
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    if CSV_REFRESH_INTERVAL_SECONDS > 0:
+        refresher.start()
+    yield
+    progress_broker.close()
+    await refresher.stop()
+    await loop_monitor.stop()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+
+
+def snapshot_response(request: Request, store: SnapshotStore) -> Response:
+    """
+    Serves the latest snapshot of the store or raises 404.
+
+    :param request: The incoming request.
+    :param store: The SnapshotStore to serve the latest snapshot from.
+    :return: The file response.
+    """
+    snapshot = store.latest()
+    if not snapshot:
+        raise HTTPException(
+            status_code=404, detail="CSV file has not been generated yet"
+        )
+    return conditional_file_response(
+        request,
+        store.snapshot_path(snapshot),
+        snapshot.etag,
+        filename=CSV_FILE_NAME,
+    )
 
 
 @app.get("/")
@@ -23,22 +257,317 @@ async def main_page():
 
 
 @app.get("/generate-csv")
-async def generate_csv():
+async def generate_csv(background: bool = False):
     """
     Fetches data from a list of URLs and saves it to a CSV file.
+    With background=true, responds immediately while the progress of the run
+    is streamed by /progress.
     """
-    await fetch_data_and_save_in_parallel(
-        LIST_OF_PROJECTS, MAX_CONCURRENT_TASKS
-    )
+    if background:
+        run_in_background(refresh_csv())
+        return Response(status_code=202)
+    await refresh_csv()
     return Response(status_code=200)
 
 
+@app.get("/progress")
+async def stream_progress():
+    """
+    Streams the progress of generation runs as Server-Sent Events: the latest
+    snapshot, then the start, every project and the end of each run.
+    Not available in multi-worker mode, where a run and the stream are
+    likely served by different workers.
+    """
+    if MULTI_WORKER_MODE:
+        raise HTTPException(
+            status_code=404,
+            detail="Progress stream is not available in multi-worker mode",
+        )
+    snapshot = snapshot_store.latest()
+
+    async def events() -> AsyncIterator[str]:
+        if snapshot:
+            yield format_sse(
+                ("snapshot", {"snapshot_version": snapshot.version})
+            )
+        async for event in progress_broker.subscribe(
+            PROGRESS_HEARTBEAT_SECONDS
+        ):
+            yield format_sse(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/download-csv", response_class=FileResponse)
-async def download_csv():
+async def download_csv(request: Request):
+    """
+    Downloads the latest complete CSV snapshot.
+    Supports conditional requests with If-None-Match and resuming with Range.
+    """
+    return snapshot_response(request, snapshot_store)
+
+
+def skip_report_response(report_path: str) -> Dict[str, Any]:
+    """
+    Returns the skip report of the latest run or raises 404.
+
+    :param report_path: Path to the skip report.
+    :return: The report content.
+    """
+    report = SkipReport.read(report_path)
+    if report is None:
+        raise HTTPException(
+            status_code=404, detail="Skip report has not been generated yet"
+        )
+    return report
+
+
+@app.get("/skip-report")
+async def get_skip_report():
+    """
+    Returns the URLs skipped by the latest generation run and why.
+    """
+    return skip_report_response(SKIP_REPORT_FILE_PATH)
+
+
+@app.get("/stats")
+async def get_stats():
+    """
+    Returns summary statistics of the floor and room counts in the latest
+    CSV snapshot: count, mean, percentiles, histograms and rooms per floor.
+    """
+    try:
+        stats = await snapshot_stats.get()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if stats is None:
+        raise HTTPException(
+            status_code=404, detail="CSV file has not been generated yet"
+        )
+    return stats
+
+
+async def get_job_or_404(job_id: str) -> Job:
+    """
+    Returns the job with the given ID or raises 404.
+
+    :param job_id: ID of the job.
+    :return: The Job.
+    """
+    job = await job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(job_request: GenerationJobRequest):
+    """
+    Starts a generation job for a custom list of URLs with its own output.
+    """
+    job = await job_manager.create(
+        job_request.urls,
+        job_request.weight,
+        job_request.deadline_seconds or JOB_DEADLINE_SECONDS,
+    )
+    job_manager.start(job)
+    return job.to_dict()
+
+
+@app.get("/jobs")
+async def list_jobs():
+    """
+    Lists all generation jobs.
+    """
+    return [job.to_dict() for job in await job_manager.list()]
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Returns the state of a generation job.
+    """
+    job = await get_job_or_404(job_id)
+    return job.to_dict()
+
+
+@app.post("/jobs/{job_id}/resume", status_code=202)
+async def resume_job(job_id: str):
+    """
+    Runs a failed generation job, or one cut by its deadline, again, skipping
+    the projects completed by the previous run.
+    """
+    job = await get_job_or_404(job_id)
+    try:
+        await job_manager.resume(job)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/download-csv", response_class=FileResponse)
+async def download_job_csv(job_id: str, request: Request):
+    """
+    Downloads the latest complete CSV snapshot of a generation job.
+    """
+    job = await get_job_or_404(job_id)
+    return snapshot_response(request, job.snapshot_store)
+
+
+@app.get("/jobs/{job_id}/skip-report")
+async def get_job_skip_report(job_id: str):
+    """
+    Returns the URLs skipped by a generation job and why.
+    """
+    job = await get_job_or_404(job_id)
+    return skip_report_response(job.report_path)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Returns runtime statistics of the pipeline components.
+    """
+    return metrics.collect()
+
+
+@app.get("/debug/loop-lag")
+async def get_loop_lag():
+    """
+    Returns event loop lag statistics and the stacks of recent blocking events.
+    """
+    return {"stats": loop_monitor.stats(), "events": loop_monitor.events()}
+
+
+def get_profile_or_404() -> ProfileReport:
+    """
+    Returns the report of the latest profiling session or raises 404.
+
+    :return: The ProfileReport.
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not profiler.report:
+        raise HTTPException(
+            status_code=404, detail="No profiling session has been started"
+        )
+    return profiler.report
+
+
+@app.post("/admin/profile", status_code=202)
+async def start_profiling(
+    seconds: float = Query(default=10, gt=0, le=PROFILING_MAX_SECONDS)
+):
+    """
+    Starts a time-bounded CPU sampling and allocation profiling session.
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    try:
+        report = profiler.start(seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return report.to_dict()
+
+
+@app.get("/admin/profile")
+async def get_profile():
+    """
+    Returns the summary of the latest profiling session: the hottest stacks
+    and the top allocation sites.
+    """
+    return get_profile_or_404().to_dict()
+
+
+@app.get("/admin/profile/collapsed", response_class=PlainTextResponse)
+async def download_profile_stacks():
+    """
+    Downloads the stack samples of the latest profiling session in the
+    collapsed format of flame graph tools.
+    """
+    report = get_profile_or_404()
+    if report.running:
+        raise HTTPException(
+            status_code=409, detail="Profiling session is still running"
+        )
+    return PlainTextResponse(
+        report.collapsed(),
+        headers={
+            "Content-Disposition": 'attachment; filename="profile.collapsed"'
+        },
+    )
+
+
+def check_runtime_settings_enabled() -> None:
+    """
+    Raises 404 unless the runtime settings endpoint is enabled.
+    """
+    if not RUNTIME_SETTINGS_ENABLED:
+        raise HTTPException(
+            status_code=404, detail="Runtime settings are disabled"
+        )
+
+
+@app.get("/admin/settings")
+async def get_runtime_settings():
+    """
+    Returns the current values of the runtime-tunable settings.
+    """
+    check_runtime_settings_enabled()
+    return runtime_settings.to_dict()
+
+
+@app.patch("/admin/settings")
+async def update_runtime_settings(update: RuntimeSettingsUpdate):
+    """
+    Adjusts runtime-tunable settings of this process. Changes take effect
+    immediately, including for running jobs.
+    """
+    check_runtime_settings_enabled()
+    changes = update.model_dump(exclude_none=True)
+    # More tasks than requests the scheduler grants at once would only queue
+    max_concurrent_tasks = changes.get(
+        "max_concurrent_tasks", runtime_settings.max_concurrent_tasks
+    )
+    global_max_concurrent_requests = changes.get(
+        "global_max_concurrent_requests",
+        runtime_settings.global_max_concurrent_requests,
+    )
+    if max_concurrent_tasks > global_max_concurrent_requests:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"max_concurrent_tasks of {max_concurrent_tasks} exceeds "
+                f"global_max_concurrent_requests of {global_max_concurrent_requests}"
+            ),
+        )
+    changed = runtime_settings.update(changes)
+    return {"changed": changed, "settings": runtime_settings.to_dict()}
+
+
+@app.get("/negative-cache")
+async def list_negative_cache():
+    """
+    Lists URLs recorded as failing, with the failure reason and expiry.
+    """
+    await negative_cache.load()
+    return [asdict(entry) for entry in negative_cache.entries()]
+
+
+@app.delete("/admin/negative-cache")
+async def purge_negative_cache(url: Optional[str] = None):
     """
-    Downloads the CSV file.
+    Purges the entry of a URL, or all entries, from the negative cache.
     """
-    return FileResponse(CSV_FILE_PATH)
+    if not NEGATIVE_CACHE_ADMIN_ENABLED:
+        raise HTTPException(
+            status_code=404, detail="Negative cache purging is disabled"
+        )
+    return {"purged": await negative_cache.purge(url)}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+import math
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from app.logger import logger
+
+
+class MetricsRegistry:
+    """
+    Collects runtime statistics from registered components.
+
+    Each component registers a provider returning a dictionary of its
+    current statistics, which are collected on demand.
+    """
+
+    def __init__(self) -> None:
+        self._providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def register(
+        self, name: str, provider: Callable[[], Dict[str, Any]]
+    ) -> None:
+        """
+        Registers a statistics provider.
+
+        :param name: Name the statistics are published under.
+        :param provider: Callable returning the current statistics.
+        """
+        self._providers[name] = provider
+
+    def collect(self) -> Dict[str, Any]:
+        """
+        Collects statistics from all providers.
+
+        :return: Dictionary of statistics keyed by provider name.
+        """
+        collected = {}
+        for name, provider in self._providers.items():
+            try:
+                collected[name] = provider()
+            except Exception as e:
+                logger.error(f"Could not collect metrics {name}: {e}")
+        return collected
+
+
+class LatencyTracker:
+    """
+    Tracks the most recent latencies in a sliding window, e.g. of requests
+    or of event loop lag samples.
+
+    Attributes:
+        window (int): Number of most recent latencies kept.
+    """
+
+    def __init__(self, window: int = 200) -> None:
+        """
+        :param window: Number of most recent latencies kept.
+        """
+        self.window = window
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        """
+        :return: Number of recorded latencies.
+        """
+        return len(self._latencies)
+
+    def record(self, seconds: float) -> None:
+        """
+        Records a latency.
+
+        :param seconds: The latency in seconds.
+        """
+        self._latencies.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Computes a latency percentile using the nearest-rank method.
+
+        :param percentile: The percentile between 0 and 1.
+        :return: The latency in seconds, or None without samples.
+        """
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        rank = max(math.ceil(percentile * len(ordered)), 1)
+        return ordered[rank - 1]
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Final, List, Optional, Tuple
+
+from app.locks import flocked
+from app.logger import logger
+from app.transports import UpstreamStatusError
+
+# Statuses telling the project does not exist, unlike errors of the upstream
+PERMANENT_FAILURE_STATUSES: Final[Tuple[int, ...]] = (404, 410)
+
+
+def is_permanent_failure(error: Optional[BaseException]) -> bool:
+    """
+    :param error: The error a fetch failed with, or None if unknown.
+    :return: Whether the fetch will keep failing, so the URL is worth caching.
+        Timeouts, connection errors and server errors are transient.
+    """
+    return (
+        isinstance(error, UpstreamStatusError)
+        and error.status in PERMANENT_FAILURE_STATUSES
+    )
+
+
+@dataclass
+class NegativeCacheEntry:
+    """
+    Data class describing a URL that failed to produce a CSV row.
+    """
+
+    url: str
+    reason: str
+    failures: int
+    first_failed_at: float
+    last_failed_at: float
+    expires_at: float
+
+
+class NegativeCache:
+    """
+    Persisted cache of failing project URLs.
+
+    Only permanent failures, such as missing projects or pages without a
+    project key, are recorded. Failed URLs are skipped by later runs until
+    their entry expires. The TTL doubles with every repeated failure up to
+    max_ttl, so broken projects are retried rarely.
+
+    The file is shared by all worker processes. Changes are kept until the
+    next save, which merges them into the current file under a file lock, so
+    workers do not overwrite each other's entries and a purge in one worker
+    is not undone by another. The file is read and written in a thread, so a
+    worker waiting for the lock does not block its event loop. Entries expired
+    for longer than max_ttl are dropped on save.
+
+    Attributes:
+        file_path (Optional[str]): Path to the JSON file the cache is persisted to.
+        base_ttl (float): TTL after the first failure, in seconds.
+        max_ttl (float): Maximum TTL, in seconds.
+    """
+
+    def __init__(
+        self,
+        file_path: Optional[str],
+        base_ttl: float,
+        max_ttl: float,
+    ) -> None:
+        """
+        :param file_path: Path to the JSON file, or None to keep the cache in memory.
+        :param base_ttl: TTL after the first failure, in seconds.
+        :param max_ttl: Maximum TTL, in seconds.
+        """
+        self.file_path = file_path
+        self.base_ttl = base_ttl
+        self.max_ttl = max_ttl
+        self._entries: Dict[str, NegativeCacheEntry] = {}
+        # changes since the last save, None marks a removed entry
+        self._changes: Dict[str, Optional[NegativeCacheEntry]] = {}
+        self._purged = False
+        if file_path:
+            self._entries = self._read_shared()
+
+    def _read(self) -> Dict[str, NegativeCacheEntry]:
+        """
+        :return: The entries of the JSON file, empty if it is missing or invalid.
+        """
+        if not self.file_path or not os.path.isfile(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, "r") as cache_file:
+                return {
+                    entry["url"]: NegativeCacheEntry(**entry)
+                    for entry in json.load(cache_file)
+                }
+        except (ValueError, TypeError, KeyError) as e:
+            logger.error(f"Invalid negative cache {self.file_path}: {e}")
+            return {}
+
+    def _read_shared(self) -> Dict[str, NegativeCacheEntry]:
+        """
+        :return: The entries of the JSON file, read under a shared file lock.
+        """
+        with flocked(f"{self.file_path}.lock", shared=True):
+            return self._read()
+
+    @staticmethod
+    def _apply(
+        entries: Dict[str, NegativeCacheEntry],
+        changes: Dict[str, Optional[NegativeCacheEntry]],
+        purged: bool,
+    ) -> Dict[str, NegativeCacheEntry]:
+        """
+        :param entries: Entries as persisted by all workers.
+        :param changes: Changes of this worker, None marks a removed entry.
+        :param purged: Whether this worker purged all entries before the changes.
+        :return: The entries with the changes applied.
+        """
+        merged = {} if purged else dict(entries)
+        for url, entry in changes.items():
+            if entry is None:
+                merged.pop(url, None)
+            else:
+                merged[url] = entry
+        return merged
+
+    def _merge(
+        self, entries: Dict[str, NegativeCacheEntry]
+    ) -> Dict[str, NegativeCacheEntry]:
+        """
+        :param entries: Entries as persisted by all workers.
+        :return: The entries with the unsaved changes of this worker applied.
+        """
+        return self._apply(entries, self._changes, self._purged)
+
+    def _write(
+        self,
+        file_path: str,
+        changes: Dict[str, Optional[NegativeCacheEntry]],
+        purged: bool,
+    ) -> Optional[Dict[str, NegativeCacheEntry]]:
+        """
+        Merges changes into the JSON file and atomically writes it, without
+        the entries expired for longer than max_ttl. Recently expired entries
+        are kept, so the TTL still grows if their URL fails again.
+
+        :param file_path: Path to the JSON file.
+        :param changes: Changes of this worker, None marks a removed entry.
+        :param purged: Whether this worker purged all entries before the changes.
+        :return: The written entries, or None if the file could not be written.
+        """
+        tmp_path = f"{file_path}.tmp"
+        with flocked(f"{file_path}.lock"):
+            stale_before = time.time() - self.max_ttl
+            entries = {
+                url: entry
+                for url, entry in self._apply(
+                    self._read(), changes, purged
+                ).items()
+                if entry.expires_at > stale_before
+            }
+            try:
+                with open(tmp_path, "w") as cache_file:
+                    json.dump(
+                        [asdict(e) for e in entries.values()], cache_file
+                    )
+                os.replace(tmp_path, file_path)
+            except IOError as e:
+                logger.error(f"IOError: {e}")
+                return None
+        return entries
+
+    async def load(self) -> None:
+        """
+        Loads the entries from the JSON file in a thread, keeping the unsaved
+        changes.
+        """
+        if not self.file_path:
+            return
+        entries = await asyncio.to_thread(self._read_shared)
+        self._entries = self._merge(entries)
+
+    async def save(self) -> None:
+        """
+        Merges the unsaved changes into the JSON file and atomically writes it
+        in a thread. Changes made meanwhile are kept for the next save.
+        """
+        if not self.file_path:
+            return
+        changes, purged = self._changes, self._purged
+        self._changes, self._purged = {}, False
+        entries = await asyncio.to_thread(
+            self._write, self.file_path, changes, purged
+        )
+        if entries is None:
+            self._changes = {**changes, **self._changes}
+            self._purged = purged or self._purged
+            return
+        self._entries = self._merge(entries)
+
+    def get(self, url: str) -> Optional[NegativeCacheEntry]:
+        """
+        Returns the unexpired entry of the URL.
+
+        :param url: The project URL.
+        :return: The NegativeCacheEntry if the URL should be skipped, otherwise None.
+        """
+        entry = self._entries.get(url)
+        if entry and entry.expires_at > time.time():
+            return entry
+        return None
+
+    def record_failure(self, url: str, reason: str) -> NegativeCacheEntry:
+        """
+        Records a failure of the URL and extends its TTL.
+
+        :param url: The project URL.
+        :param reason: Description of the failure.
+        :return: The updated NegativeCacheEntry.
+        """
+        now = time.time()
+        previous = self._entries.get(url)
+        failures = previous.failures + 1 if previous else 1
+        ttl = min(self.base_ttl * 2 ** (failures - 1), self.max_ttl)
+        entry = NegativeCacheEntry(
+            url=url,
+            reason=reason,
+            failures=failures,
+            first_failed_at=previous.first_failed_at if previous else now,
+            last_failed_at=now,
+            expires_at=now + ttl,
+        )
+        self._entries[url] = entry
+        self._changes[url] = entry
+        logger.info(
+            f"Negative cache: {url} failed {failures} times ({reason}), "
+            f"skipped for {ttl:.0f}s"
+        )
+        return entry
+
+    def record_success(self, url: str) -> None:
+        """
+        Removes the entry of a URL that succeeded again.
+
+        :param url: The project URL.
+        """
+        if self._entries.pop(url, None):
+            self._changes[url] = None
+
+    def entries(self) -> List[NegativeCacheEntry]:
+        """
+        :return: All entries, including expired ones.
+        """
+        return list(self._entries.values())
+
+    async def purge(self, url: Optional[str] = None) -> int:
+        """
+        Removes the entry of a URL, or all entries, and persists the cache.
+
+        :param url: The project URL, or None to purge all entries.
+        :return: The number of removed entries.
+        """
+        if url is None:
+            purged = len(self._entries)
+            self._entries = {}
+            self._changes = {}
+            self._purged = True
+        else:
+            purged = 1 if self._entries.pop(url, None) else 0
+            self._changes[url] = None
+        await self.save()
+        return purged
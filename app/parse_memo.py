@@ -0,0 +1,271 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Union
+
+from app.locks import flocked
+from app.logger import logger
+from app.parsers import JSONParsingStrategy, ParsingStrategy
+from app.schemas import ParsedData, ProjectInfo
+
+
+def parser_version(strategy: type) -> str:
+    """
+    Derives a version of a parsing strategy from its source code, so any
+    change to the parsing logic invalidates memoized results automatically.
+
+    :param strategy: The parsing strategy class.
+    :return: Hex digest identifying the implementation of the strategy.
+    """
+    digest = hashlib.sha256()
+    for cls in strategy.__mro__:
+        if cls.__module__ != strategy.__module__:
+            continue
+        try:
+            digest.update(inspect.getsource(cls).encode())
+        except (OSError, TypeError):
+            digest.update(cls.__qualname__.encode())
+    return digest.hexdigest()[:16]
+
+
+class ParseMemo:
+    """
+    Bounded LRU cache of parsed projects keyed by the SHA-256 digest of the
+    raw response body, persisted between runs.
+
+    The file is shared by all worker processes. Results put since the last
+    save are merged into the current file under a file lock, so workers do
+    not overwrite each other's results. The file is read and written in a
+    thread, so neither the lock nor the size of the memo blocks the event loop.
+
+    Attributes:
+        file_path (Optional[str]): Path to the JSON file the memo is persisted to.
+        max_entries (int): Maximum number of memoized results.
+        version (str): Version of the parser the results were produced by.
+        hits (int): Number of lookups answered from the memo.
+        misses (int): Number of lookups not found in the memo.
+    """
+
+    def __init__(
+        self, file_path: Optional[str], max_entries: int, version: str
+    ) -> None:
+        """
+        :param file_path: Path to the JSON file, or None to keep the memo in memory.
+        :param max_entries: Maximum number of memoized results.
+        :param version: Version of the parser, entries of other versions are dropped.
+        """
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # results put since the last save
+        self._changes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        if file_path:
+            self._entries = self._read_shared()
+
+    @staticmethod
+    def digest(data: Union[str, bytes]) -> str:
+        """
+        :param data: The raw response body.
+        :return: SHA-256 hex digest of the body.
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        return hashlib.sha256(data).hexdigest()
+
+    def _read(self) -> "OrderedDict[str, Dict[str, Any]]":
+        """
+        :return: The entries of the JSON file, empty if it is missing, invalid
+            or written by another parser version.
+        """
+        entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        if not self.file_path or not os.path.isfile(self.file_path):
+            return entries
+        try:
+            with open(self.file_path, "r") as memo_file:
+                content = json.load(memo_file)
+        except ValueError as e:
+            logger.error(f"Invalid parse memo {self.file_path}: {e}")
+            return entries
+        if content.get("version") != self.version:
+            logger.info("Parser changed, discarding memoized parse results")
+            return entries
+        for digest, project_info in content.get("entries", []):
+            entries[digest] = project_info
+        return entries
+
+    def _read_shared(self) -> "OrderedDict[str, Dict[str, Any]]":
+        """
+        :return: The entries of the JSON file, read under a shared file lock.
+        """
+        with flocked(f"{self.file_path}.lock", shared=True):
+            return self._read()
+
+    def _apply(
+        self,
+        entries: "OrderedDict[str, Dict[str, Any]]",
+        changes: "OrderedDict[str, Dict[str, Any]]",
+    ) -> "OrderedDict[str, Dict[str, Any]]":
+        """
+        :param entries: Entries as persisted by all workers.
+        :param changes: Results put by this worker.
+        :return: The entries with the results applied as the most recently
+            used ones, trimmed to max_entries.
+        """
+        for digest, project_info in changes.items():
+            entries[digest] = project_info
+            entries.move_to_end(digest)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return entries
+
+    def _merge(
+        self, entries: "OrderedDict[str, Dict[str, Any]]"
+    ) -> "OrderedDict[str, Dict[str, Any]]":
+        """
+        :param entries: Entries as persisted by all workers.
+        :return: The entries with the unsaved results of this worker applied.
+        """
+        return self._apply(entries, self._changes)
+
+    def _write(
+        self, file_path: str, changes: "OrderedDict[str, Dict[str, Any]]"
+    ) -> Optional["OrderedDict[str, Dict[str, Any]]"]:
+        """
+        Merges results into the JSON file and atomically writes it, least
+        recently used first.
+
+        :param file_path: Path to the JSON file.
+        :param changes: Results put by this worker.
+        :return: The written entries, or None if the file could not be written.
+        """
+        tmp_path = f"{file_path}.tmp"
+        with flocked(f"{file_path}.lock"):
+            entries = self._apply(self._read(), changes)
+            try:
+                with open(tmp_path, "w") as memo_file:
+                    json.dump(
+                        {
+                            "version": self.version,
+                            "entries": list(entries.items()),
+                        },
+                        memo_file,
+                    )
+                os.replace(tmp_path, file_path)
+            except IOError as e:
+                logger.error(f"IOError: {e}")
+                return None
+        return entries
+
+    async def load(self) -> None:
+        """
+        Loads the entries from the JSON file in a thread, keeping the unsaved
+        results.
+        """
+        if not self.file_path:
+            return
+        entries = await asyncio.to_thread(self._read_shared)
+        self._entries = self._merge(entries)
+
+    async def save(self) -> None:
+        """
+        Merges the unsaved results into the JSON file and atomically writes it
+        in a thread. Results put meanwhile are kept for the next save.
+        """
+        if not self.file_path:
+            return
+        changes, self._changes = self._changes, OrderedDict()
+        entries = await asyncio.to_thread(self._write, self.file_path, changes)
+        if entries is None:
+            changes.update(self._changes)
+            self._changes = changes
+            return
+        self._entries = self._merge(entries)
+
+    def get(self, digest: str) -> Optional[ProjectInfo]:
+        """
+        Looks up a memoized result and marks it as recently used.
+
+        :param digest: Digest of the raw response body.
+        :return: The memoized ProjectInfo, or None.
+        """
+        project_info = self._entries.get(digest)
+        if project_info is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(digest)
+        return ProjectInfo(**project_info)
+
+    def put(self, digest: str, project_info: ProjectInfo) -> None:
+        """
+        Memoizes a result, evicting the least recently used one if full.
+
+        :param digest: Digest of the raw response body.
+        :param project_info: The parsed project.
+        """
+        self._entries[digest] = self._changes[digest] = asdict(project_info)
+        self._entries.move_to_end(digest)
+        self._changes.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Memo size and hit counters.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class MemoizedParsingStrategy(ParsingStrategy):
+    """
+    Decorator of a project parsing strategy skipping JSON decoding and
+    traversal for response bodies that were already parsed.
+
+    Attributes:
+        strategy (JSONParsingStrategy): The decorated parsing strategy.
+        memo (ParseMemo): Memo of parse results.
+    """
+
+    def __init__(self, strategy: JSONParsingStrategy, memo: ParseMemo) -> None:
+        """
+        :param strategy: The decorated parsing strategy.
+        :param memo: Memo of parse results.
+        """
+        self.strategy = strategy
+        self.memo = memo
+
+    def parse(self, data: Union[str, Dict[str, Any]]) -> ParsedData:
+        """
+        Returns the memoized result for the body, or parses and memoizes it.
+
+        :param data: The raw response body, decoded data is parsed without memoization.
+        :return: ParseData object containing the parsed data.
+        """
+        if not isinstance(data, str):
+            return self.strategy.parse(data)
+
+        digest = self.memo.digest(data)
+        project_info = self.memo.get(digest)
+        if project_info is not None:
+            return ParsedData(project_info=project_info)
+
+        result = self.strategy.parse(data)
+        if result.project_info is not None:
+            self.memo.put(digest, result.project_info)
+        return result
+
+
+JSON_PARSER_VERSION = parser_version(JSONParsingStrategy)
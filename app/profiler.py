@@ -0,0 +1,292 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from types import FrameType
+from typing import Any, Counter as CounterType, Dict, List, Optional
+
+from app.config import (
+    PROFILING_FOCUS,
+    PROFILING_SAMPLE_INTERVAL_SECONDS,
+    PROFILING_TOP_ALLOCATIONS,
+    PROFILING_TRACEBACK_FRAMES,
+)
+from app.logger import logger
+
+APP_FOLDER = os.path.dirname(__file__)
+
+
+@dataclass
+class AllocationSite:
+    """
+    Data class describing memory allocated from a call site in the app code
+    during profiling. The traceback leads from the call site to the line that
+    allocated, which may be in a library such as json or lxml.
+    """
+
+    location: str
+    traceback: List[str]
+    size_diff: int
+    count_diff: int
+    size: int
+    count: int
+
+
+@dataclass
+class ProfileReport:
+    """
+    Data class describing a profiling session and its results.
+    """
+
+    started_at: float
+    duration: float
+    interval: float
+    focus: Optional[str]
+    finished_at: Optional[float] = None
+    samples: int = 0
+    focus_samples: int = 0
+    stacks: Dict[str, int] = field(default_factory=dict)
+    allocations: List[AllocationSite] = field(default_factory=list)
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: True until the session has finished.
+        """
+        return self.finished_at is None
+
+    def collapsed(self) -> str:
+        """
+        :return: The stack samples in the collapsed format of flame graph tools,
+            one "frame;frame;frame count" line per stack, hottest first.
+        """
+        return "".join(
+            f"{stack} {count}\n"
+            for stack, count in sorted(
+                self.stacks.items(), key=lambda item: -item[1]
+            )
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serializes the report for API responses, without the stacks.
+
+        :return: Dictionary with the report summary.
+        """
+        top_stacks = sorted(self.stacks.items(), key=lambda item: -item[1])
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": self.duration,
+            "interval": self.interval,
+            "focus": self.focus,
+            "samples": self.samples,
+            "focus_samples": self.focus_samples,
+            "top_stacks": [
+                {"stack": stack, "count": count}
+                for stack, count in top_stacks[:10]
+            ],
+            "allocations": [asdict(a) for a in self.allocations],
+        }
+
+
+class Profiler:
+    """
+    Time-bounded profiler of the running process.
+
+    Samples the stack of the event loop thread from a background thread at a
+    fixed interval, keeping the samples passing through the focus function,
+    and compares tracemalloc snapshots taken at the start and the end of the
+    session to find the top allocation sites in the app code. Snapshots are
+    taken and compared in a thread, so they do not block the event loop.
+
+    Only one session runs at a time, the report of the latest session is kept.
+
+    Attributes:
+        interval (float): Seconds between stack samples.
+        focus (Optional[str]): Function name samples must pass through, None for all.
+        top_allocations (int): Number of allocation sites reported.
+        report (Optional[ProfileReport]): Report of the latest session.
+    """
+
+    def __init__(
+        self,
+        interval: float = PROFILING_SAMPLE_INTERVAL_SECONDS,
+        focus: Optional[str] = PROFILING_FOCUS,
+        top_allocations: int = PROFILING_TOP_ALLOCATIONS,
+    ) -> None:
+        """
+        :param interval: Seconds between stack samples.
+        :param focus: Function name samples must pass through, None for all.
+        :param top_allocations: Number of allocation sites reported.
+        """
+        self.interval = interval
+        self.focus = focus
+        self.top_allocations = top_allocations
+        self.report: Optional[ProfileReport] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        """
+        :return: True if a session is running.
+        """
+        return self._task is not None and not self._task.done()
+
+    def start(self, duration: float) -> ProfileReport:
+        """
+        Starts a profiling session in the background.
+
+        :param duration: Length of the session in seconds.
+        :return: The report, completed once the session has finished.
+        :raises RuntimeError: If a session is already running.
+        """
+        if self.is_running:
+            raise RuntimeError("A profiling session is already running")
+        self.report = ProfileReport(
+            started_at=time.time(),
+            duration=duration,
+            interval=self.interval,
+            focus=self.focus,
+        )
+        self._task = asyncio.create_task(self._run(self.report))
+        return self.report
+
+    async def wait(self) -> None:
+        """
+        Waits until the running session, if any, has finished.
+        """
+        if self._task:
+            await self._task
+
+    async def _run(self, report: ProfileReport) -> None:
+        """
+        Samples stacks and allocations for the duration of the session.
+
+        :param report: The report to fill.
+        """
+        logger.info(f"Profiling for {report.duration}s")
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(PROFILING_TRACEBACK_FRAMES)
+        # Snapshots of a busy heap take long, they must not stall the loop
+        # whose lag the session is meant to explain
+        first_snapshot = await asyncio.to_thread(tracemalloc.take_snapshot)
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample,
+            args=(threading.get_ident(), report, stop),
+            name="profiler-sampler",
+            daemon=True,
+        )
+        sampler.start()
+        try:
+            await asyncio.sleep(report.duration)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            last_snapshot = await asyncio.to_thread(tracemalloc.take_snapshot)
+            if started_tracing:
+                tracemalloc.stop()
+            report.allocations = await asyncio.to_thread(
+                self._top_allocations, first_snapshot, last_snapshot
+            )
+            report.finished_at = time.time()
+            logger.info(
+                f"Profiling finished with {report.samples} samples, "
+                f"{report.focus_samples} in {report.focus}"
+            )
+
+    def _sample(
+        self, thread_id: int, report: ProfileReport, stop: threading.Event
+    ) -> None:
+        """
+        Records the stack of the loop thread until the session is stopped.
+
+        :param thread_id: ID of the event loop thread.
+        :param report: The report to record the samples in.
+        :param stop: Event set when the session is over.
+        """
+        stacks: CounterType[str] = Counter()
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            report.samples += 1
+            stack = self._collapse(frame)
+            if self.focus and f":{self.focus};" not in f"{stack};":
+                continue
+            report.focus_samples += 1
+            stacks[stack] += 1
+        # published once sampling is over, so readers never see it change
+        report.stacks = dict(stacks)
+
+    @staticmethod
+    def _collapse(frame: FrameType) -> str:
+        """
+        :param frame: The innermost frame of a stack.
+        :return: The stack from the outermost frame as "module:function;..." frames.
+        """
+        frames = []
+        current: Optional[FrameType] = frame
+        while current is not None:
+            code = current.f_code
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            frames.append(f"{module}:{code.co_name}")
+            current = current.f_back
+        return ";".join(reversed(frames))
+
+    def _top_allocations(
+        self,
+        first_snapshot: tracemalloc.Snapshot,
+        last_snapshot: tracemalloc.Snapshot,
+    ) -> List[AllocationSite]:
+        """
+        Finds the call sites in the app code that allocated the most memory during the session.
+
+        Allocations are kept if any frame of their traceback is in the app code,
+        so memory allocated by libraries on behalf of the app is attributed to
+        the app line calling them. Allocations of the profiler itself are left out.
+
+        :param first_snapshot: Snapshot taken at the start of the session.
+        :param last_snapshot: Snapshot taken at the end of the session.
+        :return: The top allocation sites by allocated size.
+        """
+        filters = [
+            tracemalloc.Filter(
+                True, os.path.join(APP_FOLDER, "*"), all_frames=True
+            ),
+            tracemalloc.Filter(False, __file__, all_frames=True),
+        ]
+        differences = last_snapshot.filter_traces(filters).compare_to(
+            first_snapshot.filter_traces(filters), "traceback"
+        )
+        sites = []
+        for difference in differences[: self.top_allocations]:
+            # frames run from the oldest to the allocating one
+            frames = list(difference.traceback)
+            call_site = max(
+                index
+                for index, frame in enumerate(frames)
+                if frame.filename.startswith(APP_FOLDER)
+            )
+            sites.append(
+                AllocationSite(
+                    location=str(frames[call_site]),
+                    traceback=[str(frame) for frame in frames[call_site:]],
+                    size_diff=difference.size_diff,
+                    count_diff=difference.count_diff,
+                    size=difference.size,
+                    count=difference.count,
+                )
+            )
+        return sites
+
+
+# Profiler of the process serving the app
+profiler = Profiler()
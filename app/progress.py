@@ -0,0 +1,186 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from app.snapshots import Snapshot
+
+ProgressEvent = Tuple[str, Dict[str, Any]]
+
+
+class ProgressBroker:
+    """
+    Fans out progress events of generation runs to subscribers, such as
+    Server-Sent Events streams.
+
+    Every subscriber has a bounded queue, a slow subscriber loses its oldest
+    events instead of slowing down the pipeline. The latest event is kept so
+    new subscribers start from the current state.
+
+    Attributes:
+        max_queued (int): Maximum number of events queued per subscriber.
+        latest (Optional[ProgressEvent]): The most recently published event.
+    """
+
+    def __init__(self, max_queued: int = 100) -> None:
+        """
+        :param max_queued: Maximum number of events queued per subscriber.
+        """
+        self.max_queued = max_queued
+        self.latest: Optional[ProgressEvent] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._closed = False
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        """
+        Sends an event to all subscribers.
+
+        :param event: Name of the event.
+        :param data: Payload of the event.
+        """
+        self.latest = (event, data)
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    def close(self) -> None:
+        """
+        Ends all subscriptions, e.g. on shutdown.
+        """
+        self._closed = True
+        for queue in self._subscribers:
+            # wakes up idle subscribers, the others stop once drained
+            if queue.empty():
+                queue.put_nowait(None)
+
+    async def subscribe(
+        self, heartbeat: Optional[float] = None
+    ) -> AsyncIterator[Optional[ProgressEvent]]:
+        """
+        Yields the latest event followed by all new events until the broker closes.
+
+        :param heartbeat: Seconds after which None is yielded if no event was published.
+        :return: Async iterator of (event, data) tuples, or None on heartbeats.
+        """
+        queue: asyncio.Queue = asyncio.Queue(self.max_queued)
+        self._subscribers.add(queue)
+        try:
+            if self.latest:
+                yield self.latest
+            while not self._closed or not queue.empty():
+                try:
+                    item = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if item is None:
+                    return
+                yield item
+        finally:
+            self._subscribers.discard(queue)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Number of subscribers.
+        """
+        return {"subscribers": len(self._subscribers)}
+
+
+def format_sse(event: Optional[ProgressEvent]) -> str:
+    """
+    Formats an event as a Server-Sent Events message.
+
+    :param event: The (event, data) tuple, or None for a keep-alive comment.
+    :return: The message.
+    """
+    if event is None:
+        return ": keep-alive\n\n"
+    name, data = event
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class RunProgress:
+    """
+    Tracks the progress of a generation run and publishes it per project.
+
+    Attributes:
+        broker (ProgressBroker): Broker the events are published to.
+        job_id (str): ID of the job the run belongs to.
+        total (Optional[int]): Number of URLs of the run, None if not known upfront.
+    """
+
+    def __init__(
+        self,
+        broker: ProgressBroker,
+        job_id: str,
+        total: Optional[int] = None,
+    ) -> None:
+        """
+        :param broker: Broker the events are published to.
+        :param job_id: ID of the job the run belongs to.
+        :param total: Number of URLs of the run, None if not known upfront.
+        """
+        self.broker = broker
+        self.job_id = job_id
+        self.total = total
+        self.processed = 0
+        self.written = 0
+        self.skipped = 0
+        self.started_at = time.monotonic()
+
+    def state(self) -> Dict[str, Any]:
+        """
+        :return: Counters and throughput of the run.
+        """
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "job_id": self.job_id,
+            "total": self.total,
+            "processed": self.processed,
+            "written": self.written,
+            "skipped": self.skipped,
+            "elapsed": elapsed,
+            "rows_per_second": self.written / elapsed if elapsed else 0.0,
+        }
+
+    def start(self) -> None:
+        """
+        Publishes the start of the run.
+        """
+        self.started_at = time.monotonic()
+        self.broker.publish("started", self.state())
+
+    def record(self, url: str, status: str) -> None:
+        """
+        Publishes the outcome of a project.
+
+        :param url: The project URL.
+        :param status: "written", "resumed" (restored from the checkpoint) or "skipped".
+        """
+        self.processed += 1
+        if status == "skipped":
+            self.skipped += 1
+        else:
+            self.written += 1
+        self.broker.publish(
+            "project", {**self.state(), "url": url, "status": status}
+        )
+
+    def finish(
+        self, snapshot: Optional[Snapshot], error: Optional[str] = None
+    ) -> None:
+        """
+        Publishes the end of the run.
+
+        :param snapshot: The published snapshot, or None.
+        :param error: Description of the failure of the run, if it failed.
+        """
+        self.broker.publish(
+            "finished",
+            {
+                **self.state(),
+                "snapshot_version": snapshot.version if snapshot else None,
+                "error": error,
+            },
+        )
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from app.logger import logger
+
+
+class PeriodicRefresher:
+    """
+    Runs a refresh coroutine in the background at a fixed interval.
+
+    Attributes:
+        refresh (Callable): Coroutine function performing the refresh.
+        interval (float): Number of seconds between the refreshes.
+    """
+
+    def __init__(
+        self, refresh: Callable[[], Awaitable[None]], interval: float
+    ) -> None:
+        """
+        :param refresh: Coroutine function performing the refresh.
+        :param interval: Number of seconds between the refreshes.
+        """
+        self.refresh = refresh
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        """
+        :return: True if the background task is running.
+        """
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """
+        Starts the background refresh loop. The first refresh runs immediately.
+        """
+        if self.is_running:
+            return
+        logger.info(f"Starting periodic refresh every {self.interval}s")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops the background refresh loop and waits for it to finish.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        """
+        Refreshes in a loop, logging failures instead of stopping.
+        """
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Periodic refresh failed: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,330 @@
+import asyncio
+import heapq
+import itertools
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import TracebackType
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from app.config import (
+    GLOBAL_MAX_CONCURRENT_REQUESTS,
+    GLOBAL_MAX_REQUESTS_PER_SECOND,
+)
+from app.transports import ClientSession
+
+# Called in the context of a request once the scheduler granted it a slot, so
+# callers can tell time spent queued from time spent waiting for the upstream
+on_slot_granted: ContextVar[Optional[Callable[[], None]]] = ContextVar(
+    "on_slot_granted", default=None
+)
+
+
+@dataclass
+class Flow:
+    """
+    Scheduling state of a single job sharing the request budget.
+    """
+
+    last_finish: float = 0.0
+    granted: int = 0
+    waiting: int = 0
+
+
+class FairShareScheduler:
+    """
+    Process-wide scheduler of outbound requests.
+
+    Enforces a global concurrency limit and a requests-per-second budget and
+    shares them between jobs with start-time fair queuing: every job gets a
+    share of the budget proportional to its weight, regardless of how many
+    requests it has queued, so a small interactive job is not stuck behind
+    a large batch job.
+
+    Attributes:
+        max_concurrency (int): Maximum number of requests in flight.
+        max_requests_per_second (float): Request rate limit, 0 disables it.
+    """
+
+    def __init__(
+        self, max_concurrency: int, max_requests_per_second: float = 0
+    ) -> None:
+        """
+        :param max_concurrency: Maximum number of requests in flight.
+        :param max_requests_per_second: Request rate limit, 0 disables it.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_requests_per_second = max_requests_per_second
+        self._reset(None)
+
+    def _reset(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """
+        Clears the scheduling state and binds it to an event loop.
+
+        :param loop: The event loop the scheduler is used from.
+        """
+        self._loop = loop
+        self._queue: List[Tuple[float, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._flows: Dict[str, Flow] = defaultdict(Flow)
+        self._virtual_time = 0.0
+        self._active = 0
+        self._tokens = float(max(self.max_requests_per_second, 1))
+        self._tokens_updated_at = loop.time() if loop else 0.0
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+
+    async def acquire(self, job_id: str, weight: float = 1.0) -> None:
+        """
+        Waits until a request of the job may be sent.
+
+        :param job_id: ID of the job sending the request.
+        :param weight: Share of the budget of the job relative to other jobs.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._reset(loop)
+
+        flow = self._flows[job_id]
+        start = max(self._virtual_time, flow.last_finish)
+        flow.last_finish = start + 1 / weight
+
+        future = loop.create_future()
+        heapq.heappush(self._queue, (start, next(self._sequence), future))
+        flow.waiting += 1
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # the slot was granted before cancellation
+            raise
+        finally:
+            flow.waiting -= 1
+        flow.granted += 1
+
+    def release(self) -> None:
+        """
+        Marks a request as finished and lets the next one start.
+        """
+        self._active -= 1
+        self._dispatch()
+
+    def configure(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_requests_per_second: Optional[float] = None,
+    ) -> None:
+        """
+        Changes the budget on the fly. Queued requests are granted right away
+        if the new budget allows, in-flight requests are not interrupted.
+
+        :param max_concurrency: Maximum number of requests in flight, None to keep it.
+        :param max_requests_per_second: Request rate limit, 0 disables it, None to keep it.
+        """
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        if max_requests_per_second is not None:
+            self.max_requests_per_second = max_requests_per_second
+            if self._retry_handle is not None:
+                # the retry was scheduled for the previous rate
+                self._retry_handle.cancel()
+                self._retry_handle = None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None and loop is self._loop:
+            self._dispatch()
+
+    def forget(self, job_id: str) -> None:
+        """
+        Drops the scheduling state of a finished job.
+
+        :param job_id: ID of the job.
+        """
+        flow = self._flows.get(job_id)
+        if flow and not flow.waiting:
+            del self._flows[job_id]
+
+    @asynccontextmanager
+    async def slot(
+        self, job_id: str, weight: float = 1.0
+    ) -> AsyncIterator[None]:
+        """
+        Holds a request slot for the duration of the context.
+
+        :param job_id: ID of the job sending the request.
+        :param weight: Share of the budget of the job relative to other jobs.
+        """
+        await self.acquire(job_id, weight)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Current scheduler state for monitoring.
+        """
+        return {
+            "active": self._active,
+            "queued": len(self._queue),
+            "jobs": {
+                job_id: {"granted": flow.granted, "waiting": flow.waiting}
+                for job_id, flow in self._flows.items()
+            },
+        }
+
+    def _take_token(self) -> bool:
+        """
+        Takes a token from the rate limiting bucket if one is available.
+
+        :return: True if the request may be sent now.
+        """
+        if self.max_requests_per_second <= 0:
+            return True
+        now = self._loop.time() if self._loop else 0.0
+        elapsed = now - self._tokens_updated_at
+        self._tokens = min(
+            self._tokens + elapsed * self.max_requests_per_second,
+            float(max(self.max_requests_per_second, 1)),
+        )
+        self._tokens_updated_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def _dispatch(self) -> None:
+        """
+        Grants queued requests in fair order while the budget allows.
+        """
+        while self._queue and self._active < self.max_concurrency:
+            start, _, future = self._queue[0]
+            if future.done():  # the waiter was cancelled
+                heapq.heappop(self._queue)
+                continue
+            if not self._take_token():
+                self._schedule_retry()
+                return
+            heapq.heappop(self._queue)
+            self._virtual_time = start
+            self._active += 1
+            future.set_result(None)
+
+    def _schedule_retry(self) -> None:
+        """
+        Retries dispatching once the next rate limiting token is available.
+        """
+        if self._loop is None or self._retry_handle is not None:
+            return
+        delay = (1 - self._tokens) / self.max_requests_per_second
+
+        def retry() -> None:
+            self._retry_handle = None
+            self._dispatch()
+
+        self._retry_handle = self._loop.call_later(delay, retry)
+
+
+class ScheduledRequestContext:
+    """
+    Async context manager holding a scheduler slot while a request of the
+    wrapped session is in progress, including reading the response body.
+    """
+
+    def __init__(self, session: "ScheduledSession", url: str) -> None:
+        """
+        :param session: The scheduled session sending the request.
+        :param url: The URL to fetch.
+        """
+        self._session = session
+        self._url = url
+        self._request: Any = None
+
+    async def __aenter__(self) -> Any:
+        """
+        Waits for a slot and sends the request.
+
+        :return: The response of the wrapped session.
+        """
+        scheduler = self._session.scheduler
+        await scheduler.acquire(self._session.job_id, self._session.weight)
+        try:
+            slot_granted = on_slot_granted.get()
+            if slot_granted:
+                slot_granted()
+            self._request = self._session.session.get(self._url)
+            return await self._request.__aenter__()
+        except BaseException:
+            scheduler.release()
+            raise
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        """
+        Closes the response and releases the slot.
+        """
+        try:
+            await self._request.__aexit__(exc_type, exc_val, exc_tb)
+        finally:
+            self._session.scheduler.release()
+
+
+class ScheduledSession:
+    """
+    Session wrapper sending all requests of a job through the scheduler.
+
+    Attributes:
+        session (ClientSession): The wrapped HTTP session.
+        scheduler (FairShareScheduler): The scheduler granting requests.
+        job_id (str): ID of the job the requests belong to.
+        weight (float): Share of the budget of the job.
+    """
+
+    def __init__(
+        self,
+        session: ClientSession,
+        scheduler: FairShareScheduler,
+        job_id: str,
+        weight: float = 1.0,
+    ) -> None:
+        """
+        :param session: The wrapped HTTP session.
+        :param scheduler: The scheduler granting requests.
+        :param job_id: ID of the job the requests belong to.
+        :param weight: Share of the budget of the job.
+        """
+        self.session = session
+        self.scheduler = scheduler
+        self.job_id = job_id
+        self.weight = weight
+
+    def get(self, url: str) -> ScheduledRequestContext:
+        """
+        Prepares a scheduled GET request to be used as an async context manager.
+
+        :param url: The URL to fetch.
+        :return: Async context manager yielding the response.
+        """
+        return ScheduledRequestContext(self, url)
+
+
+# Scheduler shared by all generation jobs of the process
+request_scheduler = FairShareScheduler(
+    GLOBAL_MAX_CONCURRENT_REQUESTS, GLOBAL_MAX_REQUESTS_PER_SECOND
+)
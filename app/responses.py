@@ -0,0 +1,145 @@
+import os
+import re
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+RANGE_HEADER_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Checks whether an If-None-Match header matches the given ETag.
+
+    :param if_none_match: Value of the If-None-Match header.
+    :param etag: The current ETag of the resource.
+    :return: True if the client already has the current version.
+    """
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # weak comparison is used for If-None-Match
+    return "*" in candidates or any(
+        tag.removeprefix("W/") == etag for tag in candidates
+    )
+
+
+def parse_range_header(
+    range_header: str, size: int
+) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single byte range of a Range header.
+
+    :param range_header: Value of the Range header, e.g. "bytes=0-99".
+    :param size: Size of the resource in bytes.
+    :return: Inclusive (start, end) byte positions, or None if the range
+             cannot be satisfied.
+    :raises ValueError: If the header is not a single valid byte range.
+    """
+    match = RANGE_HEADER_PATTERN.match(range_header.replace(" ", ""))
+    if not match:
+        raise ValueError(f"Unsupported Range header: {range_header}")
+
+    first, last = match.groups()
+    if not first and not last:
+        raise ValueError(f"Invalid Range header: {range_header}")
+
+    if not first:  # suffix range, the last N bytes
+        suffix_length = int(last)
+        if suffix_length == 0 or size == 0:
+            return None
+        return max(size - suffix_length, 0), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        raise ValueError(f"Invalid Range header: {range_header}")
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return None
+    return start, end
+
+
+def iter_file_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    """
+    Reads an inclusive byte range of a file in chunks.
+
+    :param path: Path to the file.
+    :param start: First byte position.
+    :param end: Last byte position.
+    :return: Iterator of file chunks.
+    """
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def conditional_file_response(
+    request: Request,
+    path: str,
+    etag: str,
+    filename: Optional[str] = None,
+    media_type: Optional[str] = None,
+) -> Response:
+    """
+    Serves a file with support for conditional and byte-range requests.
+
+    Answers If-None-Match with 304 Not Modified when the ETag matches and
+    a single byte range from the Range header with 206 Partial Content.
+    If-Range is honoured, so a resumed download restarts from scratch when
+    the file has changed in the meantime.
+
+    :param request: The incoming request.
+    :param path: Path to the file. The file must not change for a given ETag.
+    :param etag: Strong ETag of the file.
+    :param filename: File name for the Content-Disposition header.
+    :param media_type: Media type of the file, guessed from path if None.
+    :return: The response.
+    """
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    response = FileResponse(
+        path, headers=headers, filename=filename, media_type=media_type
+    )
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if not range_header or (if_range and if_range != etag):
+        return response
+
+    size = os.path.getsize(path)
+    try:
+        byte_range = parse_range_header(range_header, size)
+    except ValueError:
+        return response  # unsupported ranges are ignored, as allowed by RFC
+
+    if byte_range is None:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    if "content-disposition" in response.headers:
+        headers["Content-Disposition"] = response.headers[
+            "content-disposition"
+        ]
+    return StreamingResponse(
+        iter_file_range(path, start, end),
+        status_code=206,
+        headers=headers,
+        media_type=response.media_type,
+    )
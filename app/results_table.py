@@ -0,0 +1,157 @@
+import csv
+import sys
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+from app.csv_handler import CSVHandler
+from app.schemas import PROJECT_INFO_FIELDS, ProjectInfo
+
+ProjectRow = Tuple[str, str, int, int]
+
+
+class ResultsTable:
+    """
+    Compact, column-oriented in-memory table of project rows.
+
+    Integer columns are typed arrays of 4 byte values. Project hashes, which
+    are unique, are packed into a single UTF-8 buffer with end offsets instead
+    of being kept as separate str objects. Project names repeat a lot, so they
+    are dictionary-encoded: every distinct name is stored once and the column
+    holds its code. A row costs about 20 bytes plus the length of its hash,
+    compared to several hundred bytes for a ProjectInfo and its dictionary.
+
+    Rows are appended in order and never changed.
+
+    Attributes:
+        floor_counts (array): Number of floors per row.
+        room_counts (array): Number of rooms per row.
+        name_codes (array): Index of the name of every row in `names`.
+        names (List[str]): Distinct project names, in order of appearance.
+    """
+
+    __slots__ = (
+        "floor_counts",
+        "room_counts",
+        "name_codes",
+        "names",
+        "_name_index",
+        "_hashes",
+        "_hash_ends",
+    )
+
+    def __init__(self) -> None:
+        self.floor_counts = array("i")
+        self.room_counts = array("i")
+        self.name_codes = array("I")
+        self.names: List[str] = []
+        self._name_index: Dict[str, int] = {}
+        self._hashes = bytearray()
+        self._hash_ends = array("Q")
+
+    def __len__(self) -> int:
+        return len(self._hash_ends)
+
+    def __iter__(self) -> Iterator[ProjectRow]:
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def append(
+        self, hash: str, name: str, floor_count: int, room_count: int
+    ) -> None:
+        """
+        Appends a row.
+
+        :param hash: Hash of the project.
+        :param name: Name of the project.
+        :param floor_count: Number of floors.
+        :param room_count: Number of rooms.
+        """
+        code = self._name_index.get(name)
+        if code is None:
+            code = len(self.names)
+            self.names.append(sys.intern(name))
+            self._name_index[name] = code
+        self._hashes += hash.encode()
+        self._hash_ends.append(len(self._hashes))
+        self.name_codes.append(code)
+        self.floor_counts.append(int(floor_count))
+        self.room_counts.append(int(room_count))
+
+    def append_project(self, project_info: ProjectInfo) -> None:
+        """
+        Appends the row of a project.
+
+        :param project_info: The parsed project.
+        """
+        self.append(*project_info.as_row())
+
+    def hash(self, index: int) -> str:
+        """
+        :param index: Index of the row.
+        :return: The project hash of the row.
+        """
+        start = self._hash_ends[index - 1] if index else 0
+        end = self._hash_ends[index]
+        return self._hashes[start:end].decode()
+
+    def row(self, index: int) -> ProjectRow:
+        """
+        :param index: Index of the row.
+        :return: The values of the row in the order of PROJECT_INFO_FIELDS.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError("row index out of range")
+        return (
+            self.hash(index),
+            self.names[self.name_codes[index]],
+            self.floor_counts[index],
+            self.room_counts[index],
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :return: Approximate memory used by the table in bytes.
+        """
+        columns = (
+            self.floor_counts,
+            self.room_counts,
+            self.name_codes,
+            self._hashes,
+            self._hash_ends,
+        )
+        return (
+            sum(sys.getsizeof(column) for column in columns)
+            + sys.getsizeof(self.names)
+            + sys.getsizeof(self._name_index)
+            + sum(sys.getsizeof(name) for name in self.names)
+        )
+
+    def write_csv(self, csv_handler: CSVHandler) -> None:
+        """
+        Writes all rows through a CSV handler, streaming them without per-row dictionaries.
+
+        :param csv_handler: Handler of the output file.
+        """
+        csv_handler.write_rows(PROJECT_INFO_FIELDS, self)
+
+    @classmethod
+    def from_csv(cls, file_path: str) -> "ResultsTable":
+        """
+        Loads the rows of a generated CSV file.
+
+        :param file_path: Path to a CSV file with the PROJECT_INFO_FIELDS columns.
+        :return: The table.
+        :raises ValueError: If the file has different columns.
+        """
+        table = cls()
+        with open(file_path, newline="") as csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader, None)
+            if header is None:
+                return table
+            if tuple(header) != PROJECT_INFO_FIELDS:
+                raise ValueError(f"Unexpected CSV columns: {header}")
+            for hash, name, floor_count, room_count in reader:
+                table.append(hash, name, int(floor_count), int(room_count))
+        return table
@@ -1,8 +1,10 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, fields
+from typing import List, Optional, Tuple
 
+from pydantic import BaseModel, ConfigDict, Field
 
-@dataclass
+
+@dataclass(slots=True)
 class ProjectInfo:
     """
     Data class to store information about a project.
@@ -13,8 +15,21 @@ class ProjectInfo:
     floor_count: int
     room_count: int
 
+    def as_row(self) -> Tuple[str, str, int, int]:
+        """
+        :return: The values in the order of PROJECT_INFO_FIELDS, without
+            building a dictionary like asdict does.
+        """
+        return self.hash, self.name, self.floor_count, self.room_count
+
+
+# CSV columns of a project, in the order of ProjectInfo.as_row
+PROJECT_INFO_FIELDS: Tuple[str, ...] = tuple(
+    f.name for f in fields(ProjectInfo)
+)
+
 
-@dataclass
+@dataclass(slots=True)
 class ParsedData:
     """
     Generic data class to store parsed data.
@@ -22,3 +37,33 @@ class ParsedData:
 
     project_info: Optional[ProjectInfo] = None
     extracted_param: Optional[str] = None
+
+
+class GenerationJobRequest(BaseModel):
+    """
+    Request body for creating a generation job with a custom list of URLs.
+    """
+
+    urls: List[str] = Field(min_length=1)
+    # Share of the outbound request budget relative to other running jobs
+    weight: float = Field(default=1.0, gt=0)
+    # Time budget of the job in seconds, the server default if omitted
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)
+
+
+class RuntimeSettingsUpdate(BaseModel):
+    """
+    Request body for adjusting runtime settings, omitted settings are kept.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    # At most global_max_concurrent_requests, validated against the
+    # effective value by the endpoint
+    max_concurrent_tasks: Optional[int] = Field(default=None, ge=1)
+    global_max_concurrent_requests: Optional[int] = Field(default=None, ge=1)
+    # 0 disables rate limiting
+    global_max_requests_per_second: Optional[float] = Field(default=None, ge=0)
+    hedging_enabled: Optional[bool] = None
+    hedge_max_ratio: Optional[float] = Field(default=None, ge=0, le=1)
+    parse_memo_max_entries: Optional[int] = Field(default=None, ge=1)
@@ -0,0 +1,102 @@
+from collections import defaultdict
+from typing import Any, Callable, DefaultDict, Dict, List
+
+from app.config import (
+    GLOBAL_MAX_CONCURRENT_REQUESTS,
+    GLOBAL_MAX_REQUESTS_PER_SECOND,
+    HEDGE_MAX_RATIO,
+    HEDGING_ENABLED,
+    MAX_CONCURRENT_TASKS,
+    PARSE_MEMO_MAX_ENTRIES,
+)
+from app.logger import logger
+
+
+class RuntimeSettings:
+    """
+    Performance-relevant limits that can be adjusted on the live process.
+
+    The initial values come from app/config.py, including its environment and
+    config file overrides. Components watch the settings they depend on and
+    apply changes immediately, so limits can be tuned against the real
+    upstream behaviour without restarting and losing running jobs.
+
+    Attributes:
+        max_concurrent_tasks (int): Number of projects processed in parallel by a run.
+        global_max_concurrent_requests (int): Process-wide limit of requests in flight.
+        global_max_requests_per_second (float): Process-wide request rate limit, 0 for none.
+        hedging_enabled (bool): Whether slow requests are hedged.
+        hedge_max_ratio (float): Maximum share of hedged requests.
+        parse_memo_max_entries (int): Maximum number of memoized parse results.
+    """
+
+    def __init__(self) -> None:
+        self.max_concurrent_tasks: int = MAX_CONCURRENT_TASKS
+        self.global_max_concurrent_requests: int = (
+            GLOBAL_MAX_CONCURRENT_REQUESTS
+        )
+        self.global_max_requests_per_second: float = (
+            GLOBAL_MAX_REQUESTS_PER_SECOND
+        )
+        self.hedging_enabled: bool = HEDGING_ENABLED
+        self.hedge_max_ratio: float = HEDGE_MAX_RATIO
+        self.parse_memo_max_entries: int = PARSE_MEMO_MAX_ENTRIES
+        self._watchers: DefaultDict[
+            str, List[Callable[[Any], None]]
+        ] = defaultdict(list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        :return: The current values by setting name.
+        """
+        return {
+            name: value
+            for name, value in vars(self).items()
+            if not name.startswith("_")
+        }
+
+    def watch(
+        self, name: str, callback: Callable[[Any], None]
+    ) -> Callable[[], None]:
+        """
+        Calls the callback with the new value whenever the setting changes.
+
+        :param name: Name of the setting.
+        :param callback: Function applying the new value.
+        :return: Function removing the callback again.
+        :raises KeyError: If there is no such setting.
+        """
+        if name not in self.to_dict():
+            raise KeyError(f"Unknown setting: {name}")
+        self._watchers[name].append(callback)
+        return lambda: self._watchers[name].remove(callback)
+
+    def update(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Changes settings and notifies their watchers.
+
+        :param changes: New values by setting name, assumed to be validated.
+        :return: The changed settings with their new values.
+        :raises KeyError: If there is no such setting.
+        """
+        current = self.to_dict()
+        unknown = set(changes) - set(current)
+        if unknown:
+            raise KeyError(f"Unknown settings: {sorted(unknown)}")
+        changed = {
+            name: value
+            for name, value in changes.items()
+            if current[name] != value
+        }
+        for name, value in changed.items():
+            logger.info(
+                f"Setting {name} changed from {current[name]} to {value}"
+            )
+            setattr(self, name, value)
+            for callback in list(self._watchers[name]):
+                callback(value)
+        return changed
+
+
+# Settings of the process serving the app
+runtime_settings = RuntimeSettings()
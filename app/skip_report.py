@@ -0,0 +1,155 @@
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import IO, Any, Dict, Iterator, Optional
+
+from app.logger import logger
+
+DEADLINE_EXCEEDED = "Job deadline exceeded"
+
+
+@dataclass
+class SkippedURL:
+    """
+    Data class describing a URL that did not produce a CSV row.
+    """
+
+    url: str
+    stage: str
+    reason: str
+
+
+class SkipReport:
+    """
+    Machine-readable report of the URLs a generation run did not export,
+    written next to its output.
+
+    Skipped URLs are streamed to a temporary file as they occur and only
+    counted per stage in memory, so a run skipping most of a large URL list,
+    e.g. once its deadline has passed, does not grow its memory with them.
+
+    Attributes:
+        job_id (Optional[str]): ID of the job the report belongs to.
+        deadline_seconds (Optional[float]): Deadline of the run, None if unlimited.
+        deadline_exceeded (bool): Whether the run was cut short by its deadline.
+        processed (int): Number of URLs processed by the run.
+        skipped_by_stage (Dict[str, int]): Number of skipped URLs by pipeline stage.
+    """
+
+    def __init__(
+        self,
+        job_id: Optional[str] = None,
+        deadline_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        :param job_id: ID of the job the report belongs to.
+        :param deadline_seconds: Deadline of the run, None if unlimited.
+        """
+        self.job_id = job_id
+        self.deadline_seconds = deadline_seconds
+        self.deadline_exceeded = False
+        self.processed = 0
+        self.skipped_by_stage: Dict[str, int] = {}
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        # created on the first skip, removed once the report is garbage collected
+        self._entries_file: Optional[IO[str]] = None
+
+    @property
+    def skipped_count(self) -> int:
+        """
+        :return: Number of skipped URLs.
+        """
+        return sum(self.skipped_by_stage.values())
+
+    def add(self, url: str, stage: str, reason: str) -> None:
+        """
+        Records a URL that was skipped.
+
+        :param url: The project URL.
+        :param stage: Pipeline stage the URL was skipped at.
+        :param reason: Description of why the URL was skipped.
+        """
+        if self._entries_file is None:
+            self._entries_file = tempfile.TemporaryFile("w+")
+        entry = SkippedURL(url=url, stage=stage, reason=reason)
+        self._entries_file.write(json.dumps(asdict(entry)) + "\n")
+        self.skipped_by_stage[stage] = self.skipped_by_stage.get(stage, 0) + 1
+
+    def add_expired(self, url: str, stage: str) -> None:
+        """
+        Records a URL that was skipped because the deadline of the run passed.
+
+        :param url: The project URL.
+        :param stage: Pipeline stage the URL was skipped at.
+        """
+        self.deadline_exceeded = True
+        self.add(url, stage, DEADLINE_EXCEEDED)
+
+    def _lines(self) -> Iterator[str]:
+        """
+        :return: Iterator of the skipped URLs serialized as JSON, in order.
+        """
+        if self._entries_file is None:
+            return
+        self._entries_file.flush()
+        self._entries_file.seek(0)
+        for line in self._entries_file:
+            yield line.rstrip("\n")
+        self._entries_file.seek(0, os.SEEK_END)
+
+    def skipped(self) -> Iterator[SkippedURL]:
+        """
+        :return: Iterator of the skipped URLs and why, in order.
+        """
+        for line in self._lines():
+            yield SkippedURL(**json.loads(line))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        :return: Dictionary with the report summary, without the skipped URLs.
+        """
+        return {
+            "job_id": self.job_id,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "deadline_seconds": self.deadline_seconds,
+            "deadline_exceeded": self.deadline_exceeded,
+            "processed": self.processed,
+            "skipped_count": self.skipped_count,
+            "skipped_by_stage": self.skipped_by_stage,
+        }
+
+    def save(self, file_path: str) -> None:
+        """
+        Marks the run as finished and atomically writes the report as JSON,
+        streaming the skipped URLs into it.
+
+        :param file_path: Path to the report file.
+        """
+        self.finished_at = time.time()
+        tmp_path = f"{file_path}.tmp"
+        try:
+            with open(tmp_path, "w") as report_file:
+                # the summary object, left open for the list of skipped URLs
+                report_file.write(json.dumps(self.to_dict())[:-1])
+                report_file.write(', "skipped": [')
+                for index, line in enumerate(self._lines()):
+                    report_file.write(f", {line}" if index else line)
+                report_file.write("]}")
+            os.replace(tmp_path, file_path)
+        except IOError as e:
+            logger.error(f"IOError: {e}")
+
+    @staticmethod
+    def read(file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        :param file_path: Path to the report file.
+        :return: The saved report, or None if it does not exist.
+        """
+        if not os.path.isfile(file_path):
+            return None
+        with open(file_path, "r") as report_file:
+            return json.load(report_file)
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from app.logger import logger
+
+MANIFEST_FILE_NAME = "current.json"
+
+
+@dataclass
+class Snapshot:
+    """
+    Data class describing a published, complete CSV snapshot.
+    """
+
+    version: int
+    file_name: str
+    created_at: float
+    size: int
+    sha256: str = ""
+
+    @property
+    def etag(self) -> str:
+        """
+        :return: Strong ETag derived from the version and the content hash.
+        """
+        return f'"{self.version}-{self.sha256[:16]}"'
+
+
+class SnapshotStore:
+    """
+    Stores complete CSV outputs as immutable, versioned snapshots.
+
+    Generation runs write to a partial file which is atomically renamed into
+    the snapshot folder once the run has finished. A manifest file, replaced
+    atomically as well, points to the latest snapshot, so readers always get
+    the last complete output and never a half-written file.
+
+    Attributes:
+        folder (str): Folder containing the snapshots and the manifest.
+        file_name (str): Base file name of the snapshots.
+        current_path (Optional[str]): Path kept pointing at the latest snapshot.
+        keep (int): Number of snapshots to keep.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        file_name: str,
+        current_path: Optional[str] = None,
+        keep: int = 3,
+    ) -> None:
+        """
+        :param folder: Folder containing the snapshots and the manifest.
+        :param file_name: Base file name of the snapshots.
+        :param current_path: Path kept pointing at the latest snapshot.
+        :param keep: Number of snapshots to keep.
+        """
+        self.folder = folder
+        self.file_name = file_name
+        self.current_path = current_path
+        self.keep = keep
+
+    @property
+    def manifest_path(self) -> str:
+        """
+        :return: Path to the manifest of the latest snapshot.
+        """
+        return os.path.join(self.folder, MANIFEST_FILE_NAME)
+
+    def snapshot_path(self, snapshot: Snapshot) -> str:
+        """
+        :param snapshot: The snapshot.
+        :return: Path to the snapshot file.
+        """
+        return os.path.join(self.folder, snapshot.file_name)
+
+    def latest(self) -> Optional[Snapshot]:
+        """
+        Reads the manifest of the latest snapshot.
+
+        :return: The latest Snapshot, or None if nothing was published yet.
+        """
+        try:
+            with open(self.manifest_path, "r") as manifest:
+                return Snapshot(**json.load(manifest))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            logger.error(
+                f"Invalid snapshot manifest {self.manifest_path}: {e}"
+            )
+            return None
+
+    def publish(self, source_path: str) -> Snapshot:
+        """
+        Atomically publishes a complete file as the next snapshot.
+
+        :param source_path: Path to the complete file. The file is moved.
+        :return: The published Snapshot.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        latest = self.latest()
+        version = latest.version + 1 if latest else 1
+
+        stem, extension = os.path.splitext(self.file_name)
+        snapshot = Snapshot(
+            version=version,
+            file_name=f"{stem}.{version}{extension}",
+            created_at=time.time(),
+            size=os.path.getsize(source_path),
+            sha256=self._sha256(source_path),
+        )
+
+        self._fsync(source_path)
+        os.replace(source_path, self.snapshot_path(snapshot))
+        self._write_atomically(
+            self.manifest_path, json.dumps(asdict(snapshot)).encode()
+        )
+        if self.current_path:
+            self._link_atomically(
+                self.snapshot_path(snapshot), self.current_path
+            )
+        self._prune(version)
+
+        logger.info(f"Published snapshot {snapshot.file_name}")
+        return snapshot
+
+    def _prune(self, version: int) -> None:
+        """
+        Removes snapshots older than the `keep` most recent ones.
+
+        Readers that already opened an old snapshot keep reading it, as the
+        file is only unlinked.
+
+        :param version: Version of the latest snapshot.
+        """
+        stem, extension = os.path.splitext(self.file_name)
+        for old_version in range(version - self.keep, 0, -1):
+            path = os.path.join(
+                self.folder, f"{stem}.{old_version}{extension}"
+            )
+            if not os.path.isfile(path):
+                break
+            os.remove(path)
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        """
+        Computes the SHA-256 digest of a file in chunks.
+
+        :param path: Path to the file.
+        :return: Hex digest of the file content.
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(64 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _fsync(path: str) -> None:
+        """
+        Flushes a file to disk before it is published.
+
+        :param path: Path to the file.
+        """
+        with open(path, "rb") as file:
+            os.fsync(file.fileno())
+
+    @staticmethod
+    def _write_atomically(path: str, content: bytes) -> None:
+        """
+        Writes a file through a temporary file and an atomic rename.
+
+        :param path: Path to the file.
+        :param content: Content of the file.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _link_atomically(source_path: str, target_path: str) -> None:
+        """
+        Atomically replaces target_path with a hard link to source_path,
+        falling back to a copy where hard links are not supported.
+
+        :param source_path: Path to the existing file.
+        :param target_path: Path to replace.
+        """
+        tmp_path = f"{target_path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(source_path, tmp_path)
+        except OSError:
+            with open(source_path, "rb") as source:
+                SnapshotStore._write_atomically(tmp_path, source.read())
+        os.replace(tmp_path, target_path)
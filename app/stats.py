@@ -0,0 +1,137 @@
+import asyncio
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from app.config import STATS_HISTOGRAM_BINS, STATS_PERCENTILES
+from app.logger import logger
+from app.results_table import ResultsTable
+from app.snapshots import Snapshot, SnapshotStore
+
+
+def histogram(values: np.ndarray, max_bins: int) -> Dict[str, Any]:
+    """
+    Counts values per bin. Integer ranges narrower than max_bins get one bin
+    per value, wider ranges are split into max_bins equal bins.
+
+    :param values: Integer values.
+    :param max_bins: Maximum number of bins.
+    :return: The bin edges and the counts per bin.
+    """
+    if not values.size:
+        return {"edges": [], "counts": []}
+    low, high = int(values.min()), int(values.max())
+    if high - low < max_bins:
+        counts = np.bincount(values - low, minlength=high - low + 1)
+        edges = np.arange(low, high + 2)
+    else:
+        counts, edges = np.histogram(values, bins=max_bins)
+    return {"edges": edges.tolist(), "counts": counts.tolist()}
+
+
+def describe(
+    values: np.ndarray, percentiles: Sequence[float], max_bins: int
+) -> Dict[str, Any]:
+    """
+    Summarizes a column.
+
+    :param values: The values of the column.
+    :param percentiles: Percentiles to compute, between 0 and 100.
+    :param max_bins: Maximum number of histogram bins, 0 for no histogram.
+    :return: Count, min, max, mean, standard deviation, percentiles and histogram.
+    """
+    if not values.size:
+        return {"count": 0}
+    summary = {
+        "count": int(values.size),
+        "min": values.min().item(),
+        "max": values.max().item(),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "percentiles": {
+            f"p{p:g}": float(v)
+            for p, v in zip(percentiles, np.percentile(values, percentiles))
+        },
+    }
+    if max_bins:
+        summary["histogram"] = histogram(values, max_bins)
+    return summary
+
+
+def summarize(
+    table: ResultsTable,
+    percentiles: Sequence[float] = STATS_PERCENTILES,
+    max_bins: int = STATS_HISTOGRAM_BINS,
+) -> Dict[str, Any]:
+    """
+    Computes summary statistics of the floor and room counts of a table.
+
+    The typed columns of the table are viewed as NumPy arrays without copying.
+
+    :param table: The results table.
+    :param percentiles: Percentiles to compute, between 0 and 100.
+    :param max_bins: Maximum number of histogram bins.
+    :return: Statistics per column and of the rooms per floor ratio, which
+        leaves out projects without floors.
+    """
+    floors = np.frombuffer(table.floor_counts, dtype=np.intc)
+    rooms = np.frombuffer(table.room_counts, dtype=np.intc)
+    with_floors = floors > 0
+    ratio = rooms[with_floors] / floors[with_floors]
+    return {
+        "count": len(table),
+        "floor_count": describe(floors, percentiles, max_bins),
+        "room_count": describe(rooms, percentiles, max_bins),
+        "rooms_per_floor": {
+            **describe(ratio, percentiles, 0),
+            "without_floors": int(floors.size - ratio.size),
+        },
+    }
+
+
+class SnapshotStats:
+    """
+    Summary statistics of the latest snapshot of a store.
+
+    The statistics are computed in a thread, as loading a large snapshot takes
+    a while, and cached until a new snapshot is published. Concurrent requests
+    for the same version share a single computation.
+
+    Attributes:
+        store (SnapshotStore): Store whose latest snapshot is summarized.
+        version (Optional[int]): Version of the snapshot the cached statistics belong to.
+    """
+
+    def __init__(self, store: SnapshotStore) -> None:
+        """
+        :param store: Store whose latest snapshot is summarized.
+        """
+        self.store = store
+        self.version: Optional[int] = None
+        self._stats: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns the statistics of the latest snapshot, computing them if it changed.
+
+        :return: The statistics, or None if nothing was published yet.
+        :raises ValueError: If the snapshot does not have the project columns.
+        """
+        async with self._lock:
+            snapshot = self.store.latest()
+            if snapshot is None:
+                return None
+            if snapshot.version != self.version:
+                self._stats = await asyncio.to_thread(self._compute, snapshot)
+                self.version = snapshot.version
+            return self._stats
+
+    def _compute(self, snapshot: Snapshot) -> Dict[str, Any]:
+        """
+        :param snapshot: The snapshot to summarize.
+        :return: Statistics of the snapshot and its version.
+        """
+        logger.info(f"Computing statistics of {snapshot.file_name}")
+        table = ResultsTable.from_csv(self.store.snapshot_path(snapshot))
+        return {"snapshot_version": snapshot.version, **summarize(table)}
@@ -0,0 +1,337 @@
+import codecs
+import io
+import json
+import tempfile
+from email.message import Message
+from types import TracebackType
+from typing import Any, AsyncIterator, Optional, Tuple, Type, Union
+
+import aiohttp
+import httpx
+
+from app.config import (
+    GLOBAL_MAX_CONCURRENT_REQUESTS,
+    HTTP2_ENABLED,
+    RESPONSE_CHUNK_BYTES,
+    RESPONSE_SPOOL_BYTES,
+)
+
+
+class ArchiveMissError(Exception):
+    """
+    Raised when replaying a URL that is missing from the HTTP archive.
+    """
+
+
+class ResponseTooLargeError(Exception):
+    """
+    Raised when a response body exceeds the size limit of its stage.
+    """
+
+
+class UpstreamStatusError(Exception):
+    """
+    Raised when the upstream answers with an error status.
+
+    Attributes:
+        status (int): The HTTP status code of the response.
+    """
+
+    def __init__(self, status: int) -> None:
+        """
+        :param status: The HTTP status code of the response.
+        """
+        super().__init__(f"Upstream responded with status {status}")
+        self.status = status
+
+
+# Errors raised by any of the supported transports while fetching data
+FETCH_ERRORS = (
+    aiohttp.ClientError,
+    httpx.HTTPError,
+    httpx.InvalidURL,
+    ArchiveMissError,
+    ResponseTooLargeError,
+    UpstreamStatusError,
+)
+
+
+class HTTPXResponse:
+    """
+    Adapter exposing a streamed httpx response through the subset of the
+    aiohttp response interface used by the fetchers.
+
+    Attributes:
+        response (httpx.Response): The wrapped httpx response.
+    """
+
+    def __init__(self, response: httpx.Response) -> None:
+        """
+        :param response: The streamed httpx response to wrap.
+        """
+        self.response = response
+
+    @property
+    def status(self) -> int:
+        """
+        :return: The HTTP status code of the response.
+        """
+        return self.response.status_code
+
+    @property
+    def headers(self) -> httpx.Headers:
+        """
+        :return: The headers of the response.
+        """
+        return self.response.headers
+
+    async def read(self) -> bytes:
+        """
+        Reads the whole response body.
+
+        :return: The response body as bytes.
+        """
+        return await self.response.aread()
+
+    def iter_chunked(self, chunk_size: int) -> AsyncIterator[bytes]:
+        """
+        Streams the response body, like aiohttp's `response.content.iter_chunked`.
+
+        :param chunk_size: Maximum number of bytes per chunk.
+        :return: Async iterator over the decoded body bytes.
+        """
+        return self.response.aiter_bytes(chunk_size)
+
+    async def text(self) -> str:
+        """
+        Reads the whole response body and decodes it.
+
+        :return: The response body as a string.
+        """
+        await self.response.aread()
+        return self.response.text
+
+    async def json(self) -> Any:
+        """
+        Reads the whole response body and decodes it as JSON.
+
+        :return: The decoded JSON data.
+        """
+        return json.loads(await self.text())
+
+
+class HTTPXRequestContext:
+    """
+    Async context manager performing a streamed GET request with httpx,
+    mirroring `async with aiohttp.ClientSession.get(url) as response`.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, url: str) -> None:
+        """
+        :param client: The httpx client to send the request with.
+        :param url: The URL to fetch.
+        """
+        self._stream = client.stream("GET", url)
+
+    async def __aenter__(self) -> HTTPXResponse:
+        """
+        Sends the request and waits for the response headers.
+
+        :return: The response wrapped in HTTPXResponse.
+        """
+        return HTTPXResponse(await self._stream.__aenter__())
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        """
+        Closes the response and returns the connection to the pool.
+        """
+        await self._stream.__aexit__(exc_type, exc_val, exc_tb)
+
+
+class HTTPXSession:
+    """
+    httpx based transport with an interface compatible with the parts of
+    aiohttp.ClientSession used by the fetchers.
+
+    With HTTP/2 enabled, concurrent requests to the same host are
+    multiplexed over a single connection instead of opening one HTTP/1.1
+    connection per request.
+
+    Requests are sent only once the request scheduler grants them, so the
+    connection pool is sized to the scheduler budget, and the client does not
+    time out on its own: the stage timeouts and the job deadline apply instead.
+
+    Attributes:
+        client (httpx.AsyncClient): The underlying httpx client.
+    """
+
+    def __init__(
+        self,
+        http2: bool = HTTP2_ENABLED,
+        max_connections: int = GLOBAL_MAX_CONCURRENT_REQUESTS,
+        **client_kwargs: Any,
+    ) -> None:
+        """
+        :param http2: Whether to negotiate HTTP/2 with the upstream.
+        :param max_connections: Maximum number of open connections.
+        :param client_kwargs: Extra keyword arguments for httpx.AsyncClient.
+        """
+        client_kwargs.setdefault("timeout", httpx.Timeout(None))
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(max_connections=max_connections),
+            follow_redirects=True,
+            **client_kwargs,
+        )
+
+    def get(self, url: str) -> HTTPXRequestContext:
+        """
+        Prepares a GET request to be used as an async context manager.
+
+        :param url: The URL to fetch.
+        :return: Async context manager yielding the response.
+        """
+        return HTTPXRequestContext(self.client, url)
+
+    async def close(self) -> None:
+        """
+        Closes all connections of the session.
+        """
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "HTTPXSession":
+        """
+        :return: The session itself.
+        """
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        """
+        Closes the session when leaving the context.
+        """
+        await self.close()
+
+
+ClientSession = Union[aiohttp.ClientSession, HTTPXSession]
+
+HTTP_BACKENDS: Tuple[str, ...] = ("aiohttp", "httpx")
+
+
+def create_session(backend: str, **kwargs: Any) -> ClientSession:
+    """
+    Creates an HTTP session for the given backend.
+
+    :param backend: Name of the backend, one of HTTP_BACKENDS.
+    :param kwargs: Extra keyword arguments for the session constructor.
+    :return: The session, to be used as an async context manager.
+    """
+    match backend:
+        case "aiohttp":
+            return aiohttp.ClientSession(**kwargs)
+        case "httpx":
+            return HTTPXSession(**kwargs)
+        case _:
+            raise ValueError(
+                f"Unknown HTTP backend: {backend}. "
+                f"Expected one of {list(HTTP_BACKENDS)}"
+            )
+
+
+def iter_chunks(response: Any, chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Streams the body of a response of any of the supported transports.
+
+    :param response: The response, an aiohttp response or one of the adapters.
+    :param chunk_size: Maximum number of bytes per chunk.
+    :return: Async iterator over the body bytes.
+    """
+    if isinstance(response, aiohttp.ClientResponse):
+        return response.content.iter_chunked(chunk_size)
+    return response.iter_chunked(chunk_size)
+
+
+def check_status(response: Any) -> None:
+    """
+    :param response: The response, an aiohttp response or one of the adapters.
+    :raises UpstreamStatusError: If the response has an error status.
+    """
+    if response.status >= 400:
+        raise UpstreamStatusError(response.status)
+
+
+def get_charset(response: Any, default: str = "utf-8") -> str:
+    """
+    :param response: The response.
+    :param default: Charset used if the Content-Type names none or an unknown one.
+    :return: The charset of the response body.
+    """
+    message = Message()
+    message["Content-Type"] = response.headers.get("Content-Type", "")
+    charset = message.get_content_charset()
+    if not charset:
+        return default
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return default
+
+
+async def read_text(
+    response: Any,
+    max_bytes: int = 0,
+    spool_bytes: int = RESPONSE_SPOOL_BYTES,
+    chunk_bytes: int = RESPONSE_CHUNK_BYTES,
+) -> str:
+    """
+    Reads and decodes a response body with a bounded memory footprint.
+
+    A response announcing a body larger than the limit in its Content-Length
+    is rejected before reading it, otherwise the body is streamed and
+    aborted once it exceeds the limit, which also covers chunked and
+    compressed responses. While downloading, bodies larger than spool_bytes
+    are buffered in a temporary file instead of memory, so slow transfers
+    of large documents do not pile up in memory at high concurrency. The
+    text is decoded from the buffer incrementally, so the raw bytes of a
+    spooled body are never held in memory as a whole.
+
+    :param response: The response, an aiohttp response or one of the adapters.
+    :param max_bytes: Maximum body size in bytes, 0 for none.
+    :param spool_bytes: Body size from which the body is buffered on disk.
+    :param chunk_bytes: Number of bytes read at a time.
+    :return: The decoded body.
+    :raises ResponseTooLargeError: If the body exceeds max_bytes.
+    """
+    content_length = response.headers.get("Content-Length", "")
+    if max_bytes and content_length.isdigit():
+        if int(content_length) > max_bytes:
+            raise ResponseTooLargeError(
+                f"Content-Length of {content_length} bytes "
+                f"exceeds the limit of {max_bytes} bytes"
+            )
+    size = 0
+    with tempfile.SpooledTemporaryFile(max_size=spool_bytes) as body:
+        async for chunk in iter_chunks(response, chunk_bytes):
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise ResponseTooLargeError(
+                    f"Body exceeds the limit of {max_bytes} bytes"
+                )
+            body.write(chunk)
+        body.seek(0)
+        text = io.TextIOWrapper(
+            body, get_charset(response), errors="replace", newline=""
+        )
+        try:
+            return text.read()
+        finally:
+            text.detach()
@@ -1,58 +1,187 @@
 import asyncio
-from dataclasses import asdict
-from typing import List
+import os
+import uuid
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterable, Dict, Iterable, Optional, Sequence, Union
 from urllib.parse import urlparse
 
-import aiohttp
-
-from app.config import CSV_FILE_PATH, PLANNER5D_API_PROJECT_URL
+from app.checkpoint import CheckpointJournal
+from app.config import (
+    API_FETCH_TIMEOUT_SECONDS,
+    CHECKPOINT_FILE_PATH,
+    CSV_PARTIAL_FILE_PATH,
+    HTML_FETCH_TIMEOUT_SECONDS,
+    HTTP_BACKEND,
+    JOB_DEADLINE_SECONDS,
+    PLANNER5D_API_PROJECT_URL,
+)
 from app.csv_handler import CSVHandler
+from app.deadlines import Deadline
 from app.fetchers import AsyncHTMLDataFetcher, AsyncJSONDataFetcher
+from app.gallery import project_slug, resolve_project_keys
+from app.hedging import api_hedge_policy, html_hedge_policy
+from app.http_archive import HTTPArchive, http_archive
 from app.logger import logger
+from app.loop_monitor import loop_monitor
+from app.negative_cache import NegativeCache, is_permanent_failure
+from app.parse_memo import MemoizedParsingStrategy, ParseMemo
 from app.parsers import HTMLParsingStrategy, JSONParsingStrategy
+from app.progress import RunProgress
+from app.request_scheduler import (
+    FairShareScheduler,
+    ScheduledSession,
+    request_scheduler,
+)
+from app.schemas import PROJECT_INFO_FIELDS, ParsedData
+from app.settings import RuntimeSettings
+from app.skip_report import SkipReport
+from app.snapshots import Snapshot, SnapshotStore
+from app.transports import ClientSession, create_session
+from app.worker_pool import AsyncWorkerPool
 
 
 async def fetch_and_parse_project_data_to_csv(
     semaphore: asyncio.Semaphore,
     url: str,
-    session: aiohttp.ClientSession,
+    session: ClientSession,
     csv_handler: CSVHandler,
-) -> None:
+    negative_cache: Optional[NegativeCache] = None,
+    parse_memo: Optional[ParseMemo] = None,
+    deadline: Optional[Deadline] = None,
+    skip_report: Optional[SkipReport] = None,
+    project_key: Optional[str] = None,
+) -> Optional[ParsedData]:
     """
     Asynchronously fetches and parses data for a given URL, handling errors gracefully.
 
+    Every fetching stage is limited to its timeout budget, capped by the time left until
+    the job deadline. Parsing stages are synchronous, so they are skipped rather than
+    interrupted once the deadline has passed.
+
+    Only permanent failures are recorded in the negative cache: invalid URLs, projects
+    missing upstream and responses the project cannot be parsed from. Timeouts, connection
+    errors and server errors are retried by the next run.
+
     :param semaphore: Semaphore to limit the number of concurrent fetches.
     :param url: The URL to fetch data from.
-    :param session: The aiohttp ClientSession to use for fetching data.
+    :param session: The HTTP session to use for fetching data.
     :param csv_handler: The CSVHandler instance to use for writing to CSV file.
+    :param negative_cache: NegativeCache to record the reason of a failure in.
+    :param parse_memo: ParseMemo reusing results for unchanged API responses, or None.
+    :param deadline: Deadline of the job, or None to apply only the stage timeouts.
+    :param skip_report: SkipReport to record the stage and reason of a skip in.
+    :param project_key: Key of the project if already known, to skip fetching its page.
+    :return: ParsedData with the project info and key written to CSV, or None on failure.
     """
+    deadline = deadline or Deadline()
+
+    def skip(stage: str, reason: str) -> None:
+        logger.error(f"{reason}: {url}")
+        if skip_report:
+            skip_report.add(url, stage, reason)
+
+    def fail(stage: str, reason: str, permanent: bool = True) -> None:
+        skip(stage, reason)
+        if negative_cache and permanent:
+            negative_cache.record_failure(url, reason)
+
+    def expire(stage: str) -> None:
+        logger.error(f"Job deadline exceeded: {url}")
+        if skip_report:
+            skip_report.add_expired(url, stage)
+
+    def time_out(stage: str, budget: float) -> None:
+        # Running out of the job budget is not a failure of the project
+        if deadline.expired:
+            expire(stage)
+        else:
+            skip(stage, f"Timed out after {budget}s")
+
     async with semaphore:
         # Validate URL
         if not is_valid_url(url):
-            logger.error(f"Invalid URL provided: {url}")
-            return
+            fail("validate", "Invalid URL provided")
+            return None
 
-        # Fetch HTML data asynchronously
-        html_data = await AsyncHTMLDataFetcher().fetch_data(url, session)
+        if project_key:
+            # Resolved from a gallery listing page, the project page is not needed
+            extracted_param: Optional[str] = project_key
+        else:
+            # Fetch HTML data asynchronously
+            html_fetcher = AsyncHTMLDataFetcher(html_hedge_policy)
+            try:
+                async with deadline.timeout(HTML_FETCH_TIMEOUT_SECONDS):
+                    html_data = await html_fetcher.fetch_data(url, session)
+            except TimeoutError:
+                time_out("fetch_html", HTML_FETCH_TIMEOUT_SECONDS)
+                return None
+            if html_data is None:
+                fail(
+                    "fetch_html",
+                    "Could not fetch HTML data",
+                    is_permanent_failure(html_fetcher.error),
+                )
+                return None
 
-        # Parse HTML data synchronously
-        html_result = HTMLParsingStrategy().parse(html_data)
+            # Parse HTML data synchronously
+            if deadline.expired:
+                expire("parse_html")
+                return None
+            with loop_monitor.stage("parse_html"):
+                html_result = HTMLParsingStrategy().parse(str(html_data))
 
-        if not html_result.extracted_param:
-            logger.error(f"Could not form API URL from HTML data for: {url}")
-            return
+            if not html_result.extracted_param:
+                fail("parse_html", "Could not form API URL from HTML data")
+                return None
+            extracted_param = html_result.extracted_param
 
-        # Form the API URL based on parsed HTML data
-        url_api = f"{PLANNER5D_API_PROJECT_URL}{html_result.extracted_param}/"
+        # Form the API URL based on the project key
+        url_api = f"{PLANNER5D_API_PROJECT_URL}{extracted_param}/"
 
         # Fetch JSON data asynchronously
-        json_data = await AsyncJSONDataFetcher().fetch_data(url_api, session)
+        api_fetcher = AsyncJSONDataFetcher(api_hedge_policy)
+        try:
+            async with deadline.timeout(API_FETCH_TIMEOUT_SECONDS):
+                json_data = await api_fetcher.fetch_data(url_api, session)
+        except TimeoutError:
+            time_out("fetch_api", API_FETCH_TIMEOUT_SECONDS)
+            return None
+        if json_data is None:
+            fail(
+                "fetch_api",
+                f"Could not fetch API data from {url_api}",
+                is_permanent_failure(api_fetcher.error),
+            )
+            return None
 
-        # Parse JSON data synchronously
-        json_result = JSONParsingStrategy().parse(json_data)
+        # Parse JSON data synchronously, unless the same body was parsed before
+        if deadline.expired:
+            expire("parse_api")
+            return None
+        json_strategy: Union[JSONParsingStrategy, MemoizedParsingStrategy]
+        json_strategy = JSONParsingStrategy()
+        if parse_memo:
+            json_strategy = MemoizedParsingStrategy(json_strategy, parse_memo)
+        with loop_monitor.stage("parse_api"):
+            json_result = json_strategy.parse(json_data)
+
+        project_info = json_result.project_info
+        if project_info is None:
+            fail("parse_api", "Could not parse project data from API data")
+            return None
 
         # Write to CSV file
-        csv_handler.write_dict_to_csv(asdict(json_result.project_info))
+        with loop_monitor.stage("write_csv"):
+            csv_handler.write_row(PROJECT_INFO_FIELDS, project_info.as_row())
+
+        if negative_cache:
+            negative_cache.record_success(url)
+
+        return ParsedData(
+            project_info=project_info,
+            extracted_param=extracted_param,
+        )
 
 
 def form_api_url(project_id: str) -> str:
@@ -65,25 +194,237 @@ def form_api_url(project_id: str) -> str:
     return f"{PLANNER5D_API_PROJECT_URL}{project_id}/"
 
 
+@dataclass
+class RunOptions:
+    """
+    Data class describing the per-run options of a generation run.
+
+    Attributes:
+        scheduler (FairShareScheduler): Scheduler granting the outbound requests, which shares the
+            process-wide request budget fairly between concurrently running jobs.
+        weight (float): Share of the request budget of this job relative to other jobs.
+        negative_cache (Optional[NegativeCache]): Cache of failing URLs skipped by the run and
+            updated with its failures, or None to retry all URLs.
+        parse_memo (Optional[ParseMemo]): Memo serving API responses identical to previously
+            parsed ones, or None to parse every response.
+        deadline_seconds (Optional[float]): Time budget of the run in seconds, None or 0 for no
+            deadline. Once it passes, in-flight work is cancelled, the remaining URLs are skipped
+            and the checkpoint is kept, so the next run of the job continues where it stopped.
+        report_path (Optional[str]): Path to write the skip report to, or None to not write it.
+        progress (Optional[RunProgress]): RunProgress to publish the outcome of every project to.
+        archive (HTTPArchive): HTTPArchive recording or replaying the upstream responses.
+        settings (Optional[RuntimeSettings]): RuntimeSettings whose max_concurrent_tasks the run
+            follows while it is running, or None.
+        listing_urls (Sequence[str]): URLs of gallery listing pages to resolve project keys from,
+            so only projects missing from the listings need a request for their own page.
+    """
+
+    scheduler: FairShareScheduler = request_scheduler
+    weight: float = 1.0
+    negative_cache: Optional[NegativeCache] = None
+    parse_memo: Optional[ParseMemo] = None
+    deadline_seconds: Optional[float] = JOB_DEADLINE_SECONDS
+    report_path: Optional[str] = None
+    progress: Optional[RunProgress] = None
+    archive: HTTPArchive = http_archive
+    settings: Optional[RuntimeSettings] = None
+    listing_urls: Sequence[str] = ()
+
+
 async def fetch_data_and_save_in_parallel(
-    urls: List[str], max_concurrent_tasks: int
-) -> None:
+    urls: Union[Iterable[str], AsyncIterable[str]],
+    max_concurrent_tasks: int,
+    checkpoint_path: Optional[str] = CHECKPOINT_FILE_PATH,
+    job_id: Optional[str] = None,
+    snapshot_store: Optional[SnapshotStore] = None,
+    output_path: str = CSV_PARTIAL_FILE_PATH,
+    options: Optional[RunOptions] = None,
+) -> Optional[Snapshot]:
     """
-    Asynchronously fetches data for each unique URL in parallel, with a limit on the number of concurrent tasks.
+    Asynchronously fetches data for each URL in parallel, with a limit on the number of concurrent tasks.
+    URLs are pulled lazily by a fixed-size worker pool, so memory usage is proportional
+    to max_concurrent_tasks rather than to the number of URLs.
     Creates an instance of CSVHandler to write to CSV file and closes it after all tasks are completed.
 
-    :param urls: The list of URLs to fetch data from.
+    Completed projects are recorded in a checkpoint journal. If a previous run of the same job
+    was interrupted, its rows are restored from the journal, completed URLs are skipped
+    and new rows are appended to the partial output. Rows are written to a partial file which
+    is atomically published to the snapshot store once all tasks are completed, so readers
+    never see a half-written CSV.
+
+    :param urls: Iterable or async iterable of URLs to fetch data from.
     :param max_concurrent_tasks: The maximum number of concurrent tasks to run.
+    :param checkpoint_path: Path to the checkpoint journal, or None to disable checkpointing.
+    :param job_id: Identifier of the job. Defaults to a fingerprint of the URLs if they are a list,
+        without it other iterables are not checkpointed.
+    :param snapshot_store: SnapshotStore to publish the output to, or None to keep the partial file.
+    :param output_path: Path to the partial CSV file written by this run.
+    :param options: RunOptions of the run, or None for the defaults.
+    :return: The published Snapshot, or None if nothing was published.
     """
-    csv_handler = CSVHandler(CSV_FILE_PATH)
-    async with aiohttp.ClientSession() as session:
+    options = options or RunOptions()
+    negative_cache = options.negative_cache
+    parse_memo = options.parse_memo
+    progress = options.progress
+    settings = options.settings
+    scheduler = options.scheduler
+    archive = options.archive
+
+    csv_handler = CSVHandler(output_path)
+    csv_handler.reset()
+
+    checkpoint = None
+    if checkpoint_path and job_id is None:
+        if isinstance(urls, (list, tuple)):
+            job_id = CheckpointJournal.fingerprint(urls)
+        else:
+            # A journal of another run could not be told apart from this one
+            logger.warning(
+                "Checkpointing disabled, the URLs cannot be fingerprinted "
+                "before they are consumed and no job ID was given"
+            )
+            checkpoint_path = None
+    if checkpoint_path and job_id is not None:
+        checkpoint = CheckpointJournal(checkpoint_path, job_id)
+        if checkpoint.load():
+            # Rebuild the partial output from the journal, so rows torn by a crash are dropped
+            with loop_monitor.stage("write_csv"):
+                csv_handler.write_rows(
+                    PROJECT_INFO_FIELDS,
+                    (
+                        [row[field] for field in PROJECT_INFO_FIELDS]
+                        for row in checkpoint.rows()
+                    ),
+                )
+
+    # Pick up the entries saved or purged by other workers since the last run
+    if negative_cache:
+        await negative_cache.load()
+    if parse_memo:
+        await parse_memo.load()
+
+    deadline = Deadline(options.deadline_seconds)
+    skip_report = SkipReport(job_id, deadline.seconds)
+    scheduler_job_id = job_id or uuid.uuid4().hex
+    async with create_session(HTTP_BACKEND) as http_session:
+        session = ScheduledSession(
+            archive.wrap(http_session),
+            scheduler,
+            scheduler_job_id,
+            options.weight,
+        )
         sem = asyncio.Semaphore(max_concurrent_tasks)
-        tasks = [
-            fetch_and_parse_project_data_to_csv(sem, url, session, csv_handler)
-            for url in urls
-        ]
-        csv_handler.close()
-        await asyncio.gather(*tasks)
+        project_keys: Dict[str, str] = (
+            await resolve_project_keys(options.listing_urls, session, deadline)
+            if options.listing_urls
+            else {}
+        )
+
+        async def process_url(url: str) -> str:
+            if checkpoint and checkpoint.is_completed(url):
+                logger.info(f"Skipping already completed URL: {url}")
+                return "resumed"
+            if deadline.expired:
+                skip_report.add_expired(url, "queue")
+                return "skipped"
+            failed = negative_cache.get(url) if negative_cache else None
+            if failed:
+                logger.info(f"Skipping failing URL ({failed.reason}): {url}")
+                skip_report.add(url, "negative_cache", failed.reason)
+                return "skipped"
+
+            try:
+                result = await fetch_and_parse_project_data_to_csv(
+                    sem,
+                    url,
+                    session,
+                    csv_handler,
+                    negative_cache,
+                    parse_memo,
+                    deadline,
+                    skip_report,
+                    project_keys.get(project_slug(url) or ""),
+                )
+            except Exception as e:
+                # Unexpected errors are not cached, the next run retries the URL
+                skip_report.add(url, "pipeline", f"{type(e).__name__}: {e}")
+                raise
+            if not result or not result.project_info:
+                return "skipped"
+            if checkpoint:
+                with loop_monitor.stage("checkpoint"):
+                    checkpoint.record(
+                        url,
+                        result.extracted_param,
+                        dict(
+                            zip(
+                                PROJECT_INFO_FIELDS,
+                                result.project_info.as_row(),
+                            )
+                        ),
+                    )
+            return "written"
+
+        pool: AsyncWorkerPool[str, str] = AsyncWorkerPool(
+            process_url, max_concurrent_tasks
+        )
+
+        def resize(concurrency: int) -> None:
+            logger.info(
+                f"Resizing run from {pool.concurrency} to {concurrency}"
+            )
+            # the pool bounds the concurrency, the semaphore only has to allow it
+            for _ in range(concurrency - pool.concurrency):
+                sem.release()
+            pool.resize(concurrency)
+
+        unwatch = (
+            settings.watch("max_concurrent_tasks", resize)
+            if settings
+            else None
+        )
+        processed = 0
+        try:
+            async with aclosing(pool.imap_unordered(urls)) as work_results:
+                async for work_result in work_results:
+                    processed += 1
+                    if progress:
+                        progress.record(
+                            work_result.item, work_result.result or "skipped"
+                        )
+        finally:
+            if unwatch:
+                unwatch()
+            scheduler.forget(scheduler_job_id)
+            if negative_cache:
+                await negative_cache.save()
+            if parse_memo:
+                await parse_memo.save()
+            await archive.flush()
+        skip_report.processed = processed
+        logger.info(
+            f"Processed {processed} URLs, skipped {skip_report.skipped_count}"
+        )
+        if skip_report.deadline_exceeded:
+            logger.warning(
+                f"Deadline of {deadline.seconds}s exceeded, publishing partial output"
+            )
+
+    snapshot = None
+    if snapshot_store:
+        if os.path.isfile(csv_handler.file_path):
+            snapshot = snapshot_store.publish(csv_handler.file_path)
+        else:
+            logger.warning("No rows were written, snapshot not published")
+
+    if options.report_path:
+        skip_report.save(options.report_path)
+
+    # Removed only after publishing, so a crash in between still resumes the job
+    if checkpoint and not skip_report.deadline_exceeded:
+        checkpoint.remove()
+
+    return snapshot
 
 
 def is_valid_url(url: str) -> bool:
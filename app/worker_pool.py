@@ -0,0 +1,184 @@
+import asyncio
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+from app.logger import logger
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class WorkResult(Generic[T, R]):
+    """
+    Outcome of processing a single item by the worker pool.
+    """
+
+    item: T
+    result: Optional[R] = None
+    error: Optional[BaseException] = None
+
+
+class AsyncWorkerPool(Generic[T, R]):
+    """
+    Pool of asyncio workers that pull items lazily from an iterable or
+    async iterable.
+
+    Only `concurrency` items are in flight at any time and at most
+    `concurrency` finished results are buffered, so memory usage depends on
+    the pool size rather than on the number of input items. The pool can be
+    resized while it is processing items.
+
+    Attributes:
+        worker (Callable): Coroutine function called for every item.
+        concurrency (int): Number of workers running in parallel.
+    """
+
+    def __init__(
+        self, worker: Callable[[T], Awaitable[R]], concurrency: int
+    ) -> None:
+        """
+        :param worker: Coroutine function processing a single item.
+        :param concurrency: Number of workers running in parallel.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be a positive integer")
+        self.worker = worker
+        self.concurrency = concurrency
+        self._resize_callbacks: List[Callable[[], None]] = []
+
+    def resize(self, concurrency: int) -> None:
+        """
+        Changes the number of workers, including of running imap_unordered calls.
+        Extra workers start right away, surplus workers stop after their current item.
+
+        :param concurrency: Number of workers running in parallel.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be a positive integer")
+        self.concurrency = concurrency
+        for callback in list(self._resize_callbacks):
+            callback()
+
+    @staticmethod
+    async def _iterate(
+        items: Union[Iterable[T], AsyncIterable[T]]
+    ) -> AsyncGenerator[T, None]:
+        """
+        Normalizes sync and async iterables into an async iterator.
+
+        :param items: Items to iterate over.
+        :return: Async iterator over the items.
+        """
+        if isinstance(items, AsyncIterable):
+            async for item in items:
+                yield item
+        else:
+            for item in items:
+                yield item
+
+    async def imap_unordered(
+        self, items: Union[Iterable[T], AsyncIterable[T]]
+    ) -> AsyncGenerator[WorkResult[T, R], None]:
+        """
+        Processes items with the pool and yields results as they complete.
+
+        Exceptions raised by the worker are captured in WorkResult.error
+        instead of stopping the pool. Closing the generator early (e.g. with
+        contextlib.aclosing) cancels the workers that are still running.
+
+        :param items: Iterable or async iterable of items to process.
+        :return: Async iterator of WorkResult objects in completion order.
+        """
+        source = self._iterate(items)
+        source_lock = asyncio.Lock()
+        source_errors: List[Exception] = []
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        exhausted = object()
+        finished = object()
+
+        async def next_item() -> Any:
+            # async generators do not support concurrent __anext__ calls
+            async with source_lock:
+                try:
+                    return await source.__anext__()
+                except StopAsyncIteration:
+                    return exhausted
+
+        workers: List[asyncio.Task] = []
+        # workers not yet stopping, compared with the concurrency on every item
+        active = 0
+        running = 0
+
+        async def run_worker() -> None:
+            nonlocal active
+            try:
+                while active <= self.concurrency:
+                    try:
+                        item = await next_item()
+                    except Exception as e:
+                        logger.error(f"Error reading worker pool input: {e}")
+                        source_errors.append(e)
+                        break
+                    if item is exhausted:
+                        break
+                    try:
+                        result = await self.worker(item)
+                    except Exception as e:
+                        logger.error(f"Worker failed for {item}: {e}")
+                        await results.put(WorkResult(item=item, error=e))
+                    else:
+                        await results.put(WorkResult(item=item, result=result))
+            finally:
+                active -= 1
+            await results.put(finished)
+
+        def grow() -> None:
+            nonlocal active, running
+            while active < self.concurrency:
+                active += 1
+                running += 1
+                workers.append(asyncio.create_task(run_worker()))
+
+        grow()
+        self._resize_callbacks.append(grow)
+        try:
+            while running:
+                work_result = await results.get()
+                if work_result is finished:
+                    running -= 1
+                    continue
+                yield work_result
+        finally:
+            self._resize_callbacks.remove(grow)
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await source.aclose()
+
+        if source_errors:
+            raise source_errors[0]
+
+    async def run(self, items: Union[Iterable[T], AsyncIterable[T]]) -> int:
+        """
+        Processes all items and discards the results.
+
+        :param items: Iterable or async iterable of items to process.
+        :return: Number of processed items.
+        """
+        processed = 0
+        async for _ in self.imap_unordered(items):
+            processed += 1
+        return processed
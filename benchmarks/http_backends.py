@@ -0,0 +1,265 @@
+"""
+Benchmark comparing the aiohttp (HTTP/1.1) and httpx (HTTP/2) fetcher
+backends against a local stand-in for the Planner 5D project API.
+
+The stand-in server speaks both HTTP/1.1 and cleartext HTTP/2 (prior
+knowledge) on the same port and answers every request with the mock
+project JSON after a fixed delay, simulating upstream latency.
+
+Usage: python -m benchmarks.http_backends --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import aiohttp
+import h2.config
+import h2.connection
+import h2.events
+
+from app.fetchers import AsyncJSONDataFetcher
+from app.transports import ClientSession, HTTPXSession, create_session
+from fixtures import read_mock_data
+
+H2_PREFACE_START = b"PRI"
+
+
+class StandInServer:
+    """
+    Local HTTP/1.1 and HTTP/2 server serving a fixed JSON body.
+
+    Attributes:
+        body (bytes): The response body.
+        latency (float): Delay before each response, in seconds.
+        connections (int): Number of accepted TCP connections.
+        requests (int): Number of served requests.
+    """
+
+    def __init__(self, body: bytes, latency: float) -> None:
+        """
+        :param body: The response body.
+        :param latency: Delay before each response, in seconds.
+        """
+        self.body = body
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Starts listening on the given address.
+
+        :param host: Host to listen on.
+        :param port: Port to listen on, 0 picks a free port.
+        :return: Base URL of the server.
+        """
+        self._server = await asyncio.start_server(self._handle, host, port)
+        bound_port = self._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{bound_port}"
+
+    async def stop(self) -> None:
+        """
+        Stops the server.
+        """
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def reset(self) -> None:
+        """
+        Resets the connection and request counters.
+        """
+        self.connections = 0
+        self.requests = 0
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        try:
+            first = await reader.readexactly(len(H2_PREFACE_START))
+            if first == H2_PREFACE_START:
+                await self._handle_http2(first, reader, writer)
+            else:
+                await self._handle_http1(first, reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_http1(
+        self,
+        first: bytes,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        head = first + await reader.readuntil(b"\r\n\r\n")
+        while head:
+            await asyncio.sleep(self.latency)
+            self.requests += 1
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: application/json\r\n"
+                + f"Content-Length: {len(self.body)}\r\n\r\n".encode()
+                + self.body
+            )
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+
+    async def _handle_http2(
+        self,
+        first: bytes,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        connection = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False)
+        )
+        connection.initiate_connection()
+        writer.write(connection.data_to_send())
+
+        async def respond(stream_id: int) -> None:
+            await asyncio.sleep(self.latency)
+            self.requests += 1
+            connection.send_headers(
+                stream_id,
+                [
+                    (":status", "200"),
+                    ("content-type", "application/json"),
+                    ("content-length", str(len(self.body))),
+                ],
+            )
+            connection.send_data(stream_id, self.body, end_stream=True)
+            writer.write(connection.data_to_send())
+
+        responses = set()
+        data = first
+        while data:
+            for event in connection.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    task = asyncio.create_task(respond(event.stream_id))
+                    responses.add(task)
+                    task.add_done_callback(responses.discard)
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+            writer.write(connection.data_to_send())
+            await writer.drain()
+            data = await reader.read(65535)
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Result of benchmarking a single backend.
+    """
+
+    backend: str
+    requests: int
+    failures: int
+    seconds: float
+    connections: int
+
+    @property
+    def requests_per_second(self) -> float:
+        """
+        :return: Throughput of the run.
+        """
+        return self.requests / self.seconds if self.seconds else 0.0
+
+
+async def run_backend(
+    name: str,
+    session: ClientSession,
+    url: str,
+    requests: int,
+    concurrency: int,
+) -> BenchmarkResult:
+    """
+    Fetches the URL `requests` times with the given concurrency.
+
+    :param name: Name of the backend for the report.
+    :param session: The session of the backend.
+    :param url: The URL to fetch.
+    :param requests: Total number of requests.
+    :param concurrency: Number of requests in flight.
+    :return: BenchmarkResult of the run.
+    """
+    fetcher = AsyncJSONDataFetcher()
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def fetch_one() -> None:
+        nonlocal failures
+        async with semaphore:
+            if await fetcher.fetch_data(url, session) is None:
+                failures += 1
+
+    started = time.perf_counter()
+    async with session:
+        await asyncio.gather(*(fetch_one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return BenchmarkResult(name, requests, failures, elapsed, 0)
+
+
+async def main(requests: int, concurrency: int, latency: float) -> None:
+    """
+    Runs the benchmark for both backends and prints a report.
+
+    :param requests: Total number of requests per backend.
+    :param concurrency: Number of requests in flight.
+    :param latency: Simulated upstream latency, in seconds.
+    """
+    body = read_mock_data("json", "dummy_api.json").encode()
+    server = StandInServer(body, latency)
+    base_url = await server.start()
+    url = f"{base_url}/api/project/benchmark/"
+
+    sessions: Dict[str, ClientSession] = {
+        "aiohttp (HTTP/1.1)": create_session(
+            "aiohttp",
+            connector=aiohttp.TCPConnector(limit=concurrency),
+        ),
+        # Cleartext HTTP/2 requires prior knowledge, so HTTP/1.1 is disabled
+        "httpx (HTTP/2)": HTTPXSession(
+            http2=True, http1=False, max_connections=concurrency
+        ),
+    }
+
+    results: List[BenchmarkResult] = []
+    try:
+        for name, session in sessions.items():
+            server.reset()
+            result = await run_backend(
+                name, session, url, requests, concurrency
+            )
+            result.connections = server.connections
+            results.append(result)
+    finally:
+        await server.stop()
+
+    print(
+        f"{requests} requests, concurrency {concurrency}, "
+        f"simulated latency {latency * 1000:.0f} ms"
+    )
+    print(
+        f"{'backend':<20}{'seconds':>10}{'req/s':>10}"
+        f"{'connections':>13}{'failures':>10}"
+    )
+    for result in results:
+        print(
+            f"{result.backend:<20}{result.seconds:>10.3f}"
+            f"{result.requests_per_second:>10.1f}"
+            f"{result.connections:>13}{result.failures:>10}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency))
@@ -0,0 +1,491 @@
+"""
+Load test of the app's own HTTP endpoints.
+
+Drives the app in-process through the ASGI transport of httpx, or a running
+server such as a local uvicorn, with a configurable number of concurrent
+clients and a weighted mix of requests. Reports throughput, latency
+percentiles and error rates per endpoint, and compares them with a baseline
+saved by a previous run.
+
+In-process, a generation run started with --during-generation replays mock
+responses from an HTTP archive instead of crawling Planner 5D, and writes
+its checkpoint, negative cache, parse memo and skip report to a temporary
+folder. Against a running server, the run is a real one of that server.
+
+Usage:
+    python -m benchmarks.load_test --requests 2000 --concurrency 200
+    python -m benchmarks.load_test --uvicorn --mix /download-csv=8,/=2
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --save baseline.json
+    python -m benchmarks.load_test --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from unittest.mock import patch
+
+import httpx
+
+from app.config import (
+    NEGATIVE_CACHE_BASE_TTL_SECONDS,
+    NEGATIVE_CACHE_MAX_TTL_SECONDS,
+    PARSE_MEMO_MAX_ENTRIES,
+)
+from app.http_archive import ArchivedResponse, HTTPArchive
+from app.logger import logger
+from app.negative_cache import NegativeCache
+from app.parse_memo import JSON_PARSER_VERSION, ParseMemo
+from app.parsers import HTMLParsingStrategy
+from app.snapshots import SnapshotStore
+from app.utils import (
+    RunOptions,
+    fetch_data_and_save_in_parallel,
+    form_api_url,
+)
+from fixtures import get_mock_data_file_path, read_mock_data
+
+DEFAULT_MIX = "/download-csv=8,/=2"
+
+# Recorded latency of the replayed responses, in seconds
+REPLAY_TTFB = 0.05
+REPLAY_ELAPSED = 0.1
+
+
+def parse_mix(mix: str) -> List[Tuple[str, int]]:
+    """
+    Parses a request mix such as "/download-csv=8,/=2".
+
+    :param mix: Comma separated paths with optional integer weights.
+    :return: List of (path, weight) tuples.
+    """
+    entries = []
+    for entry in mix.split(","):
+        path, _, weight = entry.strip().partition("=")
+        entries.append((path, int(weight) if weight else 1))
+    return entries
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """
+    :param ordered: Sorted samples.
+    :param fraction: The percentile between 0 and 1.
+    :return: The nearest-rank percentile, or 0 without samples.
+    """
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+@dataclass
+class EndpointStats:
+    """
+    Latencies and errors of the requests to a single path.
+    """
+
+    path: str
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    status_codes: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, latency: float, status: Optional[int]) -> None:
+        """
+        Records a request.
+
+        :param latency: Latency of the request in seconds.
+        :param status: Response status code, or None if the request failed.
+        """
+        self.latencies.append(latency)
+        key = str(status) if status is not None else "error"
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def summary(self, seconds: float) -> Dict[str, Any]:
+        """
+        :param seconds: Duration of the load test.
+        :return: Throughput, error rate and latency percentiles in milliseconds.
+        """
+        ordered = sorted(self.latencies)
+        requests = len(ordered)
+        return {
+            "path": self.path,
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": self.errors / requests if requests else 0.0,
+            "requests_per_second": requests / seconds if seconds else 0.0,
+            "p50_ms": percentile(ordered, 0.5) * 1000,
+            "p90_ms": percentile(ordered, 0.9) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+            "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+            "status_codes": self.status_codes,
+        }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    mix: List[Tuple[str, int]],
+    requests: int,
+    concurrency: int,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Sends the requests of the mix with the given number of concurrent clients.
+
+    :param client: The client sending the requests.
+    :param mix: List of (path, weight) tuples.
+    :param requests: Total number of requests.
+    :param concurrency: Number of concurrent clients.
+    :param seed: Seed of the request order, for reproducible runs.
+    :return: Report with a summary per path and in total.
+    """
+    paths = [path for path, _ in mix]
+    order = random.Random(seed).choices(
+        paths, weights=[weight for _, weight in mix], k=requests
+    )
+    stats = {path: EndpointStats(path) for path in paths}
+    total = EndpointStats("total")
+    pending = iter(order)
+
+    async def client_loop() -> None:
+        for path in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                await response.aread()
+                status: Optional[int] = response.status_code
+            except httpx.HTTPError:
+                status = None
+            latency = time.perf_counter() - started
+            stats[path].record(latency, status)
+            total.record(latency, status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": seconds,
+        "total": total.summary(seconds),
+        "endpoints": [s.summary(seconds) for s in stats.values()],
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Compares the totals of a report with a baseline report.
+
+    :param report: Report of this run.
+    :param baseline: Report of the baseline run.
+    :return: Lines describing the relative change of the key figures.
+    """
+    lines = []
+    for key in ("requests_per_second", "p50_ms", "p99_ms", "error_rate"):
+        current, previous = report["total"][key], baseline["total"][key]
+        change = (current - previous) / previous * 100 if previous else 0.0
+        lines.append(
+            f"{key:<22}{previous:>12.2f}{current:>12.2f}{change:>+10.1f}%"
+        )
+    return lines
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """
+    Prints the report as a table.
+
+    :param report: The load test report.
+    """
+    print(
+        f"{report['requests']} requests, concurrency {report['concurrency']}, "
+        f"{report['seconds']:.2f}s"
+    )
+    print(
+        f"{'path':<20}{'requests':>10}{'req/s':>10}{'p50 ms':>10}"
+        f"{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}"
+    )
+    for row in report["endpoints"] + [report["total"]]:
+        print(
+            f"{row['path']:<20}{row['requests']:>10}"
+            f"{row['requests_per_second']:>10.1f}{row['p50_ms']:>10.2f}"
+            f"{row['p90_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+            f"{row['max_ms']:>10.2f}{row['errors']:>8}"
+        )
+
+
+def free_port() -> int:
+    """
+    :return: A free local TCP port.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_uvicorn(port: int, timeout: float = 15) -> subprocess.Popen:
+    """
+    Starts the app with uvicorn in a subprocess and waits until it responds.
+
+    :param port: Port to listen on.
+    :param timeout: Seconds to wait for the server to start.
+    :return: The server process.
+    """
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ]
+    )
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"http://127.0.0.1:{port}/metrics")
+                return process
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    process.kill()
+    raise RuntimeError("uvicorn did not start in time")
+
+
+def mock_archive(
+    file_path: str, urls: Sequence[str], latency_scale: float = 1.0
+) -> HTTPArchive:
+    """
+    Creates an archive in replay mode answering the project pages and API
+    requests of the URLs with the mock page and API response.
+
+    :param file_path: Path to the archive file, which is not written.
+    :param urls: URLs of the project pages.
+    :param latency_scale: Factor applied to the recorded latency.
+    :return: The HTTPArchive.
+    """
+    archive = HTTPArchive(file_path, "replay", latency_scale)
+    html_data = read_mock_data("html", "dummy_page.html")
+    json_data = read_mock_data("json", "dummy_api.json")
+    key = HTMLParsingStrategy().parse(html_data).extracted_param
+    headers = [("Content-Type", "text/html; charset=utf-8")]
+    for url in urls:
+        archive.add(
+            ArchivedResponse(
+                url, 200, headers, html_data, REPLAY_TTFB, REPLAY_ELAPSED
+            )
+        )
+    archive.add(
+        ArchivedResponse(
+            form_api_url(str(key)),
+            200,
+            [("Content-Type", "application/json")],
+            json_data,
+            REPLAY_TTFB,
+            REPLAY_ELAPSED,
+        )
+    )
+    return archive
+
+
+def offline_generation(folder: str) -> ExitStack:
+    """
+    Patches the generation runs of the app to replay mock responses and keep
+    all their files in the folder.
+
+    :param folder: The temporary folder.
+    :return: ExitStack undoing the patches when closed.
+    """
+    from app.main import LIST_OF_PROJECTS
+
+    archive = mock_archive(
+        os.path.join(folder, "http-archive.jsonl.gz"), LIST_OF_PROJECTS
+    )
+    run = partial(
+        fetch_data_and_save_in_parallel,
+        checkpoint_path=os.path.join(folder, "download-csv.journal"),
+        output_path=os.path.join(folder, "download-csv.partial.csv"),
+    )
+    stack = ExitStack()
+    for name, value in {
+        "fetch_data_and_save_in_parallel": run,
+        "RunOptions": partial(RunOptions, archive=archive),
+        "negative_cache": NegativeCache(
+            os.path.join(folder, "negative-cache.json"),
+            NEGATIVE_CACHE_BASE_TTL_SECONDS,
+            NEGATIVE_CACHE_MAX_TTL_SECONDS,
+        ),
+        "parse_memo": ParseMemo(
+            os.path.join(folder, "parse-memo.json"),
+            PARSE_MEMO_MAX_ENTRIES,
+            JSON_PARSER_VERSION,
+        ),
+        "SKIP_REPORT_FILE_PATH": os.path.join(folder, "skip-report.json"),
+        "GALLERY_LISTING_URLS": [],
+    }.items():
+        stack.enter_context(patch(f"app.main.{name}", new=value))
+    return stack
+
+
+async def run_in_process(
+    mix: List[Tuple[str, int]],
+    requests: int,
+    concurrency: int,
+    seed: int,
+    during_generation: bool,
+) -> Dict[str, Any]:
+    """
+    Load tests the app in-process, serving a mock CSV snapshot from a
+    temporary folder.
+
+    :param mix: List of (path, weight) tuples.
+    :param requests: Total number of requests.
+    :param concurrency: Number of concurrent clients.
+    :param seed: Seed of the request order.
+    :param during_generation: Whether to start an offline generation run first.
+    :return: The load test report.
+    """
+    from app.main import app, background_tasks
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = SnapshotStore(folder, "download-csv.csv")
+        partial_path = shutil.copy(
+            get_mock_data_file_path("csv", "dummy_file.csv"), folder
+        )
+        store.publish(partial_path)
+
+        with patch("app.main.snapshot_store", new=store), offline_generation(
+            folder
+        ):
+            transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://load-test"
+            ) as client:
+                if during_generation:
+                    await client.get("/generate-csv?background=true")
+                report = await run_load(
+                    client, mix, requests, concurrency, seed
+                )
+            # The run writes to the folder, let it finish before removing it
+            await asyncio.gather(*background_tasks, return_exceptions=True)
+    return report
+
+
+async def main(args: argparse.Namespace) -> int:
+    """
+    Runs the load test and prints the report.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code, 1 if throughput regressed beyond the allowed ratio.
+    """
+    if not args.verbose:
+        # per-request logs of the app would dominate in-process runs
+        logger.setLevel(logging.WARNING)
+    mix = parse_mix(args.mix)
+    server: Optional[subprocess.Popen] = None
+    url = args.url
+    if args.uvicorn:
+        port = free_port()
+        server = await start_uvicorn(port)
+        url = f"http://127.0.0.1:{port}"
+
+    try:
+        if url:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(
+                base_url=url, limits=limits, timeout=30
+            ) as client:
+                if args.during_generation:
+                    await client.get("/generate-csv?background=true")
+                report = await run_load(
+                    client, mix, args.requests, args.concurrency, args.seed
+                )
+        else:
+            report = await run_in_process(
+                mix,
+                args.requests,
+                args.concurrency,
+                args.seed,
+                args.during_generation,
+            )
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    report["target"] = url or "in-process"
+    report["mix"] = args.mix
+    print_report(report)
+
+    if args.save:
+        with open(args.save, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(
+            f"\n{'vs baseline':<22}{'baseline':>12}{'current':>12}{'change':>11}"
+        )
+        for line in compare(report, baseline):
+            print(line)
+        previous = baseline["total"]["requests_per_second"]
+        current = report["total"]["requests_per_second"]
+        if previous and current < previous * (1 - args.max_regression):
+            print("Throughput regressed beyond the allowed ratio")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--mix", default=DEFAULT_MIX, help="weighted paths, path=weight,..."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="base URL of a running server")
+    target.add_argument(
+        "--uvicorn", action="store_true", help="start a local uvicorn server"
+    )
+    parser.add_argument(
+        "--during-generation",
+        action="store_true",
+        help="start a generation run before the load test, "
+        "replaying mock responses when in-process",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="keep the app info logs"
+    )
+    parser.add_argument("--save", help="save the report as JSON")
+    parser.add_argument("--baseline", help="compare with a saved report")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.1,
+        help="allowed throughput drop against the baseline",
+    )
+    arguments = parser.parse_args()
+    if arguments.uvicorn and arguments.during_generation:
+        # The server would crawl upstream and write the files of the app
+        parser.error("--during-generation runs offline only in-process")
+    sys.exit(asyncio.run(main(arguments)))
@@ -0,0 +1,160 @@
+"""
+Offline throughput benchmark of the generation pipeline.
+
+Replays the responses captured in an HTTP archive (see HTTP_ARCHIVE_MODE)
+through the whole pipeline, without network access and without the request
+rate limit, so the timings of parsing and writing are comparable between
+runs. Responses are served immediately unless a latency scale is given.
+
+Record an archive by running a generation with HTTP_ARCHIVE_MODE = "record",
+optionally compact it with --compact, then:
+    python -m benchmarks.replay --repeat 5 --save replay-baseline.json
+    python -m benchmarks.replay --repeat 5 --baseline replay-baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import List
+
+from app.config import HTTP_ARCHIVE_PATH, PLANNER5D_API_PROJECT_URL
+from app.http_archive import HTTPArchive
+from app.logger import logger
+from app.progress import ProgressBroker, RunProgress
+from app.request_scheduler import FairShareScheduler
+from app.utils import RunOptions, fetch_data_and_save_in_parallel
+
+
+@dataclass
+class ReplayResult:
+    """
+    Data class describing the best of the replayed runs.
+    """
+
+    projects: int
+    rows: int
+    seconds: float
+    rows_per_second: float
+
+
+async def replay(
+    archive: HTTPArchive, concurrency: int, repeat: int
+) -> ReplayResult:
+    """
+    Runs the pipeline over the archived projects and keeps the fastest run.
+
+    :param archive: The archive in replay mode.
+    :param concurrency: Number of concurrently processed projects.
+    :param repeat: Number of runs.
+    :return: The result of the fastest run.
+    """
+    urls = [
+        url
+        for url in archive.urls()
+        if not url.startswith(PLANNER5D_API_PROJECT_URL)
+    ]
+    best = None
+    with tempfile.TemporaryDirectory() as folder:
+        for _ in range(repeat):
+            progress = RunProgress(ProgressBroker(), "replay", len(urls))
+            started = time.perf_counter()
+            await fetch_data_and_save_in_parallel(
+                urls,
+                concurrency,
+                checkpoint_path=None,
+                output_path=os.path.join(folder, "replay.csv"),
+                options=RunOptions(
+                    scheduler=FairShareScheduler(concurrency),
+                    progress=progress,
+                    archive=archive,
+                ),
+            )
+            seconds = time.perf_counter() - started
+            if best is None or seconds < best.seconds:
+                best = ReplayResult(
+                    projects=len(urls),
+                    rows=progress.written,
+                    seconds=seconds,
+                    rows_per_second=progress.written / seconds,
+                )
+    assert best is not None
+    return best
+
+
+def main(args: argparse.Namespace) -> int:
+    """
+    Runs the benchmark and prints the result.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code, 1 if throughput regressed beyond the allowed ratio.
+    """
+    logger.setLevel(logging.WARNING)
+    archive = HTTPArchive(args.archive, "replay", args.latency_scale)
+    if args.compact:
+        print(f"Compacted the archive to {archive.compact()} responses")
+    result = asyncio.run(replay(archive, args.concurrency, args.repeat))
+    print(
+        f"{result.projects} projects, {result.rows} rows in "
+        f"{result.seconds:.3f}s: {result.rows_per_second:.1f} rows/s"
+    )
+    if archive.stats()["misses"]:
+        print(f"{archive.stats()['misses']} requests missing from the archive")
+
+    if args.save:
+        with open(args.save, "w") as result_file:
+            json.dump(asdict(result), result_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = ReplayResult(**json.load(baseline_file))
+        change = result.rows_per_second / baseline.rows_per_second - 1
+        print(
+            f"Baseline {baseline.rows_per_second:.1f} rows/s, "
+            f"change {change * 100:+.1f}%"
+        )
+        if change < -args.max_regression:
+            print("Throughput regressed beyond the allowed ratio")
+            return 1
+    return 0
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """
+    :param argv: Command line arguments.
+    :return: Parsed command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--archive", default=HTTP_ARCHIVE_PATH)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=0.0,
+        help="replay at the recorded latency times this factor",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="drop superseded responses from the archive file first",
+    )
+    parser.add_argument("--save", help="save the result as JSON")
+    parser.add_argument("--baseline", help="compare with a saved result")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.1,
+        help="allowed throughput drop against the baseline",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args(sys.argv[1:])))
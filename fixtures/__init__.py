@@ -0,0 +1,33 @@
+"""
+Mock pages, API responses and CSV files shared by the tests and the benchmarks.
+"""
+import os
+
+
+def get_mock_data_file_path(data_type: str, file_name: str) -> str:
+    """
+    Constructs the file path for mock data.
+
+    :param data_type: Type of mock data ('html' or 'json').
+    :param file_name: Name of the file containing mock data.
+    :return: Full file path of the mock data file.
+    """
+    valid_types = ["html", "json", "csv"]
+    if data_type not in valid_types:
+        raise ValueError(f"data_type must be one of {valid_types}")
+
+    return os.path.join(os.path.dirname(__file__), data_type, file_name)
+
+
+def read_mock_data(data_type: str, file_name: str) -> str:
+    """
+    Reads mock data from a specified file. Constructs the file path using `get_mock_data_file_path`
+    and then reads the content from that file.
+
+    :param data_type: Type of mock data ('html' or 'json').
+    :param file_name: Name of the file containing mock data.
+    :return: Content of the mock data file as a string.
+    """
+    file_path = get_mock_data_file_path(data_type, file_name)
+    with open(file_path, "r") as file:
+        return file.read()
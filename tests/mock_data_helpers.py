@@ -1,18 +1,28 @@
 import asyncio
-import os
-from typing import Any, Callable, Union
+from typing import Any, AsyncIterator, Callable, Union
 
 from aiohttp import ClientSession
 
+from app.schemas import PROJECT_INFO_FIELDS, ParsedData, ProjectInfo
+
 # Global variables to track concurrent tasks
 concurrent_tasks: int = 0
 max_concurrent_reached: bool = False
 max_concurrent_tasks: int = 2
+processed_urls: list = []
 
 
 async def mock_fetch_and_parse(
-    sem: asyncio.Semaphore, url: str, session: ClientSession, csv_handler: Any
-) -> None:
+    sem: asyncio.Semaphore,
+    url: str,
+    session: ClientSession,
+    csv_handler: Any,
+    negative_cache: Any = None,
+    parse_memo: Any = None,
+    deadline: Any = None,
+    skip_report: Any = None,
+    project_key: Any = None,
+) -> ParsedData:
     """
     Mock function to simulate fetching and parsing data.
 
@@ -23,6 +33,12 @@ async def mock_fetch_and_parse(
     :param url: URL to fetch data from (not used in mock).
     :param session: Client session for HTTP requests (not used in mock).
     :param csv_handler: CSV handler for data processing (not used in mock).
+    :param negative_cache: Negative cache of failing URLs (not used in mock).
+    :param parse_memo: Memo of parse results (not used in mock).
+    :param deadline: Deadline of the job (not used in mock).
+    :param skip_report: Report of skipped URLs (not used in mock).
+    :param project_key: Key of the project if already known (not used in mock).
+    :return: ParsedData of a dummy project, whose row is written with the CSV handler.
     """
     global concurrent_tasks, max_concurrent_reached
     async with sem:  # Respect the semaphore limit
@@ -31,37 +47,12 @@ async def mock_fetch_and_parse(
             max_concurrent_reached = True
         await asyncio.sleep(0.1)  # Simulate async operation
         concurrent_tasks -= 1
-
-
-def get_mock_data_file_path(data_type: str, file_name: str) -> str:
-    """
-    Constructs the file path for mock data.
-
-    :param data_type: Type of mock data ('html' or 'json').
-    :param file_name: Name of the file containing mock data.
-    :return: Full file path of the mock data file.
-    """
-    valid_types = ["html", "json", "csv"]
-    if data_type not in valid_types:
-        raise ValueError(f"data_type must be one of {valid_types}")
-
-    return os.path.join(
-        os.path.dirname(__file__), "mocks", data_type, file_name
+    processed_urls.append(url)
+    project_info = ProjectInfo(
+        hash=url, name="mock", floor_count=1, room_count=1
     )
-
-
-def read_mock_data(data_type: str, file_name: str) -> str:
-    """
-    Reads mock data from a specified file. Constructs the file path using `get_mock_data_file_path`
-    and then reads the content from that file.
-
-    :param data_type: Type of mock data ('html' or 'json').
-    :param file_name: Name of the file containing mock data.
-    :return: Content of the mock data file as a string.
-    """
-    file_path = get_mock_data_file_path(data_type, file_name)
-    with open(file_path, "r") as file:
-        return file.read()
+    csv_handler.write_row(PROJECT_INFO_FIELDS, project_info.as_row())
+    return ParsedData(project_info=project_info, extracted_param="key")
 
 
 class MockResponse:
@@ -72,10 +63,13 @@ class MockResponse:
     supporting the asynchronous context manager protocol and 'json' and `text` coroutine methods.
 
     :param content: The content to be returned by the `text` or `json` method.
+    :param status: The HTTP status code of the response.
     """
 
-    def __init__(self, content: Union[str, dict, list]):
+    def __init__(self, content: Union[str, dict, list], status: int = 200):
         self.content = content
+        self.status = status
+        self.headers: dict = {}
 
     async def __aenter__(self) -> "MockResponse":
         """
@@ -103,6 +97,18 @@ class MockResponse:
         """
         return self.content
 
+    async def iter_chunked(self, chunk_size: int) -> AsyncIterator[bytes]:
+        """
+        Simulate streaming the body of the aiohttp response object.
+
+        :param chunk_size: Maximum number of bytes per chunk.
+        :return: Async iterator over the mock content as bytes.
+        """
+        body = str(self.content).encode()
+        for start in range(0, len(body), chunk_size):
+            end = start + chunk_size
+            yield body[start:end]
+
     async def json(self) -> Any:
         """
         Simulate the json method of the aiohttp response object.
@@ -112,7 +118,7 @@ class MockResponse:
         return self.content
 
 
-def mock_get(content: Union[str, dict, list]) -> Callable:
+def mock_get(content: Union[str, dict, list], status: int = 200) -> Callable:
     """
     Create a mock get function for aiohttp.ClientSession.
 
@@ -121,10 +127,11 @@ def mock_get(content: Union[str, dict, list]) -> Callable:
     initialized with the provided content and content type.
 
     :param content: The content to be returned by the mock response. Can be a string (for HTML) or a dict/list (for JSON).
+    :param status: The HTTP status code of the mock response.
     :return: A function simulating aiohttp.ClientSession.get.
     """
 
     def _mock_get(*args, **kwargs) -> MockResponse:
-        return MockResponse(content)
+        return MockResponse(content, status)
 
     return _mock_get
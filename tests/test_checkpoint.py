@@ -0,0 +1,99 @@
+import json
+
+from app.checkpoint import CheckpointJournal
+
+
+class TestCheckpointJournal:
+    row = {"hash": "h", "name": "n", "floor_count": 1, "room_count": 2}
+
+    def test_record_and_load(self, tmp_path):
+        path = str(tmp_path / "job.journal")
+        journal = CheckpointJournal(path, "job")
+        journal.record("http://example.com/1", "key1", self.row)
+
+        resumed = CheckpointJournal(path, "job")
+        assert resumed.load()
+        assert resumed.is_completed("http://example.com/1")
+        assert not resumed.is_completed("http://example.com/2")
+        assert list(resumed.rows()) == [self.row]
+
+    def test_load_without_journal(self, tmp_path):
+        journal = CheckpointJournal(str(tmp_path / "missing"), "job")
+        assert not journal.load()
+        assert list(journal.rows()) == []
+
+    def test_stale_journal_is_discarded(self, tmp_path):
+        path = tmp_path / "job.journal"
+        CheckpointJournal(str(path), "old-job").record(
+            "http://example.com/1", "key1", self.row
+        )
+
+        journal = CheckpointJournal(str(path), "new-job")
+        assert not journal.load()
+        assert not path.exists()
+
+    def test_truncated_line_is_ignored(self, tmp_path):
+        path = tmp_path / "job.journal"
+        CheckpointJournal(str(path), "job").record(
+            "http://example.com/1", "key1", self.row
+        )
+        with open(path, "a") as journal_file:
+            journal_file.write('{"url": "http://exa')
+
+        journal = CheckpointJournal(str(path), "job")
+        assert journal.load()
+        assert journal.completed == {"http://example.com/1"}
+        assert list(journal.rows()) == [self.row]
+
+    def test_entry_without_url_is_ignored(self, tmp_path):
+        path = tmp_path / "job.journal"
+        CheckpointJournal(str(path), "job").record(
+            "http://example.com/1", "key1", self.row
+        )
+        with open(path, "a") as journal_file:
+            journal_file.write(json.dumps({"key": "key2", "row": self.row}))
+            journal_file.write("\n[1, 2]\n")
+
+        journal = CheckpointJournal(str(path), "job")
+        assert journal.load()
+        assert journal.completed == {"http://example.com/1"}
+        assert list(journal.rows()) == [self.row]
+
+    def test_record_after_truncated_line(self, tmp_path):
+        path = tmp_path / "job.journal"
+        CheckpointJournal(str(path), "job").record(
+            "http://example.com/1", "key1", self.row
+        )
+        with open(path, "a") as journal_file:
+            journal_file.write('{"url": "http://exa')
+
+        journal = CheckpointJournal(str(path), "job")
+        assert journal.load()
+        journal.record("http://example.com/2", "key2", self.row)
+        journal.record("http://example.com/3", "key3", self.row)
+
+        resumed = CheckpointJournal(str(path), "job")
+        assert resumed.load()
+        assert resumed.completed == {
+            "http://example.com/1",
+            "http://example.com/2",
+            "http://example.com/3",
+        }
+        assert list(resumed.rows()) == [self.row] * 3
+
+    def test_remove(self, tmp_path):
+        path = tmp_path / "job.journal"
+        journal = CheckpointJournal(str(path), "job")
+        journal.record("http://example.com/1", "key1", self.row)
+        assert json.loads(path.read_text().splitlines()[0]) == {"job": "job"}
+
+        journal.remove()
+        assert not path.exists()
+
+    def test_fingerprint_depends_on_urls(self):
+        assert CheckpointJournal.fingerprint(
+            ["a", "b"]
+        ) == CheckpointJournal.fingerprint(["a", "b"])
+        assert CheckpointJournal.fingerprint(
+            ["a", "b"]
+        ) != CheckpointJournal.fingerprint(["a", "c"])
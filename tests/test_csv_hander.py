@@ -23,10 +23,12 @@ class TestCSVHandler:
         """
         os.remove(cls.test_file)
 
-    def test_singleton_instance(self):
+    def test_instances_are_independent(self):
         handler1 = CSVHandler(self.test_file)
-        handler2 = CSVHandler(self.test_file)
-        assert handler1 is handler2
+        handler2 = CSVHandler("tests/other.csv")
+        assert handler1 is not handler2
+        assert handler1.file_path == self.test_file
+        assert handler2.file_path == "tests/other.csv"
 
     def test_write_dict_to_csv(self):
         handler = CSVHandler(self.test_file)
@@ -48,3 +50,18 @@ class TestCSVHandler:
     def test_handling_empty_data(self):
         handler = CSVHandler(self.test_file)
         handler.write_dict_to_csv({})
+
+    def test_write_rows_writes_header_once(self):
+        handler = CSVHandler(self.test_file)
+        handler.close()
+        handler.write_row(["hash", "rooms"], ["abc", 1])
+        handler.write_rows(["hash", "rooms"], [["def", 2], ["ghi", 3]])
+
+        with open(self.test_file, mode="r") as csvfile:
+            rows = list(csv.reader(csvfile))
+        assert rows == [
+            ["hash", "rooms"],
+            ["abc", "1"],
+            ["def", "2"],
+            ["ghi", "3"],
+        ]
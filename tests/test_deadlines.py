@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+import pytest
+
+from app.deadlines import Deadline
+
+
+class TestDeadline:
+    def test_without_deadline_only_stage_budget_applies(self):
+        deadline = Deadline(None)
+
+        assert deadline.remaining() is None
+        assert not deadline.expired
+        assert deadline.budget(5) == 5
+        assert deadline.budget() is None
+        assert Deadline(0).remaining() is None
+
+    def test_stage_budget_is_capped_by_remaining_time(self):
+        deadline = Deadline(2)
+
+        assert deadline.budget(30) <= 2
+        assert deadline.budget(1) == 1
+
+    def test_expires(self):
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+
+        assert deadline.expired
+        assert deadline.budget(30) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_timeout_cancels_work_after_deadline(self):
+        deadline = Deadline(0.01)
+
+        with pytest.raises(TimeoutError):
+            async with deadline.timeout(30):
+                await asyncio.sleep(1)
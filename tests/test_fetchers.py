@@ -4,7 +4,8 @@ import aiohttp
 import pytest
 
 from app.fetchers import AsyncHTMLDataFetcher, AsyncJSONDataFetcher
-from tests.mock_data_helpers import mock_get, read_mock_data
+from fixtures import read_mock_data
+from tests.mock_data_helpers import mock_get
 
 
 class TestAsyncHTMLDataFetcher:
@@ -0,0 +1,99 @@
+from unittest.mock import MagicMock
+
+import aiohttp
+import pytest
+
+from app.gallery import (
+    GalleryListingParser,
+    project_slug,
+    resolve_project_keys,
+)
+from tests.mock_data_helpers import mock_get
+
+LISTING_HTML = """
+<html><body><main>
+  <div class="card">
+    <a href="/gallery/floorplans/LTXdJG/house-terrace-3d"><img src="1.jpg"></a>
+    <a href="/gallery/floorplans/LTXdJG/house-terrace-3d">House</a>
+    <a href="https://planner5d.com/editor?key=key1">Open</a>
+  </div>
+  <div class="card" data-key="key2">
+    <a href="https://planner5d.com/gallery/floorplans/LJePOG/house-3d">House</a>
+  </div>
+  <div class="card">
+    <a href="/gallery/floorplans/LJcePG/bedroom-3d">Without key</a>
+  </div>
+  <!-- comment -->
+  <a href="https://planner5d.com/editor?key=orphan">Featured</a>
+</main></body></html>
+"""
+
+
+class TestProjectSlug:
+    @pytest.mark.parametrize(
+        "url, slug",
+        [
+            (
+                "https://planner5d.com/gallery/floorplans/LTXdJG/house-3d",
+                "LTXdJG",
+            ),
+            ("/gallery/floorplans/LJePOG/", "LJePOG"),
+            ("/gallery/floorplans/", None),
+            ("https://planner5d.com/editor?key=key1", None),
+        ],
+    )
+    def test_project_slug(self, url, slug):
+        assert project_slug(url) == slug
+
+
+class TestGalleryListingParser:
+    def test_pairs_keys_with_projects_of_their_card(self):
+        keys = GalleryListingParser().parse(LISTING_HTML)
+
+        assert keys == {"LTXdJG": "key1", "LJePOG": "key2"}
+
+    def test_key_in_project_link(self):
+        data = '<a href="/gallery/floorplans/LTXdJG/x?key=key1">House</a>'
+
+        assert GalleryListingParser().parse(data) == {"LTXdJG": "key1"}
+
+    def test_ambiguous_key_is_left_out(self):
+        data = """
+        <div>
+          <a href="/gallery/floorplans/LTXdJG/x">One</a>
+          <a href="/gallery/floorplans/LJePOG/y">Two</a>
+          <a href="/editor?key=key1">Open</a>
+        </div>
+        """
+
+        assert GalleryListingParser().parse(data) == {}
+
+    def test_custom_key_attribute(self):
+        data = '<div data-project="key1"><a href="/p/LTXdJG/">House</a></div>'
+        parser = GalleryListingParser("/p/", "data-project")
+
+        assert parser.parse(data) == {"LTXdJG": "key1"}
+
+    def test_empty_page(self):
+        assert GalleryListingParser().parse("") == {}
+
+
+class TestResolveProjectKeys:
+    @pytest.mark.asyncio
+    async def test_resolves_keys_of_all_listings(self):
+        session = MagicMock()
+        session.get.side_effect = mock_get(LISTING_HTML)
+
+        keys = await resolve_project_keys(
+            ["http://example.com/1", "http://example.com/2"], session
+        )
+
+        assert keys == {"LTXdJG": "key1", "LJePOG": "key2"}
+        assert session.get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failing_listing_resolves_nothing(self):
+        session = MagicMock()
+        session.get.side_effect = aiohttp.InvalidURL("invalid-url")
+
+        assert await resolve_project_keys(["invalid-url"], session) == {}
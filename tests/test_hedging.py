@@ -0,0 +1,143 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.fetchers import AsyncHTMLDataFetcher
+from app.hedging import HedgePolicy
+from app.request_scheduler import (
+    FairShareScheduler,
+    ScheduledSession,
+    on_slot_granted,
+)
+from tests.mock_data_helpers import mock_get
+
+
+def warmed_up_policy(latency: float = 0.01, **kwargs) -> HedgePolicy:
+    """
+    Creates an enabled HedgePolicy with recorded latencies.
+    """
+    policy = HedgePolicy("test", enabled=True, min_samples=5, **kwargs)
+    for _ in range(5):
+        policy.tracker.record(latency)
+    return policy
+
+
+class TestHedgePolicy:
+    @pytest.mark.asyncio
+    async def test_fast_request_is_not_hedged(self):
+        policy = warmed_up_policy(max_ratio=1.0)
+        calls = 0
+
+        async def request() -> str:
+            nonlocal calls
+            calls += 1
+            return "result"
+
+        assert await policy.run(request) == "result"
+        assert calls == 1
+        assert policy.hedges == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_request_is_hedged(self):
+        policy = warmed_up_policy(max_ratio=1.0)
+        delays = [1.0, 0.0]
+        cancelled = False
+
+        async def request() -> str:
+            nonlocal cancelled
+            delay = delays.pop(0)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            return f"slept {delay}"
+
+        assert await policy.run(request) == "slept 0.0"
+        assert policy.hedges == 1
+        assert policy.hedge_wins == 1
+        assert cancelled
+        assert policy.stats()["hedge_win_rate"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_failed_hedge_waits_for_primary(self):
+        policy = warmed_up_policy(max_ratio=1.0)
+        results = ["primary", None]
+
+        async def request() -> str:
+            result = results.pop(0)
+            await asyncio.sleep(0.05 if result else 0)
+            return result
+
+        assert await policy.run(request) == "primary"
+        assert policy.hedges == 1
+        assert policy.hedge_wins == 0
+
+    @pytest.mark.asyncio
+    async def test_budget_limits_hedges(self):
+        policy = warmed_up_policy(max_ratio=0.5)
+        policy.hedge_delay = lambda: 0.01
+
+        async def request() -> str:
+            await asyncio.sleep(0.05)
+            return "result"
+
+        for _ in range(4):
+            await policy.run(request)
+
+        assert policy.requests == 4
+        assert policy.hedges == 2
+
+    @pytest.mark.asyncio
+    async def test_disabled_policy_only_tracks_latency(self):
+        policy = HedgePolicy("test", enabled=False, min_samples=1)
+
+        async def request() -> str:
+            return "result"
+
+        await policy.run(request)
+        await policy.run(request)
+
+        assert policy.hedge_delay() is None
+        assert len(policy.tracker) == 2
+        assert policy.hedges == 0
+
+    @pytest.mark.asyncio
+    async def test_queued_request_is_timed_from_its_slot(self):
+        policy = warmed_up_policy(max_ratio=1.0)
+        calls = 0
+
+        async def request() -> str:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.1)  # waiting for a scheduler slot
+            slot_granted = on_slot_granted.get()
+            assert slot_granted is not None
+            slot_granted()
+            await asyncio.sleep(0.001)
+            return "result"
+
+        assert await policy.run(request, scheduled=True) == "result"
+        assert calls == 1
+        assert policy.hedges == 0
+        assert policy.tracker.percentile(1.0) < 0.05
+
+    @pytest.mark.asyncio
+    async def test_request_queued_in_scheduler_is_not_hedged(self):
+        policy = warmed_up_policy(max_ratio=1.0)
+        scheduler = FairShareScheduler(1)
+        http_session = MagicMock()
+        http_session.get.side_effect = mock_get("content")
+        session = ScheduledSession(http_session, scheduler, "job")
+
+        await scheduler.acquire("other")
+        asyncio.get_running_loop().call_later(0.1, scheduler.release)
+        result = await AsyncHTMLDataFetcher(policy).fetch_data(
+            "http://example.com", session
+        )
+
+        assert result == "content"
+        assert policy.hedges == 0
+        assert http_session.get.call_count == 1
+        assert policy.tracker.percentile(1.0) < 0.05
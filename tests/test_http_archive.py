@@ -0,0 +1,150 @@
+import gzip
+import time
+
+import httpx
+import pytest
+
+from app.fetchers import AsyncHTMLDataFetcher, AsyncJSONDataFetcher
+from app.http_archive import ArchivedResponse, HTTPArchive
+from app.transports import HTTPXSession
+from fixtures import read_mock_data
+
+mock_html_content = read_mock_data("html", "dummy_page.html")
+mock_json_content = read_mock_data("json", "dummy_api.json")
+
+HTML_URL = "http://example.com/project"
+API_URL = "http://example.com/api/project"
+
+
+def upstream_session() -> HTTPXSession:
+    """
+    Creates an HTTPXSession serving the mock page and API response.
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.startswith("/api"):
+            return httpx.Response(
+                200,
+                text=mock_json_content,
+                headers={"Content-Type": "application/json"},
+            )
+        return httpx.Response(200, text=mock_html_content)
+
+    return HTTPXSession(transport=httpx.MockTransport(handler))
+
+
+async def record(path: str) -> None:
+    archive = HTTPArchive(path, "record")
+    async with upstream_session() as upstream:
+        session = archive.wrap(upstream)
+        await AsyncHTMLDataFetcher().fetch_data(HTML_URL, session)
+        await AsyncJSONDataFetcher().fetch_data(API_URL, session)
+    await archive.flush()
+
+
+class TestHTTPArchive:
+    @pytest.mark.asyncio
+    async def test_record_and_replay(self, tmp_path):
+        path = str(tmp_path / "archive.jsonl.gz")
+        await record(path)
+
+        archive = HTTPArchive(path, "replay")
+        session = archive.wrap(upstream_session())
+        html_data = await AsyncHTMLDataFetcher().fetch_data(HTML_URL, session)
+        async with session.get(API_URL) as response:
+            assert response.status == 200
+            assert response.headers["content-type"] == "application/json"
+            json_data = await response.json()
+
+        assert html_data == mock_html_content
+        assert json_data["items"][0]["hash"] == "project123hash"
+        assert archive.urls() == [HTML_URL, API_URL]
+        assert archive.stats()["replayed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_body_over_limit_is_not_recorded(self, tmp_path):
+        archive = HTTPArchive(
+            str(tmp_path / "archive.jsonl.gz"),
+            "record",
+            max_body_bytes=len(mock_html_content.encode()) - 1,
+        )
+        async with upstream_session() as upstream:
+            session = archive.wrap(upstream)
+            html_data = await AsyncHTMLDataFetcher().fetch_data(
+                HTML_URL, session
+            )
+
+        assert html_data == mock_html_content
+        assert archive.urls() == []
+
+    @pytest.mark.asyncio
+    async def test_error_status_is_replayed(self, tmp_path):
+        path = str(tmp_path / "archive.jsonl.gz")
+        archive = HTTPArchive(path, "record")
+        missing = HTTPXSession(
+            transport=httpx.MockTransport(lambda request: httpx.Response(404))
+        )
+        async with missing as upstream:
+            fetcher = AsyncHTMLDataFetcher()
+            await fetcher.fetch_data(HTML_URL, archive.wrap(upstream))
+        await archive.flush()
+
+        replayed = HTTPArchive(path, "replay")
+        fetcher = AsyncHTMLDataFetcher()
+        result = await fetcher.fetch_data(
+            HTML_URL, replayed.wrap(upstream_session())
+        )
+
+        assert result is None
+        assert fetcher.error.status == 404
+
+    @pytest.mark.asyncio
+    async def test_missing_url_is_a_fetch_error(self, tmp_path):
+        archive = HTTPArchive(str(tmp_path / "empty.jsonl.gz"), "replay")
+        session = archive.wrap(upstream_session())
+
+        result = await AsyncJSONDataFetcher().fetch_data(API_URL, session)
+
+        assert result is None
+        assert archive.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_replay_at_recorded_latency(self, tmp_path):
+        archive = HTTPArchive(
+            str(tmp_path / "archive.jsonl.gz"), "replay", latency_scale=0.5
+        )
+        archive.add(
+            ArchivedResponse(API_URL, 200, [], mock_json_content, 0.05, 0.1)
+        )
+        session = archive.wrap(upstream_session())
+
+        started = time.monotonic()
+        result = await AsyncJSONDataFetcher().fetch_data(API_URL, session)
+
+        assert result == mock_json_content
+        assert time.monotonic() - started >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_recording_appends_and_compact_keeps_latest(self, tmp_path):
+        path = str(tmp_path / "archive.jsonl.gz")
+        await record(path)
+        await record(path)
+
+        assert len(HTTPArchive(path, "replay").urls()) == 2
+        with gzip.open(path, "rt") as archive_file:
+            assert len(archive_file.readlines()) == 4
+        assert HTTPArchive(path, "record").compact() == 2
+        with gzip.open(path, "rt") as archive_file:
+            assert len(archive_file.readlines()) == 2
+        assert HTTPArchive(path, "replay").urls() == [HTML_URL, API_URL]
+
+    def test_off_mode_keeps_the_session(self, tmp_path):
+        session = upstream_session()
+        archive = HTTPArchive(str(tmp_path / "archive.jsonl.gz"), "off")
+
+        assert archive.wrap(session) is session
+        assert not (tmp_path / "archive.jsonl.gz").exists()
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            HTTPArchive("archive.jsonl.gz", "rewind")
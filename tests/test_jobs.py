@@ -0,0 +1,251 @@
+import asyncio
+import csv
+import sqlite3
+from typing import List, Optional, Sequence
+from unittest.mock import AsyncMock
+
+import pytest
+from pytest_mock import MockFixture
+
+from app.csv_handler import CSVHandler
+from app.deadlines import Deadline
+from app.jobs import JobManager, JobStatus, SQLiteJobStore
+from app.locks import FileLock
+from app.progress import ProgressBroker, ProgressEvent
+from app.schemas import PROJECT_INFO_FIELDS, ParsedData, ProjectInfo
+from app.skip_report import SkipReport
+
+
+def mock_pipeline(
+    mocker: MockFixture, slow_urls: Sequence[str] = ()
+) -> List[str]:
+    """
+    Replaces fetching and parsing with a stub writing one row per URL.
+
+    :param slow_urls: URLs whose fetching runs past a deadline of 0.2s.
+    :return: The list the fetched URLs are appended to.
+    """
+    fetched: List[str] = []
+
+    async def fetch_and_parse(
+        sem: asyncio.Semaphore,
+        url: str,
+        session: object,
+        csv_handler: CSVHandler,
+        negative_cache: object = None,
+        parse_memo: object = None,
+        deadline: Deadline = Deadline(),
+        skip_report: Optional[SkipReport] = None,
+        project_key: object = None,
+    ) -> Optional[ParsedData]:
+        fetched.append(url)
+        if url in slow_urls:
+            await asyncio.sleep(0.3)
+            assert deadline.expired and skip_report
+            skip_report.add_expired(url, "fetch_html")
+            return None
+        await asyncio.sleep(0.01)
+        project_info = ProjectInfo(
+            hash=url, name="name", floor_count=1, room_count=2
+        )
+        csv_handler.write_row(PROJECT_INFO_FIELDS, project_info.as_row())
+        return ParsedData(project_info=project_info, extracted_param="key")
+
+    mocker.patch("app.utils.create_session", mocker.MagicMock())
+    mocker.patch(
+        "app.utils.fetch_and_parse_project_data_to_csv", fetch_and_parse
+    )
+    return fetched
+
+
+def read_hashes(job) -> list:
+    store = job.snapshot_store
+    with open(store.snapshot_path(store.latest())) as csvfile:
+        return sorted(row["hash"] for row in csv.DictReader(csvfile))
+
+
+class TestJobManager:
+    @pytest.mark.asyncio
+    async def test_jobs_run_concurrently_with_isolated_outputs(
+        self, mocker: MockFixture, tmp_path
+    ):
+        mock_pipeline(mocker)
+        manager = JobManager(str(tmp_path), 2)
+        job_a = await manager.create(["http://a.com/1", "http://a.com/2"])
+        job_b = await manager.create(["http://b.com/1"])
+
+        await asyncio.gather(manager.start(job_a), manager.start(job_b))
+
+        assert job_a.status == JobStatus.COMPLETED
+        assert job_b.status == JobStatus.COMPLETED
+        assert read_hashes(job_a) == ["http://a.com/1", "http://a.com/2"]
+        assert read_hashes(job_b) == ["http://b.com/1"]
+        assert job_a.to_dict()["snapshot_version"] == 1
+        assert job_a.to_dict()["skipped_count"] == 0
+        assert not job_a.to_dict()["deadline_exceeded"]
+
+    @pytest.mark.asyncio
+    async def test_job_publishes_progress(self, mocker: MockFixture, tmp_path):
+        mock_pipeline(mocker)
+        broker = ProgressBroker()
+        manager = JobManager(str(tmp_path), 2, progress_broker=broker)
+        job = await manager.create(["http://a.com/1", "http://a.com/2"])
+        events: List[ProgressEvent] = []
+
+        async def listen() -> None:
+            async for event in broker.subscribe():
+                if event is not None:
+                    events.append(event)
+
+        listener = asyncio.create_task(listen())
+        await asyncio.sleep(0)
+        await manager.start(job)
+        broker.close()
+        await listener
+
+        assert [name for name, _ in events] == [
+            "started",
+            "project",
+            "project",
+            "finished",
+        ]
+        assert all(state["job_id"] == job.id for _, state in events)
+        assert events[-1][1]["written"] == 2
+        assert events[-1][1]["snapshot_version"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_job(self, mocker: MockFixture, tmp_path):
+        mocker.patch(
+            "app.jobs.fetch_data_and_save_in_parallel",
+            new_callable=AsyncMock,
+            side_effect=RuntimeError("boom"),
+        )
+        manager = JobManager(str(tmp_path), 2)
+        job = await manager.create(["http://a.com/1"])
+
+        await manager.start(job)
+
+        assert job.status == JobStatus.FAILED
+        assert job.error == "boom"
+        assert job.to_dict()["snapshot_version"] is None
+        assert job.resumable
+
+    @pytest.mark.asyncio
+    async def test_resume_job_cut_by_deadline(
+        self, mocker: MockFixture, tmp_path
+    ):
+        mock_pipeline(mocker, slow_urls=["http://a.com/2"])
+        manager = JobManager(str(tmp_path), 2)
+        job = await manager.create(
+            ["http://a.com/1", "http://a.com/2"], deadline_seconds=0.2
+        )
+        await manager.start(job)
+
+        assert job.status == JobStatus.COMPLETED
+        assert job.to_dict()["deadline_exceeded"]
+        assert job.resumable
+
+        fetched = mock_pipeline(mocker)
+        await (await manager.resume(job))
+
+        assert fetched == ["http://a.com/2"]
+        assert job.status == JobStatus.COMPLETED
+        assert read_hashes(job) == ["http://a.com/1", "http://a.com/2"]
+        assert not job.resumable
+        with pytest.raises(ValueError):
+            await manager.resume(job)
+
+    @pytest.mark.asyncio
+    async def test_get_unknown_job(self, tmp_path):
+        manager = JobManager(str(tmp_path), 2)
+        assert await manager.get("unknown") is None
+
+
+class TestSQLiteJobStore:
+    @pytest.mark.asyncio
+    async def test_jobs_are_shared_between_managers(
+        self, mocker: MockFixture, tmp_path
+    ):
+        mock_pipeline(mocker)
+        database_path = str(tmp_path / "jobs.sqlite3")
+        worker_a = JobManager(
+            str(tmp_path), 2, store=SQLiteJobStore(database_path)
+        )
+        worker_b = JobManager(
+            str(tmp_path), 2, store=SQLiteJobStore(database_path)
+        )
+
+        job = await worker_a.create(["http://a.com/1"], weight=2.0)
+        pending_job = await worker_b.get(job.id)
+        assert pending_job is not None
+        assert pending_job.status == JobStatus.PENDING
+
+        await worker_a.run(job)
+
+        shared_job = await worker_b.get(job.id)
+        assert shared_job is not None
+        assert shared_job.status == JobStatus.COMPLETED
+        assert shared_job.weight == 2.0
+        assert read_hashes(shared_job) == ["http://a.com/1"]
+        assert [j.id for j in (await worker_b.list())] == [job.id]
+
+    @pytest.mark.asyncio
+    async def test_locked_database_does_not_block_event_loop(self, tmp_path):
+        database_path = str(tmp_path / "jobs.sqlite3")
+        manager = JobManager(
+            str(tmp_path), 2, store=SQLiteJobStore(database_path)
+        )
+        # another worker holds a write lock on the database
+        other_worker = sqlite3.connect(database_path, isolation_level=None)
+        other_worker.execute("BEGIN EXCLUSIVE")
+        asyncio.get_running_loop().call_later(0.2, other_worker.commit)
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        job = await manager.create(["http://a.com/1"])
+        ticker.cancel()
+        other_worker.close()
+
+        assert ticks > 5
+        assert (await manager.get(job.id)).status == JobStatus.PENDING
+
+    @pytest.mark.asyncio
+    async def test_job_of_exited_worker_is_failed(self, tmp_path):
+        store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+        manager = JobManager(str(tmp_path), 2, store=store)
+        job = await manager.create(["http://a.com/1"])
+        job.status = JobStatus.RUNNING
+        store.save(job)
+
+        # the worker running the job holds its lock
+        lock = FileLock(job.lock_path)
+        lock.try_acquire()
+        assert (await manager.get(job.id)).status == JobStatus.RUNNING
+
+        lock.release()
+        orphan = await manager.get(job.id)
+        assert orphan.status == JobStatus.FAILED
+        assert orphan.error == "Worker running the job exited"
+        assert store.get(job.id).status == JobStatus.FAILED
+
+    @pytest.mark.asyncio
+    async def test_job_runs_once(self, mocker: MockFixture, tmp_path):
+        pipeline = mocker.patch(
+            "app.jobs.fetch_data_and_save_in_parallel", new_callable=AsyncMock
+        )
+        manager = JobManager(str(tmp_path), 2)
+        job = await manager.create(["http://a.com/1"])
+
+        lock = FileLock(job.lock_path)
+        lock.try_acquire()
+        await manager.run(job)
+        lock.release()
+
+        pipeline.assert_not_called()
+        assert job.status == JobStatus.PENDING
@@ -0,0 +1,62 @@
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from app.locks import FileLock
+
+
+class TestFileLock:
+    def test_lock_is_exclusive(self, tmp_path):
+        path = str(tmp_path / "generation.lock")
+        first, second = FileLock(path), FileLock(path)
+
+        assert first.try_acquire()
+        assert first.locked()
+        assert not second.try_acquire()
+        first.release()
+        assert second.try_acquire()
+        second.release()
+
+    def test_lock_held_by_other_process(self, tmp_path):
+        path = str(tmp_path / "generation.lock")
+        holder = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "import sys, time; from app.locks import FileLock; "
+                f"FileLock({path!r}).try_acquire(); print('locked'); "
+                "sys.stdout.flush(); time.sleep(10)",
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert holder.stdout.readline().strip() == "locked"
+            assert not FileLock(path).try_acquire()
+        finally:
+            holder.kill()
+            holder.wait()
+
+        # released by the operating system when the holder exits
+        assert FileLock(path).try_acquire()
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_release(self, tmp_path):
+        path = str(tmp_path / "generation.lock")
+        holder = FileLock(path)
+        holder.try_acquire()
+        order = []
+
+        async def waiter() -> None:
+            async with FileLock(path, poll_interval=0.01):
+                order.append("waiter")
+
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0.05)
+        order.append("holder")
+        holder.release()
+        await task
+
+        assert order == ["holder", "waiter"]
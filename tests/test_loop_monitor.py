@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import sys
+import time
+
+import pytest
+
+from app.loop_monitor import LoopLagMonitor
+
+
+class TestLoopLagMonitor:
+    @pytest.mark.asyncio
+    async def test_blocking_is_attributed_to_marked_stage(self):
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.03)
+
+        with monitor.stage("parse_html"):
+            time.sleep(0.2)
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+
+        assert not monitor.is_running
+        events = monitor.events()
+        assert [e["stage"] for e in events] == ["parse_html"]
+        assert events[0]["duration"] >= 0.15
+        assert any("time.sleep(0.2)" in line for line in events[0]["stack"])
+        stats = monitor.stats()
+        assert stats["blocked_seconds_by_stage"]["parse_html"] >= 0.15
+        assert stats["lag_max"] >= 0.15
+
+    @pytest.mark.asyncio
+    async def test_short_lags_are_not_recorded(self):
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.5)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        assert monitor.stats()["samples"] > 0
+        assert monitor.events() == []
+
+    def test_blocking_in_logging_is_attributed_to_logging(self):
+        frames = []
+
+        class CapturingHandler(logging.Handler):
+            def emit(self, record: logging.LogRecord) -> None:
+                frames.append(sys._getframe())
+
+        test_logger = logging.getLogger("test_loop_monitor.attribution")
+        test_logger.addHandler(CapturingHandler())
+        with LoopLagMonitor().stage("write_csv"):
+            test_logger.warning("captured")
+
+        assert LoopLagMonitor._attribute(frames[0], "write_csv") == "logging"
+        assert LoopLagMonitor._attribute(sys._getframe(), None) == "other"
@@ -1,11 +1,25 @@
+import asyncio
+from typing import Iterator
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from httpx import AsyncClient
 from lxml import html
 
-from app.main import app
-from tests.mock_data_helpers import get_mock_data_file_path, read_mock_data
+from app.config import GLOBAL_MAX_CONCURRENT_REQUESTS
+from app.hedging import api_hedge_policy
+from app.jobs import JobManager, JobStatus
+from app.main import app, background_tasks, refresh_csv
+from app.negative_cache import NegativeCache
+from app.parse_memo import ParseMemo
+from app.profiler import Profiler
+from app.progress import ProgressBroker
+from app.request_scheduler import request_scheduler
+from app.settings import runtime_settings
+from app.skip_report import SkipReport
+from app.snapshots import SnapshotStore
+from app.stats import SnapshotStats
+from fixtures import get_mock_data_file_path, read_mock_data
 from pytest_mock import MockFixture
 
 # Preparing mock data
@@ -15,6 +29,58 @@ mock_csv_content = read_mock_data("csv", "dummy_file.csv")
 mock_csv_path = get_mock_data_file_path("csv", "dummy_file.csv")
 
 
+@pytest.fixture
+def snapshot_store(tmp_path) -> Iterator[SnapshotStore]:
+    """
+    Replaces the app snapshot store, and the statistics computed from it,
+    with an empty one in a temporary folder.
+    """
+    store = SnapshotStore(str(tmp_path / "snapshots"), "download-csv.csv")
+    with patch("app.main.snapshot_store", new=store), patch(
+        "app.main.snapshot_stats", new=SnapshotStats(store)
+    ):
+        yield store
+
+
+@pytest.fixture
+def negative_cache() -> Iterator[NegativeCache]:
+    """
+    Replaces the app negative cache with an in-memory one.
+    """
+    cache = NegativeCache(None, base_ttl=60, max_ttl=600)
+    with patch("app.main.negative_cache", new=cache):
+        yield cache
+
+
+@pytest.fixture
+def parse_memo() -> Iterator[ParseMemo]:
+    """
+    Replaces the app parse memo with an in-memory one.
+    """
+    memo = ParseMemo(None, max_entries=10, version="test")
+    with patch("app.main.parse_memo", new=memo):
+        yield memo
+
+
+@pytest.fixture
+def skip_report_path(tmp_path) -> Iterator[str]:
+    """
+    Redirects the app skip report to a temporary folder.
+    """
+    report_path = str(tmp_path / "download-csv.skipped.json")
+    with patch("app.main.SKIP_REPORT_FILE_PATH", new=report_path):
+        yield report_path
+
+
+def publish_mock_csv(store: SnapshotStore, tmp_path) -> None:
+    """
+    Publishes a copy of the mock CSV file as a snapshot.
+    """
+    partial_path = tmp_path / "download-csv.csv.partial"
+    partial_path.write_text(mock_csv_content)
+    store.publish(str(partial_path))
+
+
 @pytest.mark.asyncio
 async def test_main_page():
     async with AsyncClient(app=app, base_url="http://test") as ac:
@@ -34,7 +100,13 @@ async def test_main_page():
 
 
 @pytest.mark.asyncio
-async def test_generate_csv(mocker: MockFixture):
+async def test_generate_csv(
+    mocker: MockFixture,
+    snapshot_store,
+    negative_cache,
+    parse_memo,
+    skip_report_path,
+):
     mocker.patch(
         "app.fetchers.AsyncHTMLDataFetcher.fetch_data",
         new_callable=AsyncMock,
@@ -46,7 +118,7 @@ async def test_generate_csv(mocker: MockFixture):
         return_value=mock_json_content,
     )
     mocker.patch(
-        "app.csv_handler.CSVHandler.write_dict_to_csv",
+        "app.csv_handler.CSVHandler.write_row",
         new_callable=MagicMock,
     )
 
@@ -55,16 +127,495 @@ async def test_generate_csv(mocker: MockFixture):
     assert response.status_code == 200
 
 
+@pytest.fixture
+def progress_broker() -> Iterator[ProgressBroker]:
+    """
+    Replaces the app progress broker with a new one.
+    """
+    broker = ProgressBroker()
+    with patch("app.main.progress_broker", new=broker):
+        yield broker
+
+
+@pytest.mark.asyncio
+async def test_generate_csv_in_background(
+    mocker: MockFixture, snapshot_store, progress_broker
+):
+    pipeline = mocker.patch(
+        "app.main.fetch_data_and_save_in_parallel", new_callable=AsyncMock
+    )
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/generate-csv", params={"background": True})
+    await asyncio.gather(*background_tasks)
+
+    assert response.status_code == 202
+    pipeline.assert_called_once()
+    event, state = progress_broker.latest
+    assert event == "finished"
+    assert state["error"] is None
+
+
+@pytest.mark.asyncio
+async def test_generate_csv_in_background_logs_failure(
+    mocker: MockFixture, snapshot_store, progress_broker
+):
+    mocker.patch(
+        "app.main.fetch_data_and_save_in_parallel",
+        new_callable=AsyncMock,
+        side_effect=RuntimeError("boom"),
+    )
+    logger_mock = mocker.patch("app.main.logger")
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/generate-csv", params={"background": True})
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+    assert response.status_code == 202
+    assert not background_tasks
+    logger_mock.error.assert_called_once()
+    assert "boom" in logger_mock.error.call_args.args[0]
+    assert progress_broker.latest[1]["error"] == "boom"
+
+
+@pytest.mark.asyncio
+async def test_progress_stream(snapshot_store, progress_broker, tmp_path):
+    publish_mock_csv(snapshot_store, tmp_path)
+    progress_broker.publish("project", {"processed": 1})
+    progress_broker.close()  # ends the stream after the current state
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/progress")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        'event: snapshot\ndata: {"snapshot_version": 1}\n\n'
+        'event: project\ndata: {"processed": 1}\n\n'
+    )
+
+
 @pytest.mark.asyncio
-async def test_download_csv():
-    with patch("app.main.CSV_FILE_PATH", new=mock_csv_path):
+async def test_progress_stream_is_disabled_in_multi_worker_mode():
+    with patch("app.main.MULTI_WORKER_MODE", new=True):
         async with AsyncClient(app=app, base_url="http://test") as ac:
-            response = await ac.get("/download-csv")
+            response = await ac.get("/progress")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_refresh_skips_fresh_snapshot(
+    mocker: MockFixture, snapshot_store, tmp_path
+):
+    pipeline = mocker.patch(
+        "app.main.fetch_data_and_save_in_parallel", new_callable=AsyncMock
+    )
+
+    await refresh_csv(max_age=60)
+    publish_mock_csv(snapshot_store, tmp_path)
+    await refresh_csv(max_age=60)
+
+    pipeline.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_download_csv(snapshot_store, tmp_path):
+    publish_mock_csv(snapshot_store, tmp_path)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/download-csv")
 
     assert response.status_code == 200
     assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.text == mock_csv_content
+
+
+@pytest.mark.asyncio
+async def test_stats_follow_latest_snapshot(snapshot_store, tmp_path):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert (await ac.get("/stats")).status_code == 404
+
+        for rows in (["a,A,1,2", "b,B,2,6"], ["c,C,1,3"]):
+            partial = tmp_path / "partial.csv"
+            partial.write_text(
+                "hash,name,floor_count,room_count\n" + "\n".join(rows) + "\n"
+            )
+            snapshot_store.publish(str(partial))
+            response = await ac.get("/stats")
+
+            assert response.status_code == 200
+            stats = response.json()
+            assert stats["snapshot_version"] == snapshot_store.latest().version
+            assert stats["count"] == len(rows)
+
+    assert stats["room_count"]["mean"] == 3.0
+    assert stats["rooms_per_floor"]["percentiles"]["p50"] == 3.0
+
+
+@pytest.mark.asyncio
+async def test_download_csv_before_generation(snapshot_store):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/download-csv")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_download_csv_not_modified(snapshot_store, tmp_path):
+    publish_mock_csv(snapshot_store, tmp_path)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/download-csv")
+        etag = response.headers["etag"]
+        cached_response = await ac.get(
+            "/download-csv", headers={"If-None-Match": etag}
+        )
+
+    assert etag == snapshot_store.latest().etag
+    assert cached_response.status_code == 304
+    assert cached_response.content == b""
+
+
+@pytest.mark.asyncio
+async def test_download_csv_modified(snapshot_store, tmp_path):
+    publish_mock_csv(snapshot_store, tmp_path)
+    etag = snapshot_store.latest().etag
+    publish_mock_csv(snapshot_store, tmp_path)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get(
+            "/download-csv", headers={"If-None-Match": etag}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_download_csv_range(snapshot_store, tmp_path):
+    publish_mock_csv(snapshot_store, tmp_path)
+    size = len(mock_csv_content.encode())
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/download-csv", headers={"Range": "bytes=5-"})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 5-{size - 1}/{size}"
+    assert response.content == mock_csv_content.encode()[5:]
+
+
+@pytest.mark.asyncio
+async def test_download_csv_range_not_satisfiable(snapshot_store, tmp_path):
+    publish_mock_csv(snapshot_store, tmp_path)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get(
+            "/download-csv", headers={"Range": "bytes=999999-"}
+        )
+
+    assert response.status_code == 416
+
+
+@pytest.mark.asyncio
+async def test_download_csv_invalid_range_is_ignored(snapshot_store, tmp_path):
+    publish_mock_csv(snapshot_store, tmp_path)
 
-    with open(mock_csv_path, "r") as file:
-        content = file.read()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get(
+            "/download-csv", headers={"Range": "bytes=20-10"}
+        )
+
+    assert response.status_code == 200
+    assert response.text == mock_csv_content
+
+
+@pytest.mark.asyncio
+async def test_download_csv_range_with_stale_if_range(
+    snapshot_store, tmp_path
+):
+    publish_mock_csv(snapshot_store, tmp_path)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get(
+            "/download-csv",
+            headers={"Range": "bytes=5-", "If-Range": '"0-stale"'},
+        )
+
+    assert response.status_code == 200
+    assert response.text == mock_csv_content
+
+
+@pytest.fixture
+def job_manager(tmp_path) -> Iterator[JobManager]:
+    """
+    Replaces the app job manager with one using a temporary folder.
+    """
+    manager = JobManager(str(tmp_path / "jobs"), 2)
+    with patch("app.main.job_manager", new=manager):
+        yield manager
+
+
+@pytest.mark.asyncio
+async def test_create_job(mocker: MockFixture, job_manager):
+    run_mock = mocker.patch.object(job_manager, "run", new_callable=AsyncMock)
+    urls = ["http://example.com/1", "http://example.com/2"]
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/jobs", json={"urls": urls})
+        job_id = response.json()["id"]
+        job_response = await ac.get(f"/jobs/{job_id}")
+        list_response = await ac.get("/jobs")
+
+    assert response.status_code == 202
+    assert response.json()["url_count"] == 2
+    assert job_response.status_code == 200
+    assert [job["id"] for job in list_response.json()] == [job_id]
+    run_mock.assert_called_once_with(await job_manager.get(job_id))
+
+
+@pytest.mark.asyncio
+async def test_create_job_without_urls(job_manager):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/jobs", json={"urls": []})
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_unknown_job(job_manager):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/jobs/unknown")
+        download_response = await ac.get("/jobs/unknown/download-csv")
+
+    assert response.status_code == 404
+    assert download_response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_resume_job(mocker: MockFixture, job_manager):
+    run_mock = mocker.patch.object(job_manager, "run", new_callable=AsyncMock)
+    job = await job_manager.create(["http://example.com/1"])
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        pending_response = await ac.post(f"/jobs/{job.id}/resume")
+        job.status = JobStatus.FAILED
+        job.error = "boom"
+        response = await ac.post(f"/jobs/{job.id}/resume")
+
+    assert pending_response.status_code == 409
+    assert response.status_code == 202
+    assert response.json()["status"] == "pending"
+    assert response.json()["error"] is None
+    run_mock.assert_called_once_with(job)
+
+
+@pytest.mark.asyncio
+async def test_download_job_csv(job_manager, tmp_path):
+    job = await job_manager.create(["http://example.com/1"])
+    publish_mock_csv(job.snapshot_store, tmp_path)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get(f"/jobs/{job.id}/download-csv")
+
+    assert response.status_code == 200
+    assert response.text == mock_csv_content
+
+
+@pytest.mark.asyncio
+async def test_skip_report(skip_report_path):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        missing_response = await ac.get("/skip-report")
+        report = SkipReport(deadline_seconds=10)
+        report.add_expired("http://example.com/1", "queue")
+        report.save(skip_report_path)
+        response = await ac.get("/skip-report")
+
+    assert missing_response.status_code == 404
+    assert response.status_code == 200
+    assert response.json()["deadline_exceeded"]
+    assert response.json()["skipped"] == [
+        {
+            "url": "http://example.com/1",
+            "stage": "queue",
+            "reason": "Job deadline exceeded",
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_list_and_purge_negative_cache(negative_cache):
+    negative_cache.record_failure("http://example.com/1", "not found")
+    negative_cache.record_failure("http://example.com/2", "not found")
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        list_response = await ac.get("/negative-cache")
+        disabled_response = await ac.delete("/admin/negative-cache")
+        with patch("app.main.NEGATIVE_CACHE_ADMIN_ENABLED", new=True):
+            purge_one_response = await ac.delete(
+                "/admin/negative-cache",
+                params={"url": "http://example.com/1"},
+            )
+            purge_all_response = await ac.delete("/admin/negative-cache")
+
+    assert [e["url"] for e in list_response.json()] == [
+        "http://example.com/1",
+        "http://example.com/2",
+    ]
+    assert list_response.json()[0]["reason"] == "not found"
+    assert disabled_response.status_code == 404
+    assert purge_one_response.json() == {"purged": 1}
+    assert purge_all_response.json() == {"purged": 1}
+    assert negative_cache.entries() == []
+
+
+@pytest.mark.asyncio
+async def test_metrics():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/metrics")
+
+    assert response.status_code == 200
+    assert "hedges" in response.json()["hedging.api"]
+    assert "active" in response.json()["request_scheduler"]
+    assert "lag_max" in response.json()["event_loop"]
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_debug():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/debug/loop-lag")
+
+    assert response.status_code == 200
+    assert "blocked_seconds_by_stage" in response.json()["stats"]
+    assert isinstance(response.json()["events"], list)
+
+
+@pytest.mark.asyncio
+async def test_profiling_is_disabled_by_default():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/admin/profile")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_profiling_session():
+    profiler = Profiler(interval=0.001, focus=None)
+    with patch("app.main.PROFILING_ENABLED", new=True), patch(
+        "app.main.profiler", new=profiler
+    ):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            start_response = await ac.post(
+                "/admin/profile", params={"seconds": 0.02}
+            )
+            conflict_response = await ac.post("/admin/profile")
+            running_response = await ac.get("/admin/profile/collapsed")
+            await profiler.wait()
+            summary_response = await ac.get("/admin/profile")
+            stacks_response = await ac.get("/admin/profile/collapsed")
+            too_long_response = await ac.post(
+                "/admin/profile", params={"seconds": 3600}
+            )
+
+    assert start_response.status_code == 202
+    assert start_response.json()["running"]
+    assert conflict_response.status_code == 409
+    assert running_response.status_code == 409
+    assert summary_response.status_code == 200
+    assert not summary_response.json()["running"]
+    assert summary_response.json()["samples"] > 0
+    assert stacks_response.status_code == 200
+    assert "attachment" in stacks_response.headers["content-disposition"]
+    assert too_long_response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_runtime_settings_are_disabled_by_default():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.patch(
+            "/admin/settings", json={"max_concurrent_tasks": 2}
+        )
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_max_concurrent_tasks_follows_runtime_request_budget():
+    original = runtime_settings.to_dict()
+    try:
+        with patch("app.main.RUNTIME_SETTINGS_ENABLED", new=True):
+            async with AsyncClient(app=app, base_url="http://test") as ac:
+                raised_response = await ac.patch(
+                    "/admin/settings",
+                    json={"global_max_concurrent_requests": 12},
+                )
+                above_initial_response = await ac.patch(
+                    "/admin/settings",
+                    json={
+                        "max_concurrent_tasks": GLOBAL_MAX_CONCURRENT_REQUESTS
+                        + 1
+                    },
+                )
+                lowered_below_tasks_response = await ac.patch(
+                    "/admin/settings",
+                    json={"global_max_concurrent_requests": 4},
+                )
+                lowered_response = await ac.patch(
+                    "/admin/settings",
+                    json={
+                        "global_max_concurrent_requests": 4,
+                        "max_concurrent_tasks": 4,
+                    },
+                )
+                above_lowered_response = await ac.patch(
+                    "/admin/settings", json={"max_concurrent_tasks": 5}
+                )
+
+        assert raised_response.status_code == 200
+        assert above_initial_response.status_code == 200
+        assert lowered_below_tasks_response.status_code == 422
+        assert lowered_response.status_code == 200
+        assert above_lowered_response.status_code == 422
+        assert runtime_settings.max_concurrent_tasks == 4
+        assert runtime_settings.global_max_concurrent_requests == 4
+    finally:
+        runtime_settings.update(original)
+
+
+@pytest.mark.asyncio
+async def test_runtime_settings_update_live_components():
+    original = runtime_settings.to_dict()
+    try:
+        with patch("app.main.RUNTIME_SETTINGS_ENABLED", new=True):
+            async with AsyncClient(app=app, base_url="http://test") as ac:
+                response = await ac.patch(
+                    "/admin/settings",
+                    json={
+                        "global_max_concurrent_requests": 12,
+                        "hedge_max_ratio": 0.25,
+                    },
+                )
+                invalid_response = await ac.patch(
+                    "/admin/settings", json={"max_concurrent_tasks": 0}
+                )
+                too_many_response = await ac.patch(
+                    "/admin/settings", json={"max_concurrent_tasks": 13}
+                )
+                unknown_response = await ac.patch(
+                    "/admin/settings", json={"workers": 4}
+                )
+                current_response = await ac.get("/admin/settings")
 
-    assert content == mock_csv_content
+        assert response.status_code == 200
+        assert response.json()["changed"] == {
+            "global_max_concurrent_requests": 12,
+            "hedge_max_ratio": 0.25,
+        }
+        assert request_scheduler.max_concurrency == 12
+        assert api_hedge_policy.max_ratio == 0.25
+        assert invalid_response.status_code == 422
+        assert too_many_response.status_code == 422
+        assert unknown_response.status_code == 422
+        assert current_response.json()["global_max_concurrent_requests"] == 12
+    finally:
+        runtime_settings.update(original)
@@ -0,0 +1,21 @@
+from app.metrics import LatencyTracker
+
+
+class TestLatencyTracker:
+    def test_percentile(self):
+        tracker = LatencyTracker()
+        for latency in range(1, 101):
+            tracker.record(latency)
+        assert tracker.percentile(0.5) == 50
+        assert tracker.percentile(0.95) == 95
+        assert tracker.percentile(1.0) == 100
+
+    def test_window(self):
+        tracker = LatencyTracker(window=3)
+        for latency in [100, 1, 2, 3]:
+            tracker.record(latency)
+        assert len(tracker) == 3
+        assert tracker.percentile(1.0) == 3
+
+    def test_empty(self):
+        assert LatencyTracker().percentile(0.95) is None
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+
+from app.locks import flocked
+from app.negative_cache import NegativeCache
+
+
+class TestNegativeCache:
+    url = "http://example.com/project"
+
+    def test_failure_is_cached(self):
+        cache = NegativeCache(None, base_ttl=60, max_ttl=600)
+        cache.record_failure(self.url, "not found")
+
+        entry = cache.get(self.url)
+        assert entry.reason == "not found"
+        assert entry.failures == 1
+        assert cache.get("http://example.com/other") is None
+
+    def test_ttl_grows_with_repeated_failures(self):
+        cache = NegativeCache(None, base_ttl=60, max_ttl=200)
+        ttls = []
+        for _ in range(4):
+            entry = cache.record_failure(self.url, "not found")
+            ttls.append(round(entry.expires_at - entry.last_failed_at))
+
+        assert ttls == [60, 120, 200, 200]
+        assert entry.failures == 4
+
+    def test_expired_entry_is_not_skipped(self):
+        cache = NegativeCache(None, base_ttl=60, max_ttl=600)
+        cache.record_failure(self.url, "not found").expires_at = time.time()
+
+        assert cache.get(self.url) is None
+        assert len(cache.entries()) == 1
+
+    def test_success_removes_entry(self):
+        cache = NegativeCache(None, base_ttl=60, max_ttl=600)
+        cache.record_failure(self.url, "not found")
+        cache.record_success(self.url)
+
+        assert cache.entries() == []
+
+    @pytest.mark.asyncio
+    async def test_persistence(self, tmp_path):
+        path = str(tmp_path / "negative-cache.json")
+        cache = NegativeCache(path, base_ttl=60, max_ttl=600)
+        cache.record_failure(self.url, "not found")
+        await cache.save()
+
+        loaded = NegativeCache(path, base_ttl=60, max_ttl=600)
+        assert loaded.get(self.url).reason == "not found"
+
+    @pytest.mark.asyncio
+    async def test_purge(self, tmp_path):
+        path = str(tmp_path / "negative-cache.json")
+        cache = NegativeCache(path, base_ttl=60, max_ttl=600)
+        cache.record_failure(self.url, "not found")
+        cache.record_failure("http://example.com/other", "not found")
+
+        assert await cache.purge(self.url) == 1
+        assert await cache.purge(self.url) == 0
+        assert await cache.purge() == 1
+        assert NegativeCache(path, base_ttl=60, max_ttl=600).entries() == []
+
+    @pytest.mark.asyncio
+    async def test_saves_of_workers_are_merged(self, tmp_path):
+        path = str(tmp_path / "negative-cache.json")
+        worker_a = NegativeCache(path, base_ttl=60, max_ttl=600)
+        worker_b = NegativeCache(path, base_ttl=60, max_ttl=600)
+        worker_a.record_failure(self.url, "not found")
+        worker_b.record_failure("http://example.com/other", "not found")
+        await worker_a.save()
+        await worker_b.save()
+
+        loaded = NegativeCache(path, base_ttl=60, max_ttl=600)
+        assert sorted(e.url for e in loaded.entries()) == [
+            "http://example.com/other",
+            self.url,
+        ]
+
+    @pytest.mark.asyncio
+    async def test_purge_is_not_undone_by_other_worker(self, tmp_path):
+        path = str(tmp_path / "negative-cache.json")
+        worker_a = NegativeCache(path, base_ttl=60, max_ttl=600)
+        worker_a.record_failure(self.url, "not found")
+        await worker_a.save()
+        worker_b = NegativeCache(path, base_ttl=60, max_ttl=600)
+
+        assert await worker_b.purge() == 1
+        worker_a.record_failure("http://example.com/other", "not found")
+        await worker_a.save()
+
+        loaded = NegativeCache(path, base_ttl=60, max_ttl=600)
+        assert [e.url for e in loaded.entries()] == [
+            "http://example.com/other"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_long_expired_entries_are_dropped_on_save(self, tmp_path):
+        path = str(tmp_path / "negative-cache.json")
+        cache = NegativeCache(path, base_ttl=60, max_ttl=600)
+        cache.record_failure(self.url, "not found").expires_at = time.time()
+        stale = cache.record_failure("http://example.com/other", "not found")
+        stale.expires_at = time.time() - 601
+        await cache.save()
+
+        assert [e.url for e in cache.entries()] == [self.url]
+        loaded = NegativeCache(path, base_ttl=60, max_ttl=600)
+        assert [e.url for e in loaded.entries()] == [self.url]
+        # the recently expired entry keeps growing its TTL
+        assert loaded.record_failure(self.url, "not found").failures == 2
+
+    @pytest.mark.asyncio
+    async def test_locked_file_does_not_block_event_loop(self, tmp_path):
+        path = str(tmp_path / "negative-cache.json")
+        cache = NegativeCache(path, base_ttl=60, max_ttl=600)
+        cache.record_failure(self.url, "not found")
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        # another worker holds the lock while writing
+        with flocked(f"{path}.lock"):
+            ticker = asyncio.create_task(tick())
+            save = asyncio.create_task(cache.save())
+            await asyncio.sleep(0.2)
+            assert not save.done()
+        await save
+        ticker.cancel()
+
+        assert ticks > 5
+        loaded = NegativeCache(path, base_ttl=60, max_ttl=600)
+        assert loaded.get(self.url) is not None
@@ -0,0 +1,154 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.locks import flocked
+from app.parse_memo import (
+    JSON_PARSER_VERSION,
+    MemoizedParsingStrategy,
+    ParseMemo,
+    parser_version,
+)
+from app.parsers import JSONParsingStrategy
+from app.schemas import ProjectInfo
+from fixtures import read_mock_data
+
+mock_json_content = read_mock_data("json", "dummy_api.json")
+
+
+def project_info(name: str = "Project ABC") -> ProjectInfo:
+    return ProjectInfo(hash="abc", name=name, floor_count=1, room_count=2)
+
+
+class TestParseMemo:
+    def test_hit_and_miss(self):
+        memo = ParseMemo(None, max_entries=10, version="v1")
+        digest = memo.digest("body")
+
+        assert memo.get(digest) is None
+        memo.put(digest, project_info())
+        assert memo.get(digest) == project_info()
+        assert memo.stats() == {
+            "entries": 1,
+            "hits": 1,
+            "misses": 1,
+            "hit_rate": 0.5,
+        }
+
+    def test_least_recently_used_entry_is_evicted(self):
+        memo = ParseMemo(None, max_entries=2, version="v1")
+        memo.put("a", project_info("a"))
+        memo.put("b", project_info("b"))
+        memo.get("a")
+        memo.put("c", project_info("c"))
+
+        assert memo.get("b") is None
+        assert memo.get("a") == project_info("a")
+        assert memo.get("c") == project_info("c")
+
+    @pytest.mark.asyncio
+    async def test_entries_are_persisted(self, tmp_path):
+        file_path = str(tmp_path / "parse-memo.json")
+        memo = ParseMemo(file_path, max_entries=10, version="v1")
+        memo.put("a", project_info())
+        await memo.save()
+
+        reloaded = ParseMemo(file_path, max_entries=10, version="v1")
+        assert reloaded.get("a") == project_info()
+
+    @pytest.mark.asyncio
+    async def test_entries_of_other_parser_version_are_discarded(
+        self, tmp_path
+    ):
+        file_path = str(tmp_path / "parse-memo.json")
+        memo = ParseMemo(file_path, max_entries=10, version="v1")
+        memo.put("a", project_info())
+        await memo.save()
+
+        reloaded = ParseMemo(file_path, max_entries=10, version="v2")
+        assert reloaded.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_saves_of_workers_are_merged(self, tmp_path):
+        file_path = str(tmp_path / "parse-memo.json")
+        worker_a = ParseMemo(file_path, max_entries=10, version="v1")
+        worker_b = ParseMemo(file_path, max_entries=10, version="v1")
+        worker_a.put("a", project_info("A"))
+        worker_b.put("b", project_info("B"))
+        await worker_a.save()
+        await worker_b.save()
+
+        reloaded = ParseMemo(file_path, max_entries=10, version="v1")
+        assert reloaded.get("a") == project_info("A")
+        assert reloaded.get("b") == project_info("B")
+
+    @pytest.mark.asyncio
+    async def test_locked_file_does_not_block_event_loop(self, tmp_path):
+        file_path = str(tmp_path / "parse-memo.json")
+        memo = ParseMemo(file_path, max_entries=10, version="v1")
+        memo.put("a", project_info())
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        # another worker holds the lock while writing
+        with flocked(f"{file_path}.lock"):
+            ticker = asyncio.create_task(tick())
+            save = asyncio.create_task(memo.save())
+            await asyncio.sleep(0.2)
+            memo.put("b", project_info("B"))  # put while saving
+            assert not save.done()
+        await save
+        ticker.cancel()
+
+        assert ticks > 5
+        reloaded = ParseMemo(file_path, max_entries=10, version="v1")
+        assert reloaded.get("a") == project_info()
+        assert reloaded.get("b") is None  # kept for the next save
+        await memo.save()
+        await reloaded.load()
+        assert reloaded.get("b") == project_info("B")
+
+    def test_invalid_file_is_ignored(self, tmp_path):
+        file_path = tmp_path / "parse-memo.json"
+        file_path.write_text("{not json")
+
+        memo = ParseMemo(str(file_path), max_entries=10, version="v1")
+        assert memo.stats()["entries"] == 0
+
+
+class TestMemoizedParsingStrategy:
+    def test_same_body_is_parsed_once(self):
+        strategy = JSONParsingStrategy()
+        strategy.parse = MagicMock(wraps=strategy.parse)
+        memoized = MemoizedParsingStrategy(
+            strategy, ParseMemo(None, max_entries=10, version="v1")
+        )
+
+        first = memoized.parse(mock_json_content)
+        second = memoized.parse(mock_json_content)
+
+        strategy.parse.assert_called_once()
+        assert first.project_info == second.project_info
+        assert second.project_info.name == "Project ABC"
+
+    def test_decoded_data_is_not_memoized(self):
+        memo = ParseMemo(None, max_entries=10, version="v1")
+        memoized = MemoizedParsingStrategy(JSONParsingStrategy(), memo)
+
+        memoized.parse({"items": [{"hash": "abc", "name": "n", "data": {}}]})
+        assert memo.stats()["entries"] == 0
+
+
+def test_parser_version_depends_on_parser_source():
+    class OtherStrategy(JSONParsingStrategy):
+        def parse(self, data):
+            return super().parse(data)
+
+    assert parser_version(JSONParsingStrategy) == JSON_PARSER_VERSION
+    assert parser_version(OtherStrategy) != JSON_PARSER_VERSION
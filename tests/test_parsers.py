@@ -5,7 +5,7 @@ from lxml import html
 
 from app.parsers import HTMLParsingStrategy, JSONParsingStrategy
 from app.schemas import ParsedData
-from tests.mock_data_helpers import read_mock_data
+from fixtures import read_mock_data
 
 
 class TestHTMLParsingStrategy:
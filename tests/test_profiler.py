@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from app.parse_memo import ParseMemo
+from app.parsers import JSONParsingStrategy
+from app.profiler import Profiler
+from app.schemas import ProjectInfo
+from fixtures import read_mock_data
+
+mock_json_content = read_mock_data("json", "dummy_api.json")
+
+
+def busy_parse(memo: ParseMemo) -> list:
+    """
+    Stands in for the focus function, blocking the loop while allocating
+    in the app code.
+    """
+    deadline = time.monotonic() + 0.1
+    results = []
+    while time.monotonic() < deadline:
+        digest = str(len(memo.stats()) + memo.misses)
+        memo.get(digest)
+        memo.put(digest, ProjectInfo(digest, "name", 1, 1))
+        results.append(JSONParsingStrategy().parse(mock_json_content))
+    return results
+
+
+class TestProfiler:
+    @pytest.mark.asyncio
+    async def test_samples_focus_stacks_and_allocations(self):
+        profiler = Profiler(interval=0.001, focus="busy_parse")
+        memo = ParseMemo(None, max_entries=100000, version="test")
+        report = profiler.start(0.05)
+        while not report.samples:  # lets the session start sampling
+            await asyncio.sleep(0.001)
+
+        results = busy_parse(memo)
+        await profiler.wait()
+
+        assert not report.running
+        assert report.focus_samples > 0
+        assert all(":busy_parse;" in f"{s};" for s in report.stacks)
+        assert "test_profiler:busy_parse" in report.collapsed()
+        assert report.to_dict()["samples"] >= report.focus_samples
+        assert any(
+            "parse_memo.py" in site.location and site.size_diff > 0
+            for site in report.allocations
+        )
+        # allocations of the json module are attributed to the parser calling it
+        assert any(
+            "parsers.py" in site.location
+            and any("json" in frame for frame in site.traceback[1:])
+            for site in report.allocations
+        )
+        assert not any(
+            "profiler.py" in frame
+            for site in report.allocations
+            for frame in site.traceback
+        )
+        assert results
+
+    @pytest.mark.asyncio
+    async def test_only_one_session_runs_at_a_time(self):
+        profiler = Profiler(interval=0.001)
+        profiler.start(0.01)
+
+        with pytest.raises(RuntimeError):
+            profiler.start(0.01)
+        await profiler.wait()
+        assert not profiler.is_running
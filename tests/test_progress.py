@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from app.progress import ProgressBroker, RunProgress, format_sse
+
+
+class TestProgressBroker:
+    @pytest.mark.asyncio
+    async def test_subscribers_receive_latest_and_new_events(self):
+        broker = ProgressBroker()
+        broker.publish("started", {"processed": 0})
+        received = []
+
+        async def subscriber() -> None:
+            async for event in broker.subscribe():
+                received.append(event)
+
+        task = asyncio.create_task(subscriber())
+        await asyncio.sleep(0)
+        assert broker.stats() == {"subscribers": 1}
+        broker.publish("project", {"processed": 1})
+        broker.close()
+        await task
+
+        assert received == [
+            ("started", {"processed": 0}),
+            ("project", {"processed": 1}),
+        ]
+        assert broker.stats() == {"subscribers": 0}
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_loses_oldest_events(self):
+        broker = ProgressBroker(max_queued=2)
+        subscription = broker.subscribe()
+        first = asyncio.create_task(subscription.__anext__())
+        await asyncio.sleep(0)
+        for processed in range(5):
+            broker.publish("project", {"processed": processed})
+        broker.close()
+
+        received = [await first]
+        async for event in subscription:
+            received.append(event)
+
+        assert [data["processed"] for _, data in received] == [3, 4]
+
+    @pytest.mark.asyncio
+    async def test_heartbeat(self):
+        broker = ProgressBroker()
+        subscription = broker.subscribe(heartbeat=0.01)
+
+        assert await subscription.__anext__() is None
+        await subscription.aclose()
+
+
+def test_format_sse():
+    assert format_sse(("project", {"processed": 1})) == (
+        'event: project\ndata: {"processed": 1}\n\n'
+    )
+    assert format_sse(None) == ": keep-alive\n\n"
+
+
+def test_run_progress():
+    broker = ProgressBroker()
+    progress = RunProgress(broker, "default", total=3)
+    progress.start()
+    progress.record("http://example.com/1", "written")
+    progress.record("http://example.com/2", "resumed")
+    progress.record("http://example.com/3", "skipped")
+    progress.finish(None)
+
+    event, state = broker.latest
+    assert event == "finished"
+    assert state["processed"] == 3
+    assert state["written"] == 2
+    assert state["skipped"] == 1
+    assert state["snapshot_version"] is None
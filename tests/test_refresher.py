@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from app.refresher import PeriodicRefresher
+
+
+class TestPeriodicRefresher:
+    @pytest.mark.asyncio
+    async def test_refreshes_periodically(self):
+        calls = 0
+
+        async def refresh() -> None:
+            nonlocal calls
+            calls += 1
+
+        refresher = PeriodicRefresher(refresh, 0.01)
+        refresher.start()
+        await asyncio.sleep(0.05)
+        await refresher.stop()
+
+        assert calls >= 2
+        assert not refresher.is_running
+
+    @pytest.mark.asyncio
+    async def test_failures_do_not_stop_refresh(self):
+        calls = 0
+
+        async def refresh() -> None:
+            nonlocal calls
+            calls += 1
+            raise RuntimeError("upstream down")
+
+        refresher = PeriodicRefresher(refresh, 0.01)
+        refresher.start()
+        await asyncio.sleep(0.05)
+        assert refresher.is_running
+        await refresher.stop()
+
+        assert calls >= 2
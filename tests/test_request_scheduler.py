@@ -0,0 +1,144 @@
+import asyncio
+import time
+from typing import List
+
+import pytest
+
+from app.request_scheduler import FairShareScheduler, ScheduledSession
+from tests.mock_data_helpers import mock_get
+
+
+class TestFairShareScheduler:
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        scheduler = FairShareScheduler(max_concurrency=2)
+        running = 0
+        max_running = 0
+
+        async def request(job_id: str) -> None:
+            nonlocal running, max_running
+            async with scheduler.slot(job_id):
+                running += 1
+                max_running = max(max_running, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(
+            *(request("a") for _ in range(5)),
+            *(request("b") for _ in range(5)),
+        )
+        assert max_running == 2
+        assert scheduler.stats()["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_small_job_is_not_starved(self):
+        scheduler = FairShareScheduler(max_concurrency=1)
+        order: List[str] = []
+
+        async def request(job_id: str) -> None:
+            async with scheduler.slot(job_id):
+                order.append(job_id)
+                await asyncio.sleep(0)
+
+        batch = [asyncio.create_task(request("batch")) for _ in range(20)]
+        await asyncio.sleep(0)
+        interactive = [
+            asyncio.create_task(request("interactive")) for _ in range(2)
+        ]
+        await asyncio.gather(*batch, *interactive)
+
+        # interactive requests are interleaved instead of waiting for the batch
+        assert order.index("interactive") <= 2
+        assert max(i for i, j in enumerate(order) if j == "interactive") <= 4
+
+    @pytest.mark.asyncio
+    async def test_weights(self):
+        scheduler = FairShareScheduler(max_concurrency=1)
+        order: List[str] = []
+
+        async def request(job_id: str, weight: float) -> None:
+            async with scheduler.slot(job_id, weight):
+                order.append(job_id)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(
+            *(request("heavy", 3.0) for _ in range(12)),
+            *(request("light", 1.0) for _ in range(12)),
+        )
+
+        assert order[:8].count("heavy") >= 5
+
+    @pytest.mark.asyncio
+    async def test_rate_limit(self):
+        scheduler = FairShareScheduler(
+            max_concurrency=10, max_requests_per_second=50
+        )
+
+        async def request() -> None:
+            async with scheduler.slot("a"):
+                pass
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(60)))
+        elapsed = time.perf_counter() - started
+
+        # the burst of 50 requests is immediate, the remaining 10 take ~0.2s
+        assert elapsed >= 0.15
+
+    @pytest.mark.asyncio
+    async def test_configure_grants_queued_requests(self):
+        scheduler = FairShareScheduler(max_concurrency=1)
+        release = asyncio.Event()
+
+        async def request() -> None:
+            async with scheduler.slot("a"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(request()) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["active"] == 1
+
+        scheduler.configure(max_concurrency=3)
+        await asyncio.sleep(0)
+        assert scheduler.stats()["active"] == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_releases_nothing(self):
+        scheduler = FairShareScheduler(max_concurrency=1)
+        await scheduler.acquire("a")
+        waiter = asyncio.create_task(scheduler.acquire("b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        scheduler.release()
+
+        await asyncio.wait_for(scheduler.acquire("c"), 1)
+        assert scheduler.stats()["active"] == 1
+
+    @pytest.mark.asyncio
+    async def test_forget(self):
+        scheduler = FairShareScheduler(max_concurrency=1)
+        async with scheduler.slot("a"):
+            pass
+        scheduler.forget("a")
+        assert scheduler.stats()["jobs"] == {}
+
+
+class TestScheduledSession:
+    @pytest.mark.asyncio
+    async def test_holds_slot_during_request(self, mocker):
+        scheduler = FairShareScheduler(max_concurrency=1)
+        http_session = mocker.MagicMock()
+        http_session.get.side_effect = mock_get("content")
+        session = ScheduledSession(http_session, scheduler, "job")
+
+        async with session.get("http://example.com") as response:
+            assert scheduler.stats()["active"] == 1
+            assert await response.text() == "content"
+
+        assert scheduler.stats()["active"] == 0
+        http_session.get.assert_called_once_with("http://example.com")
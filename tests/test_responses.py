@@ -0,0 +1,41 @@
+import pytest
+
+from app.responses import etag_matches, parse_range_header
+
+
+@pytest.mark.parametrize(
+    "range_header, expected",
+    [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=10-", (10, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=90-200", (90, 99)),
+        ("bytes=-200", (0, 99)),
+        ("bytes=100-", None),
+    ],
+)
+def test_parse_range_header(range_header: str, expected):
+    assert parse_range_header(range_header, 100) == expected
+
+
+@pytest.mark.parametrize(
+    "range_header",
+    ["bytes=0-1,5-9", "items=0-9", "bytes=-", "bytes=a-b", "bytes=20-10"],
+)
+def test_parse_unsupported_range_header(range_header: str):
+    with pytest.raises(ValueError):
+        parse_range_header(range_header, 100)
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        ('"1-abc"', True),
+        ('W/"1-abc"', True),
+        ('"0-old", "1-abc"', True),
+        ("*", True),
+        ('"0-old"', False),
+    ],
+)
+def test_etag_matches(if_none_match: str, expected: bool):
+    assert etag_matches(if_none_match, '"1-abc"') is expected
@@ -0,0 +1,59 @@
+import csv
+
+import pytest
+
+from app.csv_handler import CSVHandler
+from app.results_table import ResultsTable
+from app.schemas import PROJECT_INFO_FIELDS, ProjectInfo
+
+
+def filled_table() -> ResultsTable:
+    table = ResultsTable()
+    table.append_project(ProjectInfo("abc", "Kitchen", 1, 4))
+    table.append("défi", "Kitchen", 2, 7)
+    table.append("xyz", "Villa", 3, 12)
+    return table
+
+
+class TestResultsTable:
+    def test_rows_round_trip(self):
+        table = filled_table()
+
+        assert len(table) == 3
+        assert list(table) == [
+            ("abc", "Kitchen", 1, 4),
+            ("défi", "Kitchen", 2, 7),
+            ("xyz", "Villa", 3, 12),
+        ]
+        assert table.hash(1) == "défi"
+        with pytest.raises(IndexError):
+            table.row(3)
+
+    def test_repeated_names_are_stored_once(self):
+        table = filled_table()
+
+        assert table.names == ["Kitchen", "Villa"]
+        assert list(table.name_codes) == [0, 0, 1]
+        assert list(table.room_counts) == [4, 7, 12]
+
+    def test_rows_are_compact(self):
+        table = ResultsTable()
+        for index in range(10000):
+            table.append(f"{index:032x}", f"Project {index % 10}", 1, 3)
+
+        assert table.nbytes < 10000 * 64
+
+    def test_csv_round_trip(self, tmp_path):
+        path = str(tmp_path / "out.csv")
+        filled_table().write_csv(CSVHandler(path))
+
+        with open(path, newline="") as csvfile:
+            assert tuple(next(csv.reader(csvfile))) == PROJECT_INFO_FIELDS
+        assert list(ResultsTable.from_csv(path)) == list(filled_table())
+
+    def test_from_csv_rejects_other_columns(self, tmp_path):
+        path = tmp_path / "other.csv"
+        path.write_text("id,name\n1,Item 1\n")
+
+        with pytest.raises(ValueError):
+            ResultsTable.from_csv(str(path))
@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.config import convert, list_setting, setting
+from app.settings import RuntimeSettings
+
+
+class TestSetting:
+    def test_default(self, monkeypatch):
+        monkeypatch.delenv("P5D_MAX_CONCURRENT_TASKS", raising=False)
+
+        assert setting("MAX_CONCURRENT_TASKS", 3) == 3
+
+    def test_environment_override(self, monkeypatch):
+        monkeypatch.setenv("P5D_MAX_CONCURRENT_TASKS", "8")
+        monkeypatch.setenv("P5D_HEDGING_ENABLED", "yes")
+
+        assert setting("MAX_CONCURRENT_TASKS", 3) == 8
+        assert setting("HEDGING_ENABLED", False) is True
+
+    def test_config_file_override(self, monkeypatch):
+        monkeypatch.setattr(
+            "app.config.config_file_overrides", {"HEDGE_MAX_RATIO": 0.3}
+        )
+        monkeypatch.delenv("P5D_HEDGE_MAX_RATIO", raising=False)
+
+        assert setting("HEDGE_MAX_RATIO", 0.1) == 0.3
+
+    def test_environment_wins_over_config_file(self, monkeypatch):
+        monkeypatch.setattr(
+            "app.config.config_file_overrides", {"HTTP_BACKEND": "httpx"}
+        )
+        monkeypatch.setenv("P5D_HTTP_BACKEND", "aiohttp")
+
+        assert setting("HTTP_BACKEND", "httpx") == "aiohttp"
+
+    def test_list_setting(self, monkeypatch):
+        monkeypatch.setattr("app.config.config_file_overrides", {})
+        monkeypatch.setenv(
+            "P5D_GALLERY_LISTING_URLS", " http://a.com/, http://b.com/,"
+        )
+
+        assert list_setting("GALLERY_LISTING_URLS", []) == [
+            "http://a.com/",
+            "http://b.com/",
+        ]
+
+    def test_list_setting_from_config_file(self, monkeypatch):
+        monkeypatch.setattr(
+            "app.config.config_file_overrides",
+            {"GALLERY_LISTING_URLS": ["http://a.com/"]},
+        )
+        monkeypatch.delenv("P5D_GALLERY_LISTING_URLS", raising=False)
+
+        assert list_setting("GALLERY_LISTING_URLS", []) == ["http://a.com/"]
+
+    def test_gallery_listing_urls_from_environment(self):
+        env = {
+            **os.environ,
+            "P5D_GALLERY_LISTING_URLS": "http://a.com/,http://b.com/",
+        }
+        env.pop("P5D_CONFIG_FILE", None)
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import json; from app.config import GALLERY_LISTING_URLS; "
+                "print(json.dumps(GALLERY_LISTING_URLS))",
+            ],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+        assert json.loads(output) == ["http://a.com/", "http://b.com/"]
+
+    def test_invalid_values(self):
+        with pytest.raises(ValueError):
+            convert("MAX_CONCURRENT_TASKS", "many", 3)
+        with pytest.raises(ValueError):
+            convert("HEDGING_ENABLED", "maybe", False)
+
+
+class TestRuntimeSettings:
+    def test_update_notifies_watchers_of_changes(self):
+        settings = RuntimeSettings()
+        seen = []
+        unwatch = settings.watch("max_concurrent_tasks", seen.append)
+
+        changed = settings.update(
+            {
+                "max_concurrent_tasks": settings.max_concurrent_tasks + 1,
+                "hedge_max_ratio": settings.hedge_max_ratio,
+            }
+        )
+
+        assert list(changed) == ["max_concurrent_tasks"]
+        assert seen == [settings.max_concurrent_tasks]
+        unwatch()
+        settings.update({"max_concurrent_tasks": 1})
+        assert len(seen) == 1
+        assert settings.to_dict()["max_concurrent_tasks"] == 1
+
+    def test_unknown_setting(self):
+        settings = RuntimeSettings()
+
+        with pytest.raises(KeyError):
+            settings.update({"workers": 4})
+        with pytest.raises(KeyError):
+            settings.watch("workers", print)
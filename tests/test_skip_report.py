@@ -0,0 +1,61 @@
+from app.skip_report import DEADLINE_EXCEEDED, SkipReport, SkippedURL
+
+
+class TestSkipReport:
+    def test_skipped_urls_are_counted_by_stage(self):
+        report = SkipReport()
+        report.add("http://example.com/1", "fetch_html", "Timed out")
+        report.add_expired("http://example.com/2", "queue")
+        report.add_expired("http://example.com/3", "queue")
+
+        assert report.deadline_exceeded
+        assert report.skipped_count == 3
+        assert report.to_dict()["skipped_by_stage"] == {
+            "fetch_html": 1,
+            "queue": 2,
+        }
+        assert [s.url for s in report.skipped()] == [
+            "http://example.com/1",
+            "http://example.com/2",
+            "http://example.com/3",
+        ]
+
+    def test_skipped_urls_are_streamed_into_the_saved_report(self, tmp_path):
+        path = str(tmp_path / "report.json")
+        report = SkipReport("job", deadline_seconds=10)
+        urls = [f"http://example.com/{i}" for i in range(1000)]
+        for url in urls:
+            report.add_expired(url, "queue")
+        report.processed = len(urls)
+        report.save(path)
+
+        saved = SkipReport.read(path)
+        assert saved is not None
+        assert saved["job_id"] == "job"
+        assert saved["skipped_count"] == 1000
+        assert [s["url"] for s in saved["skipped"]] == urls
+        assert saved["skipped"][0] == {
+            "url": urls[0],
+            "stage": "queue",
+            "reason": DEADLINE_EXCEEDED,
+        }
+
+    def test_skips_after_reading_are_appended(self, tmp_path):
+        report = SkipReport()
+        report.add("http://example.com/1", "validate", "Invalid URL")
+        assert len(list(report.skipped())) == 1
+        report.add("http://example.com/2", "validate", "Invalid URL")
+
+        assert list(report.skipped()) == [
+            SkippedURL("http://example.com/1", "validate", "Invalid URL"),
+            SkippedURL("http://example.com/2", "validate", "Invalid URL"),
+        ]
+
+    def test_empty_report(self, tmp_path):
+        path = str(tmp_path / "report.json")
+        SkipReport().save(path)
+
+        saved = SkipReport.read(path)
+        assert saved is not None
+        assert saved["skipped_count"] == 0
+        assert saved["skipped"] == []
@@ -0,0 +1,57 @@
+import os
+
+from app.snapshots import SnapshotStore
+
+
+class TestSnapshotStore:
+    @staticmethod
+    def write_partial(tmp_path, content: str) -> str:
+        partial_path = tmp_path / "out.csv.partial"
+        partial_path.write_text(content)
+        return str(partial_path)
+
+    def test_latest_without_snapshots(self, tmp_path):
+        store = SnapshotStore(str(tmp_path / "snapshots"), "out.csv")
+        assert store.latest() is None
+
+    def test_publish_moves_file(self, tmp_path):
+        store = SnapshotStore(str(tmp_path / "snapshots"), "out.csv")
+        partial_path = self.write_partial(tmp_path, "a,b\n1,2\n")
+
+        snapshot = store.publish(partial_path)
+
+        assert snapshot.version == 1
+        assert snapshot.file_name == "out.1.csv"
+        assert snapshot.size == 8
+        assert not os.path.exists(partial_path)
+        assert store.latest() == snapshot
+        with open(store.snapshot_path(snapshot)) as file:
+            assert file.read() == "a,b\n1,2\n"
+
+    def test_versions_increase(self, tmp_path):
+        store = SnapshotStore(str(tmp_path / "snapshots"), "out.csv")
+        store.publish(self.write_partial(tmp_path, "first"))
+        snapshot = store.publish(self.write_partial(tmp_path, "second"))
+
+        assert snapshot.version == 2
+        assert store.latest().version == 2
+
+    def test_current_path_points_to_latest(self, tmp_path):
+        current_path = tmp_path / "out.csv"
+        store = SnapshotStore(
+            str(tmp_path / "snapshots"), "out.csv", str(current_path)
+        )
+        store.publish(self.write_partial(tmp_path, "first"))
+        store.publish(self.write_partial(tmp_path, "second"))
+
+        assert current_path.read_text() == "second"
+
+    def test_old_snapshots_are_pruned(self, tmp_path):
+        folder = tmp_path / "snapshots"
+        store = SnapshotStore(str(folder), "out.csv", keep=2)
+        for content in ["1", "2", "3"]:
+            store.publish(self.write_partial(tmp_path, content))
+
+        assert not (folder / "out.1.csv").exists()
+        assert (folder / "out.2.csv").exists()
+        assert (folder / "out.3.csv").exists()
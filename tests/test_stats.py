@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.results_table import ResultsTable
+from app.snapshots import SnapshotStore
+from app.stats import SnapshotStats, histogram, summarize
+
+
+def table_of(*rows) -> ResultsTable:
+    table = ResultsTable()
+    for index, (floors, rooms) in enumerate(rows):
+        table.append(f"hash{index}", "name", floors, rooms)
+    return table
+
+
+def publish_rows(store: SnapshotStore, tmp_path, *rows: str) -> None:
+    partial = tmp_path / "partial.csv"
+    partial.write_text(
+        "hash,name,floor_count,room_count\n" + "".join(f"{r}\n" for r in rows)
+    )
+    store.publish(str(partial))
+
+
+def test_summarize():
+    stats = summarize(table_of((1, 2), (2, 6), (0, 1), (1, 3)), (50,), 10)
+
+    assert stats["count"] == 4
+    assert stats["floor_count"]["max"] == 2
+    assert stats["room_count"]["mean"] == 3.0
+    assert stats["room_count"]["percentiles"] == {"p50": 2.5}
+    assert stats["floor_count"]["histogram"] == {
+        "edges": [0, 1, 2, 3],
+        "counts": [1, 2, 1],
+    }
+    assert stats["rooms_per_floor"]["count"] == 3
+    assert stats["rooms_per_floor"]["mean"] == pytest.approx(8 / 3)
+    assert stats["rooms_per_floor"]["without_floors"] == 1
+    assert "histogram" not in stats["rooms_per_floor"]
+
+
+def test_summarize_empty_table():
+    stats = summarize(ResultsTable())
+
+    assert stats["count"] == 0
+    assert stats["room_count"] == {"count": 0}
+
+
+def test_histogram_of_wide_range_has_max_bins():
+    result = histogram(np.arange(100, dtype=np.intc), 10)
+
+    assert len(result["counts"]) == 10
+    assert sum(result["counts"]) == 100
+
+
+class TestSnapshotStats:
+    @pytest.mark.asyncio
+    async def test_cached_until_new_snapshot(self, tmp_path):
+        store = SnapshotStore(str(tmp_path / "snapshots"), "out.csv")
+        stats = SnapshotStats(store)
+        assert await stats.get() is None
+
+        publish_rows(store, tmp_path, "a,A,1,2")
+        with patch.object(
+            SnapshotStats, "_compute", wraps=stats._compute
+        ) as compute:
+            first = await stats.get()
+            assert await stats.get() is first
+            publish_rows(store, tmp_path, "a,A,1,2", "b,B,1,4")
+            second = await stats.get()
+
+        assert compute.call_count == 2
+        assert first["snapshot_version"] == 1
+        assert second["snapshot_version"] == 2
+        assert second["count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_rejects_other_columns(self, tmp_path):
+        store = SnapshotStore(str(tmp_path / "snapshots"), "out.csv")
+        partial = tmp_path / "partial.csv"
+        partial.write_text("id,name\n1,Item 1\n")
+        store.publish(str(partial))
+
+        with pytest.raises(ValueError):
+            await SnapshotStats(store).get()
@@ -0,0 +1,208 @@
+import asyncio
+
+import aiohttp
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.fetchers import AsyncHTMLDataFetcher, AsyncJSONDataFetcher
+from app.transports import (
+    HTTPXSession,
+    ResponseTooLargeError,
+    create_session,
+    read_text,
+)
+from fixtures import read_mock_data
+
+mock_html_content = read_mock_data("html", "dummy_page.html")
+mock_json_content = read_mock_data("json", "dummy_api.json")
+
+
+def mock_transport_session(content: str) -> HTTPXSession:
+    """
+    Creates an HTTPXSession answering every request with the given content.
+
+    :param content: The response body.
+    :return: HTTPXSession backed by httpx.MockTransport.
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text=content)
+
+    return HTTPXSession(transport=httpx.MockTransport(handler))
+
+
+class TestHTTPXSession:
+    @pytest.mark.asyncio
+    async def test_get_text(self):
+        async with mock_transport_session(mock_html_content) as session:
+            async with session.get("http://example.com") as response:
+                assert response.status == 200
+                assert await response.text() == mock_html_content
+
+    @pytest.mark.asyncio
+    async def test_get_json(self):
+        async with mock_transport_session(mock_json_content) as session:
+            async with session.get("http://example.com") as response:
+                data = await response.json()
+        assert data["items"][0]["hash"] == "project123hash"
+
+    @pytest.mark.asyncio
+    async def test_fetchers_with_httpx_backend(self):
+        async with mock_transport_session(mock_json_content) as session:
+            html_data = await AsyncHTMLDataFetcher().fetch_data(
+                "http://example.com", session
+            )
+            json_data = await AsyncJSONDataFetcher().fetch_data(
+                "http://example.com/api", session
+            )
+        assert html_data == mock_json_content
+        assert json_data == mock_json_content
+
+    @pytest.mark.asyncio
+    async def test_fetch_error_is_handled(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("connection refused")
+
+        transport = httpx.MockTransport(handler)
+        async with HTTPXSession(transport=transport) as session:
+            result = await AsyncJSONDataFetcher().fetch_data(
+                "http://example.com/api", session
+            )
+        assert result is None
+
+
+class TestCreateSession:
+    @pytest.mark.asyncio
+    async def test_aiohttp_backend(self):
+        async with create_session("aiohttp") as session:
+            assert isinstance(session, aiohttp.ClientSession)
+
+    @pytest.mark.asyncio
+    async def test_httpx_backend(self):
+        async with create_session("httpx") as session:
+            assert isinstance(session, HTTPXSession)
+            # the stage timeouts apply instead of the httpx defaults
+            assert session.client.timeout == httpx.Timeout(None)
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            create_session("unknown")
+
+
+class TestConnectionErrors:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("backend", ["aiohttp", "httpx"])
+    @pytest.mark.parametrize("listening", [True, False])
+    async def test_connection_error_is_handled(
+        self, backend: str, listening: bool
+    ):
+        # the server closes every connection without answering
+        server = await asyncio.start_server(
+            lambda reader, writer: writer.close(), "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        if not listening:  # connection refused
+            server.close()
+            await server.wait_closed()
+
+        fetcher = AsyncHTMLDataFetcher()
+        async with create_session(backend) as session:
+            result = await fetcher.fetch_data(
+                f"http://127.0.0.1:{port}/", session
+            )
+        server.close()
+
+        assert result is None
+        assert fetcher.error is not None
+
+
+class TestReadText:
+    @pytest.mark.asyncio
+    async def test_rejects_large_content_length_before_reading(self):
+        chunks_sent = []
+
+        async def body():
+            chunks_sent.append(1)
+            yield b"x" * 100
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(
+                200, content=body(), headers={"Content-Length": "100"}
+            )
+
+        transport = httpx.MockTransport(handler)
+        async with HTTPXSession(transport=transport) as session:
+            async with session.get("http://example.com") as response:
+                with pytest.raises(ResponseTooLargeError):
+                    await read_text(response, max_bytes=10)
+        assert not chunks_sent
+
+    @pytest.mark.asyncio
+    async def test_aborts_streamed_body_over_limit(self):
+        async def body():
+            for _ in range(10):
+                yield b"x" * 100
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=body())
+
+        transport = httpx.MockTransport(handler)
+        async with HTTPXSession(transport=transport) as session:
+            async with session.get("http://example.com") as response:
+                assert "Content-Length" not in response.headers
+                with pytest.raises(ResponseTooLargeError):
+                    await read_text(response, max_bytes=250)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("spool_bytes", [1024 * 1024, 128])
+    async def test_reads_chunked_body_and_decodes_charset(
+        self, spool_bytes: int
+    ):
+        content = "Żółć\r\n" * 1000
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(
+                200,
+                content=content.encode("iso-8859-2"),
+                headers={"Content-Type": "text/html; charset=iso-8859-2"},
+            )
+
+        transport = httpx.MockTransport(handler)
+        async with HTTPXSession(transport=transport) as session:
+            async with session.get("http://example.com") as response:
+                text = await read_text(
+                    response,
+                    max_bytes=10000,
+                    spool_bytes=spool_bytes,
+                    chunk_bytes=64,
+                )
+        assert text == content
+
+    @pytest.mark.asyncio
+    async def test_aiohttp_response(self):
+        async def handler(request: web.Request) -> web.Response:
+            return web.Response(text=mock_json_content)
+
+        app = web.Application()
+        app.router.add_get("/", handler)
+        async with TestServer(app) as server:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(server.make_url("/")) as response:
+                    assert await read_text(response) == mock_json_content
+                async with session.get(server.make_url("/")) as response:
+                    with pytest.raises(ResponseTooLargeError):
+                        await read_text(response, max_bytes=10)
+
+    @pytest.mark.asyncio
+    async def test_fetcher_rejects_large_body(self):
+        async with mock_transport_session(mock_json_content) as session:
+            result = await AsyncJSONDataFetcher(max_body_bytes=10).fetch_data(
+                "http://example.com/api", session
+            )
+            unlimited = await AsyncJSONDataFetcher(
+                max_body_bytes=0
+            ).fetch_data("http://example.com/api", session)
+        assert result is None
+        assert unlimited == mock_json_content
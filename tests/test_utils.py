@@ -5,19 +5,28 @@ import pytest
 from pytest_mock import MockFixture
 
 
+from app.checkpoint import CheckpointJournal
 from app.csv_handler import CSVHandler
 from app.fetchers import AsyncHTMLDataFetcher, AsyncJSONDataFetcher
+from app.negative_cache import NegativeCache
 from app.parsers import HTMLParsingStrategy, JSONParsingStrategy
-from app.schemas import ParsedData, ProjectInfo
+from app.progress import ProgressBroker, RunProgress
+from app.schemas import PROJECT_INFO_FIELDS, ParsedData, ProjectInfo
+from app.settings import RuntimeSettings
+from app.skip_report import SkipReport
+from app.snapshots import SnapshotStore
 from app.utils import (
+    RunOptions,
     fetch_and_parse_project_data_to_csv,
     fetch_data_and_save_in_parallel,
     is_valid_url,
 )
+from fixtures import read_mock_data
+from tests import mock_data_helpers
 from tests.mock_data_helpers import (
     max_concurrent_tasks,
     mock_fetch_and_parse,
-    read_mock_data,
+    mock_get,
 )
 
 # Preparing mock data
@@ -60,16 +69,22 @@ async def test_max_concurrent_tasks(mocker: MockFixture):
         "http://example.com/3",
     ]
 
-    max_concurrent_reached = False
+    mock_data_helpers.max_concurrent_reached = False
+    mock_data_helpers.processed_urls.clear()
 
-    mocker.patch("app.utils.aiohttp.ClientSession", MagicMock())
-    mocker.patch("app.utils.CSVHandler", MagicMock())
+    mocker.patch("app.utils.create_session", MagicMock())
+    csv_handler_mock = mocker.patch("app.utils.CSVHandler", MagicMock())
     mocker.patch(
         "app.utils.fetch_and_parse_project_data_to_csv", mock_fetch_and_parse
     )
 
-    await fetch_data_and_save_in_parallel(mock_urls, max_concurrent_tasks)
-    assert not max_concurrent_reached
+    await fetch_data_and_save_in_parallel(
+        mock_urls, max_concurrent_tasks, checkpoint_path=None
+    )
+
+    assert not mock_data_helpers.max_concurrent_reached
+    assert sorted(mock_data_helpers.processed_urls) == mock_urls
+    assert csv_handler_mock.return_value.write_row.call_count == len(mock_urls)
 
 
 @pytest.mark.asyncio
@@ -102,7 +117,7 @@ async def test_fetch_and_parse_project_data_to_csv_valid_url(
             )
         ),
     )
-    mocker.patch.object(CSVHandler, "write_dict_to_csv")
+    mocker.patch.object(CSVHandler, "write_row")
 
     await fetch_and_parse_project_data_to_csv(
         semaphore, url, session_mock, csv_handler_mock
@@ -112,7 +127,9 @@ async def test_fetch_and_parse_project_data_to_csv_valid_url(
     HTMLParsingStrategy.parse.assert_called_once()
     AsyncJSONDataFetcher.fetch_data.assert_called_once()
     JSONParsingStrategy.parse.assert_called_once()
-    csv_handler_mock.write_dict_to_csv.assert_called_once()
+    csv_handler_mock.write_row.assert_called_once_with(
+        PROJECT_INFO_FIELDS, ("mock", "mock", 1, 1)
+    )
 
 
 @pytest.mark.asyncio
@@ -147,7 +164,7 @@ async def test_fetch_and_parse_project_data_to_csv_invalid_url(
     html_parser_mock.parse.assert_not_called()
     json_fetcher_mock.fetch_data.assert_not_called()
     json_parser_mock.parse.assert_not_called()
-    csv_handler_mock.write_dict_to_csv.assert_not_called()
+    csv_handler_mock.write_row.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -185,4 +202,321 @@ async def test_fetch_and_parse_project_data_to_csv_parsing_error(
     HTMLParsingStrategy.parse.assert_called_once()
     AsyncJSONDataFetcher.fetch_data.assert_not_called()
     JSONParsingStrategy.parse.assert_not_called()
-    csv_handler_mock.write_dict_to_csv.assert_not_called()
+    csv_handler_mock.write_row.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_fetch_data_and_save_in_parallel_resumes_from_checkpoint(
+    mocker: MockFixture, tmp_path
+):
+    urls = ["http://example.com/1", "http://example.com/2"]
+    checkpoint_path = str(tmp_path / "job.journal")
+    row = {"hash": "h1", "name": "n1", "floor_count": 1, "room_count": 1}
+    CheckpointJournal(
+        checkpoint_path, CheckpointJournal.fingerprint(urls)
+    ).record(urls[0], "key1", row)
+
+    restored_rows = []
+    csv_handler_mock = MagicMock()
+    csv_handler_mock.write_rows.side_effect = (
+        lambda fieldnames, rows: restored_rows.extend(rows)
+    )
+    mocker.patch("app.utils.create_session", MagicMock())
+    mocker.patch("app.utils.CSVHandler", return_value=csv_handler_mock)
+    fetch_mock = mocker.patch(
+        "app.utils.fetch_and_parse_project_data_to_csv",
+        return_value=ParsedData(
+            project_info=ProjectInfo(
+                hash="h2", name="n2", floor_count=2, room_count=2
+            ),
+            extracted_param="key2",
+        ),
+    )
+
+    progress = RunProgress(ProgressBroker(), "job", total=len(urls))
+
+    await fetch_data_and_save_in_parallel(
+        urls,
+        max_concurrent_tasks,
+        checkpoint_path=checkpoint_path,
+        options=RunOptions(progress=progress),
+    )
+
+    fetch_mock.assert_called_once()
+    assert fetch_mock.call_args.args[1] == urls[1]
+    csv_handler_mock.write_rows.assert_called_once()
+    assert restored_rows == [["h1", "n1", 1, 1]]
+    assert not (tmp_path / "job.journal").exists()
+    assert progress.processed == 2
+    assert progress.written == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "status, cached", [(404, True), (410, True), (503, False)]
+)
+async def test_fetch_and_parse_project_data_to_csv_records_permanent_failure(
+    mocker: MockFixture, status: int, cached: bool
+):
+    url = "http://valid-url.com"
+    negative_cache = NegativeCache(None, base_ttl=60, max_ttl=600)
+    skip_report = SkipReport()
+    session_mock = mocker.MagicMock()
+    session_mock.get.side_effect = mock_get("error", status)
+
+    result = await fetch_and_parse_project_data_to_csv(
+        asyncio.Semaphore(1),
+        url,
+        session_mock,
+        mocker.MagicMock(),
+        negative_cache,
+        skip_report=skip_report,
+    )
+
+    assert result is None
+    assert next(skip_report.skipped()).reason == "Could not fetch HTML data"
+    assert (negative_cache.get(url) is not None) == cached
+
+
+@pytest.mark.asyncio
+async def test_fetch_and_parse_project_data_to_csv_without_project_info(
+    mocker: MockFixture,
+):
+    skip_report = SkipReport()
+    csv_handler_mock = mocker.MagicMock()
+    mocker.patch.object(
+        AsyncJSONDataFetcher, "fetch_data", return_value=mock_json_content
+    )
+    mocker.patch.object(
+        JSONParsingStrategy, "parse", return_value=ParsedData()
+    )
+
+    result = await fetch_and_parse_project_data_to_csv(
+        asyncio.Semaphore(1),
+        "http://valid-url.com",
+        mocker.MagicMock(),
+        csv_handler_mock,
+        skip_report=skip_report,
+        project_key="known",
+    )
+
+    assert result is None
+    assert next(skip_report.skipped()).stage == "parse_api"
+    csv_handler_mock.write_row.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_fetch_data_and_save_in_parallel_skips_failing_urls(
+    mocker: MockFixture,
+):
+    urls = ["http://example.com/1", "http://example.com/2"]
+    negative_cache = NegativeCache(None, base_ttl=60, max_ttl=600)
+    negative_cache.record_failure(urls[0], "not found")
+
+    mocker.patch("app.utils.create_session", MagicMock())
+    mocker.patch("app.utils.CSVHandler", MagicMock())
+    fetch_mock = mocker.patch(
+        "app.utils.fetch_and_parse_project_data_to_csv", return_value=None
+    )
+
+    await fetch_data_and_save_in_parallel(
+        urls,
+        max_concurrent_tasks,
+        checkpoint_path=None,
+        options=RunOptions(negative_cache=negative_cache),
+    )
+
+    fetch_mock.assert_called_once()
+    assert fetch_mock.call_args.args[1] == urls[1]
+
+
+@pytest.mark.asyncio
+async def test_fetch_data_and_save_in_parallel_follows_runtime_settings(
+    mocker: MockFixture,
+):
+    settings = RuntimeSettings()
+    running = 0
+    max_running = 0
+    started = 0
+
+    async def fetch(semaphore: asyncio.Semaphore, *args) -> None:
+        nonlocal running, max_running, started
+        async with semaphore:
+            started += 1
+            if started == 3:
+                settings.update({"max_concurrent_tasks": 5})
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    mocker.patch("app.utils.create_session", MagicMock())
+    mocker.patch("app.utils.CSVHandler", MagicMock())
+    mocker.patch("app.utils.fetch_and_parse_project_data_to_csv", fetch)
+
+    await fetch_data_and_save_in_parallel(
+        [f"http://example.com/{i}" for i in range(30)],
+        1,
+        checkpoint_path=None,
+        options=RunOptions(settings=settings),
+    )
+
+    assert max_running == 5
+    assert not settings._watchers["max_concurrent_tasks"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_and_parse_project_data_to_csv_stage_timeout(
+    mocker: MockFixture,
+):
+    url = "http://valid-url.com"
+    negative_cache = NegativeCache(None, base_ttl=60, max_ttl=600)
+    skip_report = SkipReport()
+
+    async def slow_fetch(*args) -> str:
+        await asyncio.sleep(1)
+        return mock_html_content
+
+    mocker.patch("app.utils.HTML_FETCH_TIMEOUT_SECONDS", 0.01)
+    mocker.patch.object(AsyncHTMLDataFetcher, "fetch_data", slow_fetch)
+
+    result = await fetch_and_parse_project_data_to_csv(
+        asyncio.Semaphore(1),
+        url,
+        mocker.MagicMock(),
+        mocker.MagicMock(),
+        negative_cache,
+        skip_report=skip_report,
+    )
+
+    assert result is None
+    assert negative_cache.get(url) is None
+    assert next(skip_report.skipped()).reason == "Timed out after 0.01s"
+    assert next(skip_report.skipped()).stage == "fetch_html"
+    assert not skip_report.deadline_exceeded
+
+
+@pytest.mark.asyncio
+async def test_fetch_data_and_save_in_parallel_publishes_partial_output_on_deadline(
+    mocker: MockFixture, tmp_path
+):
+    urls = [f"http://example.com/{i}" for i in range(4)]
+    checkpoint_path = str(tmp_path / "job.journal")
+    report_path = str(tmp_path / "skipped.json")
+    store = SnapshotStore(str(tmp_path / "snapshots"), "download-csv.csv")
+
+    async def fetch_html(self, url: str, session: object) -> str:
+        if url != urls[0]:
+            await asyncio.sleep(1)
+        return mock_html_content
+
+    mocker.patch("app.utils.create_session", MagicMock())
+    mocker.patch.object(AsyncHTMLDataFetcher, "fetch_data", fetch_html)
+    mocker.patch.object(
+        AsyncJSONDataFetcher, "fetch_data", return_value=mock_json_content
+    )
+
+    snapshot = await fetch_data_and_save_in_parallel(
+        urls,
+        2,
+        checkpoint_path=checkpoint_path,
+        snapshot_store=store,
+        output_path=str(tmp_path / "download-csv.csv.partial"),
+        options=RunOptions(deadline_seconds=0.1, report_path=report_path),
+    )
+
+    assert snapshot is not None
+    with open(store.snapshot_path(snapshot)) as csvfile:
+        assert len(csvfile.readlines()) == 2  # header and the fast project
+    report = SkipReport.read(report_path)
+    assert report["deadline_exceeded"]
+    assert report["processed"] == 4
+    assert sorted(s["url"] for s in report["skipped"]) == urls[1:]
+    assert {s["stage"] for s in report["skipped"]} <= {"fetch_html", "queue"}
+    # kept, so the next run continues with the skipped URLs
+    assert (tmp_path / "job.journal").exists()
+
+
+@pytest.mark.asyncio
+async def test_fetch_and_parse_project_data_to_csv_with_known_key(
+    mocker: MockFixture,
+):
+    url = "http://valid-url.com"
+    session_mock = mocker.MagicMock()
+    csv_handler_mock = mocker.MagicMock()
+    fetch_html = mocker.patch.object(AsyncHTMLDataFetcher, "fetch_data")
+    fetch_api = mocker.patch.object(
+        AsyncJSONDataFetcher, "fetch_data", return_value=mock_json_content
+    )
+
+    result = await fetch_and_parse_project_data_to_csv(
+        asyncio.Semaphore(1),
+        url,
+        session_mock,
+        csv_handler_mock,
+        project_key="known",
+    )
+
+    fetch_html.assert_not_called()
+    fetch_api.assert_called_once_with(
+        "https://planner5d.com/api/project/known/", session_mock
+    )
+    assert result is not None
+    assert result.extracted_param == "known"
+    csv_handler_mock.write_row.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_fetch_data_and_save_in_parallel_seeds_keys_from_listings(
+    mocker: MockFixture,
+):
+    urls = [
+        "https://planner5d.com/gallery/floorplans/LTXdJG/house-3d",
+        "https://planner5d.com/gallery/floorplans/LJePOG/house-3d",
+    ]
+    listing_urls = ["https://planner5d.com/gallery/floorplans/"]
+    mocker.patch("app.utils.create_session", MagicMock())
+    mocker.patch("app.utils.CSVHandler", MagicMock())
+    resolve_mock = mocker.patch(
+        "app.utils.resolve_project_keys", return_value={"LTXdJG": "key1"}
+    )
+    fetch_mock = mocker.patch(
+        "app.utils.fetch_and_parse_project_data_to_csv", return_value=None
+    )
+
+    await fetch_data_and_save_in_parallel(
+        urls,
+        1,
+        checkpoint_path=None,
+        options=RunOptions(listing_urls=listing_urls),
+    )
+
+    assert resolve_mock.call_args.args[0] == listing_urls
+    keys = {call.args[1]: call.args[-1] for call in fetch_mock.call_args_list}
+    assert keys == {urls[0]: "key1", urls[1]: None}
+
+
+@pytest.mark.asyncio
+async def test_fetch_data_and_save_in_parallel_does_not_resume_generators(
+    mocker: MockFixture, tmp_path
+):
+    urls = ["http://example.com/1", "http://example.com/2"]
+    checkpoint_path = str(tmp_path / "job.journal")
+    row = {"hash": "h1", "name": "n1", "floor_count": 1, "room_count": 1}
+    CheckpointJournal(checkpoint_path, "default").record(urls[0], "key1", row)
+
+    csv_handler_mock = MagicMock()
+    mocker.patch("app.utils.create_session", MagicMock())
+    mocker.patch("app.utils.CSVHandler", return_value=csv_handler_mock)
+    fetch_mock = mocker.patch(
+        "app.utils.fetch_and_parse_project_data_to_csv", return_value=None
+    )
+
+    await fetch_data_and_save_in_parallel(
+        (url for url in urls),
+        max_concurrent_tasks,
+        checkpoint_path=checkpoint_path,
+    )
+
+    assert sorted(call.args[1] for call in fetch_mock.call_args_list) == urls
+    csv_handler_mock.write_rows.assert_not_called()
@@ -0,0 +1,120 @@
+import asyncio
+from contextlib import aclosing
+from typing import AsyncIterator, Iterator
+
+import pytest
+
+from app.worker_pool import AsyncWorkerPool
+
+
+class TestAsyncWorkerPool:
+    @pytest.mark.asyncio
+    async def test_processes_all_items(self):
+        async def double(item: int) -> int:
+            await asyncio.sleep(0)
+            return item * 2
+
+        pool = AsyncWorkerPool(double, 3)
+        results = [r async for r in pool.imap_unordered(range(10))]
+
+        assert sorted(r.result for r in results) == [i * 2 for i in range(10)]
+        assert all(r.error is None for r in results)
+
+    @pytest.mark.asyncio
+    async def test_accepts_async_iterable(self):
+        async def items() -> AsyncIterator[int]:
+            for i in range(5):
+                yield i
+
+        async def identity(item: int) -> int:
+            return item
+
+        pool = AsyncWorkerPool(identity, 2)
+        assert await pool.run(items()) == 5
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        running = 0
+        max_running = 0
+
+        async def work(item: int) -> None:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        pool = AsyncWorkerPool(work, 2)
+        await pool.run(range(10))
+        assert max_running == 2
+
+    @pytest.mark.asyncio
+    async def test_pulls_items_lazily(self):
+        pulled = 0
+
+        def items() -> Iterator[int]:
+            nonlocal pulled
+            for i in range(1000):
+                pulled += 1
+                yield i
+
+        async def work(item: int) -> int:
+            await asyncio.sleep(0)
+            return item
+
+        pool = AsyncWorkerPool(work, 2)
+        async with aclosing(pool.imap_unordered(items())) as results:
+            async for _ in results:
+                break
+
+        assert pulled <= 10
+
+    @pytest.mark.asyncio
+    async def test_worker_errors_are_reported(self):
+        async def work(item: int) -> int:
+            if item == 1:
+                raise ValueError("boom")
+            return item
+
+        pool = AsyncWorkerPool(work, 2)
+        results = [r async for r in pool.imap_unordered([0, 1, 2])]
+
+        errors = [r for r in results if r.error is not None]
+        assert len(results) == 3
+        assert len(errors) == 1
+        assert errors[0].item == 1
+
+    @pytest.mark.asyncio
+    async def test_resize_while_running(self):
+        running = 0
+        max_running = 0
+
+        async def work(item: int) -> None:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        pool = AsyncWorkerPool(work, 2)
+        processed = 0
+        async for _ in pool.imap_unordered(range(40)):
+            processed += 1
+            if processed == 5:
+                pool.resize(4)
+                max_running = 0
+            if processed == 20:
+                assert max_running == 4
+                pool.resize(1)
+            if processed == 25:
+                max_running = 0
+
+        assert processed == 40
+        assert max_running == 1
+
+    def test_invalid_concurrency(self):
+        async def work(item: int) -> int:
+            return item
+
+        with pytest.raises(ValueError):
+            AsyncWorkerPool(work, 0)